@@ -25,9 +25,22 @@ SOFTWARE.
 __version__ = "3.10.0"
 
 from .abc import BasePlayer, BaseClan
+from .catalogues import Catalogue, CatalogueHolder
 from .clans import RankedClan, Clan
 from .client import Client
-from .events import PlayerEvents, ClanEvents, WarEvents, EventsClient, ClientEvents
+from .cwl import LeagueRequestCache
+from .diff import PlayerDiff, RaidDiff, SnapshotDiff
+from .dispatcher import BatchedEvent, EventBatcher, ListenerDispatcher
+from .executor import ListenerExecutors, LoopLagMonitor, ModelSnapshot
+from .metrics import UpdaterMetrics
+from .persistence import SnapshotPersistence, SnapshotRecord, SQLiteSnapshotPersistence
+from .planner import CapacityPlan, TagClassPlan, plan_capacity, tune_retry_intervals
+from .replay import ReplayDriver, ReplayRecord, ReplayRecorder, ReplayReport, read_mockdata, read_records
+from .sharding import ShardRouter, rendezvous_score
+from .sinks import EventPipeline, EventSink, NDJSONSink, SQLiteSink, WebhookSink, serialise_event
+from .snapshots import CompactSnapshotStore, ModelStore
+from .events import PlayerEvents, ClanEvents, WarEvents, RaidEvents, EventsClient, ClientEvents
+from .server import EventHub, EventSubscription, StreamedEvent, serve_events
 from .enums import (
     PlayerHouseElementType,
     Resource,
@@ -59,7 +72,7 @@ from .errors import (
     PrivateWarLog,
 )
 from .hero import Equipment, Hero, Pet
-from .http import BasicThrottler, BatchThrottler, HTTPClient
+from .http import BasicThrottler, BatchThrottler, CachePolicy, HTTPClient
 from .iterators import (
     ClanIterator,
     PlayerIterator,
@@ -86,6 +99,7 @@ from .miscmodels import (
 from .players import Player, ClanMember, RankedPlayer
 from .player_clan import PlayerClan
 from .raid import RaidClan, RaidMember, RaidLogEntry, RaidDistrict, RaidAttack
+from .scheduler import AdaptivePollPolicy, ClockScheduler
 from .spell import Spell
 from .troop import Troop
 from .war_clans import WarClan, ClanWarLeagueClan
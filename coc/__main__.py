@@ -0,0 +1,102 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from .events import EventsClient
+from .server import DEFAULT_HISTORY, DEFAULT_PORT, EventHub, serve_events
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m coc")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser(
+        "events-serve",
+        help="run one EventsClient and stream its events to subscribers",
+        description="Run one EventsClient and stream its events to any number of subscribers, as server-sent events "
+                    "from /events and WebSocket messages from /ws.",
+    )
+    serve.add_argument("--email", default=os.environ.get("COC_EMAIL"),
+                       help="the email of the developer site account, defaults to $COC_EMAIL")
+    serve.add_argument("--password", default=os.environ.get("COC_PASSWORD"),
+                       help="the password of the developer site account, defaults to $COC_PASSWORD")
+    serve.add_argument("--token", action="append", default=[], help="an API token to use instead of logging in")
+    serve.add_argument("--key-count", type=int, default=1, help="the number of keys to use")
+    serve.add_argument("--clan", action="append", default=[], help="a clan tag to track")
+    serve.add_argument("--player", action="append", default=[], help="a player tag to track")
+    serve.add_argument("--war", action="append", default=[], help="the tag of a clan to track the wars of")
+    serve.add_argument("--raid", action="append", default=[], help="the tag of a clan to track the raids of")
+    serve.add_argument("--event", action="append", default=[], required=True,
+                       help="an event to stream, as type:name, ie. clan:member_donations or war:war_attack")
+    serve.add_argument("--host", default="127.0.0.1", help="the host to listen on, defaults to localhost")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help="the port to listen on")
+    serve.add_argument("--history", type=int, default=DEFAULT_HISTORY,
+                       help="the number of recent events subscribers can resume from")
+    return parser
+
+
+async def events_serve(args: argparse.Namespace) -> None:
+    client = EventsClient(key_count=args.key_count, raw_attribute=True)
+    hub = EventHub(history=args.history)
+    # check the events before logging in, so a typo fails straight away.
+    hub.register(client, *args.event)
+
+    if args.token:
+        await client.login_with_tokens(*args.token)
+    else:
+        await client.login(args.email, args.password)
+
+    client.add_clan_updates(*args.clan)
+    client.add_player_updates(*args.player)
+    client.add_war_updates(*args.war)
+    client.add_raid_updates(*args.raid)
+
+    runner = await serve_events(hub, args.host, args.port)
+    logging.getLogger(__name__).info("streaming events on http://%s:%s", args.host, args.port)
+    try:
+        # until it's interrupted.
+        await asyncio.Event().wait()
+    finally:
+        hub.close()
+        await runner.cleanup()
+        await client.close()
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.command == "events-serve":
+        if not args.token and not (args.email and args.password):
+            raise SystemExit("an --email and --password, or a --token, are needed to log in")
+        logging.basicConfig(level=logging.INFO)
+        try:
+            asyncio.run(events_serve(args))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -52,12 +52,13 @@ class BaseClan:
     level: :class:`int`
         The clan's level.
     """
-    __slots__ = ("tag", "name", "_client", "badge", "level", "_response_retry", "_raw_data")
+    __slots__ = ("tag", "name", "_client", "badge", "level", "_response_retry", "_raw_data", "_fingerprint")
 
     def __init__(self, *, data, client, **kwargs):
         self._client = client
 
         self._response_retry = data.get("_response_retry")
+        self._fingerprint = data.get("_fingerprint")
         self.tag = data.get("tag")
         self.name = data.get("name")
         self.badge = try_enum(Badge, data=data.get("badgeUrls"),
@@ -130,7 +131,7 @@ class BasePlayer:
         The player's name
     """
 
-    __slots__ = ("tag", "name", "_client", "_response_retry", "_raw_data")
+    __slots__ = ("tag", "name", "_client", "_response_retry", "_raw_data", "_fingerprint")
 
     def __str__(self):
         return self.name
@@ -144,6 +145,7 @@ class BasePlayer:
     def __init__(self, *, data, client, **_):
         self._client = client
         self._response_retry = data.get("_response_retry")
+        self._fingerprint = data.get("_fingerprint")
         self._raw_data = data if client and client.raw_attribute else None
         self.tag = data.get("tag")
         self.name = data.get("name")
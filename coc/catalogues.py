@@ -0,0 +1,191 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import logging
+
+from pathlib import Path
+from time import time as now
+from typing import Dict, List, Optional
+
+import orjson
+
+LOG = logging.getLogger(__name__)
+
+CATALOGUE_SNAPSHOT_PATH = Path(__file__).parent.joinpath(Path("static/catalogues.json"))
+
+
+class Catalogue:
+    """An indexed, in-memory copy of a small list returned by the API, ie. all locations or all leagues.
+
+    Items are kept as the raw API data and are indexed by id, (case-insensitive) name and country code.
+
+    Attributes
+    -----------
+    name:
+        :class:`str` - The name of the catalogue, ie. ``locations``.
+    items:
+        Optional[List[:class:`dict`]] - The raw items of the catalogue. ``None`` if it hasn't been loaded yet.
+    updated_at:
+        :class:`float` - The UNIX timestamp the items were fetched from the API at. ``0`` for snapshot data.
+    """
+
+    __slots__ = ("name", "items", "updated_at", "_by_id", "_by_name", "_by_country_code", "_refresh_task")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items: Optional[List[dict]] = None
+        self.updated_at = 0.0
+
+        self._by_id = {}
+        self._by_name = {}
+        self._by_country_code = {}
+        self._refresh_task = None
+
+    def __repr__(self):
+        return "<%s name=%r items=%s>" % (self.__class__.__name__, self.name, self.items and len(self.items))
+
+    def load(self, items: List[dict], updated_at: float = 0.0) -> None:
+        """Replace the items of the catalogue and rebuild the indexes."""
+        by_id, by_name, by_country_code = {}, {}, {}
+        for item in items:
+            by_id[item.get("id")] = item
+            # only the first item of a name is kept, to match :func:`utils.get`
+            by_name.setdefault((item.get("name") or "").lower(), item)
+            if item.get("countryCode"):
+                by_country_code[item["countryCode"].upper()] = item
+
+        self.items = items
+        self.updated_at = updated_at
+        self._by_id, self._by_name, self._by_country_code = by_id, by_name, by_country_code
+
+    def get(self, item_id: int) -> Optional[dict]:
+        """Get an item by its ID."""
+        try:
+            return self._by_id.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_named(self, name: str) -> Optional[dict]:
+        """Get an item by its name. This is case-insensitive."""
+        return self._by_name.get(name.lower())
+
+    def get_country(self, country_code: str) -> Optional[dict]:
+        """Get a location by its country code, ie. ``US``. This is case-insensitive."""
+        return self._by_country_code.get(country_code.upper())
+
+
+class CatalogueHolder:
+    """Holds the catalogues of a client, loading them once and refreshing them in the background.
+
+    Parameters
+    -----------
+    max_age:
+        :class:`int` - The number of seconds after which a catalogue is refreshed in the background.
+    snapshot_path:
+        Optional[:class:`pathlib.Path`] - A snapshot, as written by :meth:`CatalogueHolder.save_snapshot`,
+        used to answer lookups before the catalogues have been fetched from the API.
+    """
+
+    #: Maps the name of every catalogue to the :class:`HTTPClient` method used to fetch it.
+    endpoints = {
+        "locations": "search_locations",
+        "leagues": "search_leagues",
+        "builder_base_leagues": "search_builder_base_leagues",
+        "war_leagues": "search_war_leagues",
+        "capital_leagues": "search_capital_leagues",
+        "clan_labels": "get_clan_labels",
+        "player_labels": "get_player_labels",
+    }
+
+    def __init__(self, max_age: int, snapshot_path: Optional[Path] = None):
+        self.max_age = max_age
+        self.snapshot_path = snapshot_path
+        self._catalogues: Dict[str, Catalogue] = {name: Catalogue(name) for name in self.endpoints}
+        self._snapshot_loaded = False
+
+    def __getitem__(self, name: str) -> Catalogue:
+        return self._catalogues[name]
+
+    def load_snapshot(self, path: Path) -> None:
+        """Load catalogues from a snapshot file. Catalogues missing from the snapshot are left untouched."""
+        with open(path, "rb") as fp:
+            snapshot = orjson.loads(fp.read())
+
+        for name, items in snapshot.items():
+            try:
+                catalogue = self._catalogues[name]
+            except KeyError:
+                continue
+            if catalogue.items is None:
+                catalogue.load(items)
+
+    def save_snapshot(self, path: Path) -> None:
+        """Write every loaded catalogue to a snapshot file, for use with :meth:`CatalogueHolder.load_snapshot`."""
+        snapshot = {name: catalogue.items for name, catalogue in self._catalogues.items() if catalogue.items is not None}
+        with open(path, "wb") as fp:
+            fp.write(orjson.dumps(snapshot))
+
+    async def refresh(self, http, name: str, **kwargs) -> Catalogue:
+        """Fetch a catalogue from the API and rebuild its indexes."""
+        catalogue = self._catalogues[name]
+        data = await getattr(http, self.endpoints[name])(limit=None, **kwargs)
+        catalogue.load(data.get("items", []), updated_at=now())
+        LOG.debug("Refreshed the %s catalogue with %s items", name, len(catalogue.items))
+        return catalogue
+
+    async def get(self, http, name: str, **kwargs) -> Catalogue:
+        """Get a catalogue, fetching it if it hasn't been loaded yet.
+
+        A catalogue older than :attr:`max_age` is returned as is, and refreshed in the background.
+        """
+        if not self._snapshot_loaded:
+            self._snapshot_loaded = True
+            if self.snapshot_path:
+                try:
+                    self.load_snapshot(self.snapshot_path)
+                except (OSError, ValueError):
+                    LOG.exception("Failed to load the catalogue snapshot at %s", self.snapshot_path)
+
+        catalogue = self._catalogues[name]
+        task = catalogue._refresh_task
+        if catalogue.items is None:
+            if task is None or task.done():
+                task = catalogue._refresh_task = asyncio.ensure_future(self.refresh(http, name, **kwargs))
+            await asyncio.shield(task)
+        elif catalogue.updated_at + self.max_age < now() and (task is None or task.done()):
+            catalogue._refresh_task = asyncio.ensure_future(self.refresh(http, name, **kwargs))
+            catalogue._refresh_task.add_done_callback(self._refresh_callback)
+
+        return catalogue
+
+    @staticmethod
+    def _refresh_callback(task):
+        if not task.cancelled() and task.exception():
+            LOG.warning("Failed to refresh a catalogue in the background", exc_info=task.exception())
+
+    def close(self) -> None:
+        """Cancel any background refreshes."""
+        for catalogue in self._catalogues.values():
+            if catalogue._refresh_task is not None and not catalogue._refresh_task.done():
+                catalogue._refresh_task.cancel()
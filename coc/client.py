@@ -23,6 +23,7 @@ SOFTWARE.
 """
 import asyncio
 import logging
+from datetime import datetime, timezone
 from enum import Enum
 
 from itertools import cycle
@@ -31,12 +32,13 @@ from typing import AsyncIterator, Iterable, List, Optional, Type, Union, TYPE_CH
 
 import orjson
 
+from .catalogues import CATALOGUE_SNAPSHOT_PATH, Catalogue, CatalogueHolder
 from .clans import Clan, RankedClan
 from .errors import Forbidden, GatewayError, NotFound, PrivateWarLog
 from .enums import WarRound
 from .miscmodels import BaseLeague, GoldPassSeason, Label, League, Location, LoadGameData
 from .hero import HeroHolder, PetHolder, EquipmentHolder
-from .http import HTTPClient, BasicThrottler, BatchThrottler
+from .http import HTTPClient, BasicThrottler, BatchThrottler, CachePolicy
 from .iterators import (
     PlayerIterator,
     ClanIterator,
@@ -48,7 +50,7 @@ from .players import Player, ClanMember, RankedPlayer
 from .raid import RaidLogEntry
 from .spell import SpellHolder
 from .troop import TroopHolder
-from .utils import correct_tag, get, parse_army_link
+from .utils import correct_tag, get, get_cwl_start, parse_army_link, LeagueWarIndex, LRU
 from .wars import ClanWar, ClanWarLogEntry, ClanWarLeagueGroup
 from .entry_logs import ClanWarLog, RaidLog
 
@@ -61,6 +63,8 @@ if TYPE_CHECKING:
 LOG = logging.getLogger(__name__)
 
 LEAGUE_WAR_STATE = "notInWar"
+# keyword arguments which don't change how a model is built, so don't stop it from being reused.
+MODEL_CACHE_IGNORED_KWARGS = {"lookup_cache", "update_cache", "ignore_cached_errors", "realtime", "load_game_data"}
 KEY_MINIMUM, KEY_MAXIMUM = 1, 10
 
 ENGLISH_ALIAS_PATH = Path(__file__).parent.joinpath(Path("static/texts_EN.json"))
@@ -127,6 +131,31 @@ class Client:
     cache_max_size: :class:`int`
         The max size of the internal cache layer. Defaults to 10 000. Set this to ``None`` to remove any cache layer.
 
+    cache_policy: Type[:class:`CachePolicy`]
+        The policy deciding how long responses are cached for, based on their content. By default,
+        data which can't change anymore (ended wars and raid weekends, league catalogues...) is cached for its known
+        lifetime instead of the ``Cache-Control`` max age. Set this to ``None`` to only use the ``Cache-Control`` header.
+
+    catalogue_max_age: :class:`int`
+        Locations, leagues and labels are fetched once and kept in memory, so that methods like
+        :meth:`Client.get_location_named` or :meth:`Client.get_league` don't need to make a request.
+        This is the number of seconds after which they are refreshed in the background. Defaults to 1 day.
+        Set this to ``None`` to request them from the API every time.
+
+    catalogue_snapshot: Union[:class:`str`, :class:`pathlib.Path`]
+        A snapshot of the catalogues to use before they have been fetched, as written by
+        :meth:`CatalogueHolder.save_snapshot`. Defaults to the snapshot of locations and labels shipped with coc.py.
+        Set this to ``None`` to always fetch them from the API first.
+
+    model_cache_max_size: :class:`int`
+        The max number of :class:`Player` and :class:`Clan` objects to keep around. When set, :meth:`Client.get_player`
+        and :meth:`Client.get_clan` return the very same object for as long as the underlying response is served from
+        the cache, instead of building a new one every time. Objects are cached per tag, ``cls`` and
+        ``load_game_data`` option, so a custom class never receives an object built for another class.
+        Any other keyword arguments passed on to ``cls`` bypass this cache.
+        As these objects are shared, they should be treated as read-only.
+        Defaults to ``None``, which disables this cache.
+
     load_game_data: :class:`LoadGameData`
         The option for how coc.py will load game data. See :ref:`initialising_game_data` for more info.
 
@@ -189,6 +218,8 @@ class Client:
         "timeout",
         "connector",
         "cache_max_size",
+        "cache_policy",
+        "catalogues",
         "stats_max_size",
         "http",
         "realtime",
@@ -202,6 +233,8 @@ class Client:
         "_players",
         "_clans",
         "_wars",
+        "_league_war_index",
+        "_model_cache",
         "objects_cls",
         "_troop_holder",
         "_spell_holder",
@@ -222,6 +255,10 @@ class Client:
         connector=None,
         timeout: float = 30.0,
         cache_max_size: int = 10000,
+        cache_policy: Optional[Type[CachePolicy]] = CachePolicy,
+        catalogue_max_age: Optional[int] = 24 * 60 * 60,
+        catalogue_snapshot: Optional[Union[str, Path]] = CATALOGUE_SNAPSHOT_PATH,
+        model_cache_max_size: Optional[int] = None,
         stats_max_size: int = 1000,
         load_game_data: LoadGameData = LoadGameData(default=True),
         realtime=False,
@@ -248,6 +285,8 @@ class Client:
         self.connector = connector
         self.timeout = timeout
         self.cache_max_size = cache_max_size
+        self.cache_policy = cache_policy
+        self.catalogues = catalogue_max_age and CatalogueHolder(catalogue_max_age, catalogue_snapshot) or None
         self.stats_max_size = stats_max_size
         
         self.lookup_cache = lookup_cache
@@ -273,6 +312,8 @@ class Client:
         self._players = {}
         self._clans = {}
         self._wars = {}
+        self._league_war_index = LeagueWarIndex()
+        self._model_cache = LRU(model_cache_max_size) if model_cache_max_size else None
 
     @property
     def _defaults(self):
@@ -294,6 +335,10 @@ class Client:
         provided class is a valid subclass of a predefined default class. It updates
         the internal mapping of object classes to the new custom class.
         
+        .. note::
+
+            This clears any objects kept by the ``model_cache_max_size`` cache.
+
         .. note::
         
             This affects only the return type of Client methods returning the object.
@@ -328,6 +373,9 @@ class Client:
         if not issubclass(cls, default_cls[name]):
             raise TypeError(f"The cls {cls} must be a subclass of {default_cls[name]}")
         self.objects_cls[name] = cls
+        if self._model_cache is not None:
+            # objects of the previous class can't be returned anymore, no need to keep them around.
+            self._model_cache.clear()
 
     def _create_client(self, email, password):
         return HTTPClient(
@@ -341,6 +389,7 @@ class Client:
             throttle_limit=self.throttle_limit,
             throttler=self.throttler,
             cache_max_size=self.cache_max_size,
+            cache_policy=self.cache_policy,
             stats_max_size=self.stats_max_size,
             base_url=self.base_url,
             ip=self.ip,
@@ -457,8 +506,40 @@ class Client:
     async def close(self) -> None:
         """Closes the HTTP connection from within a loop function such as
         async def main()"""
+        if self.catalogues is not None:
+            self.catalogues.close()
         await self.http.close()
 
+    def _build_model(self, endpoint: str, tag: str, cls, data: dict, **kwargs):
+        # skip building the object if the payload is identical to one the caller already has.
+        if_none_match = kwargs.pop("if_none_match", None)
+        if if_none_match is not None and data.get("_fingerprint") == if_none_match:
+            return None
+
+        model_cache = self._model_cache
+        if not kwargs.pop("model_cache", True) or model_cache is None or not data.get("timestamp") \
+                or set(kwargs) - MODEL_CACHE_IGNORED_KWARGS:
+            return cls(data=data, client=self, **kwargs)
+
+        # the timestamp only changes when a fresh response is received, so the same object can be reused until then.
+        key = (endpoint, tag, cls, kwargs.get("load_game_data"))
+        try:
+            timestamp, model = model_cache[key]
+        except KeyError:
+            pass
+        else:
+            if timestamp == data["timestamp"]:
+                return model
+
+        model = cls(data=data, client=self, **kwargs)
+        model_cache[key] = (data["timestamp"], model)
+        return model
+
+    async def _get_catalogue(self, name: str, **kwargs) -> Optional[Catalogue]:
+        if self.catalogues is None or not kwargs.get("lookup_cache", self.lookup_cache):
+            return None
+        return await self.catalogues.get(self.http, name, **{**self._defaults, **kwargs})
+
     def dispatch(self, event_name: str, *args, **kwargs) -> None:
         """Dispatches an event listener matching the `event_name` parameter."""
         LOG.debug("Dispatching %s event", event_name)
@@ -607,7 +688,7 @@ class Client:
                                         lookup_cache=kwargs.get("lookup_cache", self.lookup_cache),
                                         update_cache=kwargs.get("update_cache", self.update_cache),
                                         ignore_cached_errors=kwargs.get("ignore_cached_errors", self.ignore_cached_errors))
-        return cls(data=data, client=self, **kwargs)
+        return self._build_model("clan", tag, cls, data, **kwargs)
 
     def get_clans(self, tags: Iterable[str], cls: Type[Clan] = None, **kwargs) -> AsyncIterator[Clan]:
         """Get information about multiple clans by clan tag.
@@ -1074,8 +1155,12 @@ class Client:
         if self.correct_tags:
             clan_tag = correct_tag(clan_tag)
 
+        data = await self._get_league_group_data(clan_tag, **kwargs)
+        return cls(data=data, client=self, **kwargs)
+
+    async def _get_league_group_data(self, clan_tag, **kwargs):
         try:
-            data = await self.http.get_clan_war_league_group(clan_tag, **{**self._defaults, **kwargs})
+            return await self.http.get_clan_war_league_group(clan_tag, **{**self._defaults, **kwargs})
         except Forbidden as exception:
             raise PrivateWarLog(exception.response, exception.reason) from exception
         except asyncio.TimeoutError:
@@ -1084,8 +1169,6 @@ class Client:
                 "when requesting the league group of a clan searching for a Clan War League match."
             )
 
-        return cls(data=data, client=self, **kwargs)
-
     async def get_league_war(self, war_tag: str, cls: Type[ClanWar] = None, **kwargs) -> ClanWar:
         """
         Retrieve information about a clan war league war.
@@ -1127,13 +1210,29 @@ class Client:
         if self.correct_tags:
             war_tag = correct_tag(war_tag)
 
+        data = await self._get_league_war_data(war_tag, **kwargs)
+        return cls(data=data, client=self, **kwargs)
+
+    async def _get_league_war_data(self, war_tag, **kwargs):
         try:
             data = await self.http.get_cwl_wars(war_tag, **{**self._defaults, **kwargs})
         except Forbidden as exception:
             raise PrivateWarLog(exception.response, exception.reason) from exception
 
         data["tag"] = war_tag  # API doesn't return this, even though it is in docs.
-        return cls(data=data, client=self, **kwargs)
+        self._index_league_war(war_tag, data)
+        return data
+
+    def _index_league_war(self, war_tag, data):
+        # war tags and their pairings never change within a season, so remember which clans are in the war
+        # to only request the war of the clan we're after next time.
+        preparation_start_time = data.get("preparationStartTime")
+        clan_tags = [(data.get(key) or {}).get("tag") for key in ("clan", "opponent")]
+        if not preparation_start_time or not all(clan_tags):
+            return
+
+        season = "{}-{}".format(preparation_start_time[:4], preparation_start_time[4:6])
+        self._league_war_index.add(season, war_tag, clan_tags)
 
     def get_league_wars(
         self,
@@ -1196,6 +1295,8 @@ class Client:
         search for a current league war.
 
         This simplifies what would otherwise be 2-3 function calls to find a war.
+        While a CWL is running (see :func:`utils.get_cwl_start`), the regular war and the league group are
+        requested in parallel.
 
         If you don't wish to search for CWL wars, use :meth:`Client.get_clan_war`.
 
@@ -1257,16 +1358,33 @@ class Client:
         if self.correct_tags:
             clan_tag = correct_tag(clan_tag)
 
-        try:
-            get_war = await self.get_clan_war(clan_tag, cls=cls, **kwargs)
-        except PrivateWarLog:
-            get_war = None
+        if get_cwl_start() <= datetime.now(tz=timezone.utc).replace(tzinfo=None):
+            # during CWL the regular war endpoint is almost always `notInWar`, so speculatively
+            # request the league group at the same time rather than waiting for the war first.
+            get_war, league_group = await asyncio.gather(
+                self.get_clan_war(clan_tag, cls=cls, **kwargs),
+                self.get_league_group(clan_tag, **kwargs),
+                return_exceptions=True,
+            )
+            if isinstance(get_war, PrivateWarLog):
+                get_war = None
+            elif isinstance(get_war, BaseException):
+                raise get_war
+        else:
+            try:
+                get_war = await self.get_clan_war(clan_tag, cls=cls, **kwargs)
+            except PrivateWarLog:
+                get_war = None
+            league_group = None
 
         if get_war and get_war.state != LEAGUE_WAR_STATE:
             return get_war
 
         try:
-            league_group = await self.get_league_group(clan_tag, **kwargs)
+            if league_group is None:
+                league_group = await self.get_league_group(clan_tag, **kwargs)
+            elif isinstance(league_group, BaseException):
+                raise league_group
         except (NotFound, GatewayError) as exception:
             # either they're not in cwl (NotFound)
             # or it's an API bug where league group endpoint will timeout when the clan is searching (GatewayError)
@@ -1276,11 +1394,17 @@ class Client:
 
         if league_group.state == "notInWar" or league_group.state == "groupNotFound":
             return None
+
+        kwargs["league_group"] = league_group
+        kwargs["clan_tag"] = clan_tag
+
+        last_round_war = None
         last_round_active = league_group.number_of_rounds == len(league_group.rounds)
         if last_round_active and league_group.state != "ended":
             # there are the supposed number of rounds, but without any call we are unable to know if the last round is
-            # currently in preparation or already in war
+            # currently in preparation or already in war. Only the clan's own war is kept so it can be reused below.
             async for war in self.get_league_wars(league_group.rounds[-1], cls=cls, **kwargs):
+                last_round_war = war
                 if war.state == 'inWar':
                     # last round is already in war
                     last_round_active = True
@@ -1310,8 +1434,9 @@ class Client:
         else:
             return None
 
-        kwargs["league_group"] = league_group
-        kwargs["clan_tag"] = clan_tag
+        if last_round_war is not None and round_tags is league_group.rounds[-1]:
+            return last_round_war  # already fetched while probing the last round
+
         async for war in self.get_league_wars(round_tags, cls=cls, **kwargs):
             if war.clan_tag == clan_tag:
                 return war
@@ -1448,7 +1573,10 @@ class Client:
             cls = self.objects_cls['Location']
         if not issubclass(cls, Location):
             raise TypeError("cls must be a subclass of Location.")
-        data = await self.http.get_location(location_id, **{**self._defaults, **kwargs})
+        catalogue = await self._get_catalogue("locations", **kwargs)
+        data = catalogue and catalogue.get(location_id)
+        if data is None:
+            data = await self.http.get_location(location_id, **{**self._defaults, **kwargs})
         return cls(data=data)
 
     async def get_location_named(self, location_name: str, cls: Type[Location] = None, **kwargs) -> Optional[Location]:
@@ -1461,6 +1589,8 @@ class Client:
             locations = await client.search_locations(limit=None)
             return utils.get(locations, name=location_name)
 
+        except that the name is matched case-insensitively against the in-memory location catalogue,
+        which only needs a request the first time it is used (see ``catalogue_max_age``).
 
         Parameters
         -----------
@@ -1478,11 +1608,48 @@ class Client:
             cls = self.objects_cls['Location']
         if not issubclass(cls, Location):
             raise TypeError("cls must be a subclass of Location.")
+        catalogue = await self._get_catalogue("locations", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_named(location_name)
+            return data and cls(data=data)
+
         data = await self.http.search_locations(limit=None, before=None, after=None, **{**self._defaults, **kwargs})
         locations = [cls(data=n) for n in data["items"]]
 
         return get(locations, name=location_name)
 
+    async def get_location_by_country_code(self, country_code: str, cls: Type[Location] = None,
+                                           **kwargs) -> Optional[Location]:
+        """Get a location by its country code, ie. ``US``.
+
+        This is looked up in the in-memory location catalogue, see ``catalogue_max_age``.
+
+        Parameters
+        -----------
+        country_code : str
+            The country code to search for. This is case-insensitive.
+        cls:
+            Target class to use to model that data returned
+
+        Returns
+        --------
+        :class:`Location`
+            The location matching the country code. Could be ``None`` if not found.
+        """
+        if cls is None:
+            cls = self.objects_cls['Location']
+        if not issubclass(cls, Location):
+            raise TypeError("cls must be a subclass of Location.")
+        catalogue = await self._get_catalogue("locations", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_country(country_code)
+            return data and cls(data=data)
+
+        data = await self.http.search_locations(limit=None, before=None, after=None, **{**self._defaults, **kwargs})
+        locations = [cls(data=n) for n in data["items"]]
+
+        return get(locations, country_code=country_code.upper())
+
     async def get_location_clans(
             self, location_id: int = "global", *, limit: int = None,
             before: str = None, after: str = None, cls: Type[RankedClan] = None,
@@ -1772,7 +1939,10 @@ class Client:
             cls = self.objects_cls['League']
         if not issubclass(cls, League):
             raise TypeError("cls must be a subclass of League.")
-        data = await self.http.get_league(league_id, **{**self._defaults, **kwargs})
+        catalogue = await self._get_catalogue("leagues", **kwargs)
+        data = catalogue and catalogue.get(league_id)
+        if data is None:
+            data = await self.http.get_league(league_id, **{**self._defaults, **kwargs})
         return cls(data=data, client=self)
 
     async def get_league_named(self, league_name: str, cls: Type[League] = None, **kwargs) -> Optional[League]:
@@ -1785,6 +1955,8 @@ class Client:
             leagues = await client.search_leagues(limit=None)
             return utils.get(leagues, name=league_name)
 
+        except that the name is matched case-insensitively against the in-memory league catalogue,
+        which only needs a request the first time it is used (see ``catalogue_max_age``).
 
         Parameters
         -----------
@@ -1810,6 +1982,11 @@ class Client:
             cls = self.objects_cls['League']
         if not issubclass(cls, League):
             raise TypeError("cls must be a subclass of League.")
+        catalogue = await self._get_catalogue("leagues", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_named(league_name)
+            return data and cls(data=data, client=self)
+
         return get(await self.search_leagues(cls=cls, **{**self._defaults, **kwargs}), name=league_name)
 
     async def search_builder_base_leagues(self, *, limit: int = None, before: str = None, after: str = None,
@@ -1882,7 +2059,10 @@ class Client:
             cls = self.objects_cls['BaseLeague']
         if not issubclass(cls, BaseLeague):
             raise TypeError("cls must be a subclass of BaseLeague.")
-        data = await self.http.get_builder_base_league(league_id, **{**self._defaults, **kwargs})
+        catalogue = await self._get_catalogue("builder_base_leagues", **kwargs)
+        data = catalogue and catalogue.get(league_id)
+        if data is None:
+            data = await self.http.get_builder_base_league(league_id, **{**self._defaults, **kwargs})
         return cls(data=data, client=self)
 
     async def get_builder_base_league_named(self, league_name: str, cls: Type[BaseLeague] = None, **kwargs) -> Optional[BaseLeague]:
@@ -1895,6 +2075,8 @@ class Client:
             leagues = await client.search_builder_base_leagues(limit=None)
             return utils.get(leagues, name=league_name)
 
+        except that the name is matched case-insensitively against the in-memory league catalogue,
+        which only needs a request the first time it is used (see ``catalogue_max_age``).
 
         Parameters
         -----------
@@ -1916,6 +2098,15 @@ class Client:
         :class:`BaseLeague`
             The first league matching the league name. Could be ``None`` if not found.
         """
+        if cls is None:
+            cls = self.objects_cls['BaseLeague']
+        if not issubclass(cls, BaseLeague):
+            raise TypeError("cls must be a subclass of BaseLeague.")
+        catalogue = await self._get_catalogue("builder_base_leagues", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_named(league_name)
+            return data and cls(data=data, client=self)
+
         return get(await self.search_builder_base_leagues(cls=cls, **{**self._defaults, **kwargs}), name=league_name)
 
     async def search_war_leagues(self, *, limit: int = None, before: str = None, after: str = None, cls: Type[BaseLeague] = None,
@@ -1987,7 +2178,10 @@ class Client:
             cls = self.objects_cls['BaseLeague']
         if not issubclass(cls, BaseLeague):
             raise TypeError("cls must be a subclass of BaseLeague.")
-        data = await self.http.get_war_league(league_id, **{**self._defaults, **kwargs})
+        catalogue = await self._get_catalogue("war_leagues", **kwargs)
+        data = catalogue and catalogue.get(league_id)
+        if data is None:
+            data = await self.http.get_war_league(league_id, **{**self._defaults, **kwargs})
         return cls(data=data, client=self)
 
     async def get_war_league_named(self, league_name: str, cls: Type[BaseLeague] = None, **kwargs) -> Optional[BaseLeague]:
@@ -2000,6 +2194,8 @@ class Client:
             leagues = await client.search_war_leagues(limit=None)
             return utils.get(leagues, name=league_name)
 
+        except that the name is matched case-insensitively against the in-memory league catalogue,
+        which only needs a request the first time it is used (see ``catalogue_max_age``).
 
         Parameters
         -----------
@@ -2025,6 +2221,11 @@ class Client:
             cls = self.objects_cls['BaseLeague']
         if not issubclass(cls, BaseLeague):
             raise TypeError("cls must be a subclass of BaseLeague.")
+        catalogue = await self._get_catalogue("war_leagues", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_named(league_name)
+            return data and cls(data=data, client=self)
+
         return get(await self.search_war_leagues(cls=cls, **{**self._defaults, **kwargs}), name=league_name)
 
     async def search_capital_leagues(self, *, limit: int = None, before: str = None, after: str = None, cls: Type[BaseLeague] = None,
@@ -2096,7 +2297,10 @@ class Client:
             cls = self.objects_cls['BaseLeague']
         if not issubclass(cls, BaseLeague):
             raise TypeError("cls must be a subclass of BaseLeague.")
-        data = await self.http.get_capital_league(league_id, **{**self._defaults, **kwargs})
+        catalogue = await self._get_catalogue("capital_leagues", **kwargs)
+        data = catalogue and catalogue.get(league_id)
+        if data is None:
+            data = await self.http.get_capital_league(league_id, **{**self._defaults, **kwargs})
         return cls(data=data, client=self)
 
     async def get_capital_league_named(self, league_name: str, cls: Type[BaseLeague] = None, **kwargs) -> Optional[BaseLeague]:
@@ -2109,6 +2313,8 @@ class Client:
             leagues = await client.search_capital_leagues(limit=None)
             return utils.get(leagues, name=league_name)
 
+        except that the name is matched case-insensitively against the in-memory league catalogue,
+        which only needs a request the first time it is used (see ``catalogue_max_age``).
 
         Parameters
         -----------
@@ -2134,6 +2340,11 @@ class Client:
             cls = self.objects_cls['BaseLeague']
         if not issubclass(cls, BaseLeague):
             raise TypeError("cls must be a subclass of BaseLeague.")
+        catalogue = await self._get_catalogue("capital_leagues", **kwargs)
+        if catalogue is not None:
+            data = catalogue.get_named(league_name)
+            return data and cls(data=data, client=self)
+
         return get(await self.search_capital_leagues(cls=cls, **{**self._defaults, **kwargs}), name=league_name)
 
     async def get_seasons(self, league_id: int = 29000022, **kwargs) -> List[str]:
@@ -2244,6 +2455,11 @@ class Client:
             cls = self.objects_cls['Label']
         if not issubclass(cls, Label):
             raise TypeError("cls must be a subclass of Label.")
+        if limit is None and before is None and after is None:
+            catalogue = await self._get_catalogue("clan_labels", **kwargs)
+            if catalogue is not None:
+                return [cls(data=n, client=self) for n in catalogue.items]
+
         data = await self.http.get_clan_labels(limit=limit, before=before, after=after, **{**self._defaults, **kwargs})
         return [cls(data=n, client=self) for n in data["items"]]
 
@@ -2280,6 +2496,11 @@ class Client:
             cls = self.objects_cls['Label']
         if not issubclass(cls, Label):
             raise TypeError("cls must be a subclass of Label.")
+        if limit is None and before is None and after is None:
+            catalogue = await self._get_catalogue("player_labels", **kwargs)
+            if catalogue is not None:
+                return [cls(data=n, client=self) for n in catalogue.items]
+
         data = await self.http.get_player_labels(limit=limit, before=before, after=after, **{**self._defaults, **kwargs})
         return [cls(data=n, client=self) for n in data["items"]]
 
@@ -2328,7 +2549,8 @@ class Client:
             player_tag = correct_tag(player_tag)
 
         data = await self.http.get_player(player_tag)
-        return cls(data=data, client=self, load_game_data=load_game_data, **{**self._defaults, **kwargs})
+        return self._build_model("player", player_tag, cls, data, load_game_data=load_game_data,
+                                 **{**self._defaults, **kwargs})
 
     def get_players(self, player_tags: Iterable[str], cls: Type[Player] = None, load_game_data: bool = None, **kwargs) -> AsyncIterator[
         Player]:
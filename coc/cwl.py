@@ -0,0 +1,112 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class LeagueRequestCache:
+    """Shares league groups and league wars between every clan refreshed in one war loop, so that each group and
+    each war is only requested once per loop, however many of its clans are tracked.
+
+    Every clan in a group gets the same group back, so once a group has been seen, the clans in it are remembered
+    and only the first of them to be refreshed in a loop requests it. The rest wait for that request instead.
+
+    Attributes
+    -----------
+    requests:
+        :class:`int` - The number of league groups and wars requested.
+    hits:
+        :class:`int` - The number of league groups and wars that were shared instead of requested.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.requests = 0
+        self.hits = 0
+
+        # clan tag: the (season, clan tags) of the group it was last seen in.
+        self._clan_groups: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        # the requests made in the current loop, which are shared with anyone after the same group or war.
+        self._groups: Dict[Hashable, asyncio.Future] = {}
+        self._wars: Dict[str, asyncio.Future] = {}
+
+    def __repr__(self):
+        return "<%s requests=%s hits=%s>" % (self.__class__.__name__, self.requests, self.hits)
+
+    def start_loop(self) -> None:
+        """Start sharing requests, which are forgotten by :meth:`LeagueRequestCache.end_loop`."""
+        self.active = True
+
+    def end_loop(self) -> None:
+        """Forget the requests of this loop, so the next loop gets fresh groups and wars."""
+        self.active = False
+        self._groups.clear()
+        self._wars.clear()
+
+    async def get_group(self, clan_tag: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Get the data of a clan's league group, calling ``fetch`` only if no other clan in it has this loop."""
+        # pylint: disable=broad-except
+        key = self._clan_groups.get(clan_tag, clan_tag)
+        future = self._groups.get(key)
+        if future is not None:
+            try:
+                data = await asyncio.shield(future)
+            except Exception:
+                # whoever requested it gets the error, this clan may well be fine.
+                data = {}
+            if clan_tag in _group_clans(data):
+                self.hits += 1
+                return data
+            # they've moved on to a new group since, so the old one isn't theirs anymore.
+
+        future = self._groups[key] = asyncio.ensure_future(fetch())
+        self.requests += 1
+        data = await asyncio.shield(future)
+
+        clans = _group_clans(data)
+        if clans:
+            group = (data.get("season"), tuple(sorted(clans)))
+            self._groups.setdefault(group, future)
+            for tag in clans:
+                self._clan_groups[tag] = group
+        return data
+
+    async def get_war(self, war_tag: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Get the data of a league war, calling ``fetch`` only if it hasn't been requested this loop."""
+        future = self._wars.get(war_tag)
+        if future is None:
+            future = self._wars[war_tag] = asyncio.ensure_future(fetch())
+            self.requests += 1
+        else:
+            self.hits += 1
+        return await asyncio.shield(future)
+
+    def remove(self, clan_tag: str) -> None:
+        """Forget which group a clan is in, ie. when it's no longer tracked."""
+        self._clan_groups.pop(clan_tag, None)
+
+
+def _group_clans(data):
+    return [clan.get("tag") for clan in data.get("clans") or () if clan.get("tag")]
@@ -0,0 +1,249 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .utils import cached_property
+
+if TYPE_CHECKING:
+    from .hero import Equipment, Hero, Pet
+    from .miscmodels import Achievement, Label
+    from .players import Player
+    from .raid import RaidAttack, RaidDistrict, RaidLogEntry, RaidMember
+    from .spell import Spell
+    from .troop import Troop
+
+
+class SnapshotDiff:
+    """The changes between 2 snapshots of the same clan, player or war.
+
+    Every attribute is only compared once, the first time it is needed, so that all events
+    of an update share the same comparison.
+
+    Attributes
+    -----------
+    cached:
+        The object from the previous update.
+    live:
+        The object that was just fetched.
+    """
+
+    __slots__ = ("cached", "live", "_fields")
+
+    def __init__(self, cached, live):
+        self.cached = cached
+        self.live = live
+        self._fields: Dict[str, Optional[Tuple[Any, Any]]] = {}
+
+    def __repr__(self):
+        return "<%s tag=%r>" % (self.__class__.__name__, getattr(self.live, "tag", None))
+
+    def get_field(self, name: str) -> Optional[Tuple[Any, Any]]:
+        """Get the ``(old, new)`` values of an attribute, or ``None`` if it hasn't changed."""
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+
+        old, new = getattr(self.cached, name), getattr(self.live, name)
+        change = self._fields[name] = (old, new) if old != new else None
+        return change
+
+
+class PlayerDiff(SnapshotDiff):
+    """The changes between 2 snapshots of the same player.
+
+    On top of the attributes of a :class:`SnapshotDiff`, this works out which units, achievements and labels changed.
+    """
+
+    __slots__ = (
+        "_cs_troops",
+        "_cs_spells",
+        "_cs_heroes",
+        "_cs_pets",
+        "_cs_equipment",
+        "_cs_achievements",
+        "_cs_labels_added",
+        "_cs_labels_removed",
+    )
+
+    @property
+    def player(self) -> "Player":
+        """:class:`Player`: The player that was just fetched."""
+        return self.live
+
+    @staticmethod
+    def _changed_units(cached_units, units) -> list:
+        # a unit has changed if it's new, or if its level or whether it's active differ from the cached one.
+        cached = {(unit.name, unit.village): (unit.level, unit.is_active) for unit in cached_units}
+        return [unit for unit in units if cached.get((unit.name, unit.village)) != (unit.level, unit.is_active)]
+
+    @cached_property("_cs_troops")
+    def troops(self) -> List["Troop"]:
+        """List[:class:`Troop`]: The troops that were upgraded, unlocked or (de)activated."""
+        return self._changed_units(self.cached.troops, self.player.troops)
+
+    @cached_property("_cs_spells")
+    def spells(self) -> List["Spell"]:
+        """List[:class:`Spell`]: The spells that were upgraded or unlocked."""
+        return self._changed_units(self.cached.spells, self.player.spells)
+
+    @cached_property("_cs_heroes")
+    def heroes(self) -> List["Hero"]:
+        """List[:class:`Hero`]: The heroes that were upgraded or unlocked."""
+        return self._changed_units(self.cached.heroes, self.player.heroes)
+
+    @cached_property("_cs_pets")
+    def pets(self) -> List["Pet"]:
+        """List[:class:`Pet`]: The pets that were upgraded or unlocked."""
+        return self._changed_units(self.cached.pets, self.player.pets)
+
+    @cached_property("_cs_equipment")
+    def equipment(self) -> List["Equipment"]:
+        """List[:class:`Equipment`]: The hero equipment that was upgraded or unlocked."""
+        return self._changed_units(self.cached.equipment, self.player.equipment)
+
+    @cached_property("_cs_achievements")
+    def achievements(self) -> List["Achievement"]:
+        """List[:class:`Achievement`]: The achievements whose value or stars changed, or that are new."""
+        cached = {a.name: (a.stars, a.value) for a in self.cached.achievements}
+        return [a for a in self.player.achievements if cached.get(a.name) != (a.stars, a.value)]
+
+    @cached_property("_cs_labels_added")
+    def labels_added(self) -> List["Label"]:
+        """List[:class:`Label`]: The labels the player has added."""
+        cached = {label.id for label in self.cached.labels}
+        return [label for label in self.player.labels if label.id not in cached]
+
+    @cached_property("_cs_labels_removed")
+    def labels_removed(self) -> List["Label"]:
+        """List[:class:`Label`]: The labels the player has removed."""
+        current = {label.id for label in self.player.labels}
+        return [label for label in self.cached.labels if label.id not in current]
+
+    @property
+    def joined_clan(self) -> bool:
+        """:class:`bool`: Whether the player is in a clan they weren't in before."""
+        return self.player.clan is not None and (self.cached.clan is None or self.cached.clan != self.player.clan)
+
+    @property
+    def left_clan(self) -> bool:
+        """:class:`bool`: Whether the player is no longer in the clan they were in before."""
+        return self.cached.clan is not None and (self.player.clan is None or self.cached.clan != self.player.clan)
+
+
+def _attack_key(attack):
+    # attacks don't have an ID, so they're told apart by who made them and how they went.
+    # identical attacks on the same district are counted rather than matched, see RaidDiff._compare.
+    return attack.attacker_tag, attack.destruction, attack.stars
+
+
+class RaidDiff(SnapshotDiff):
+    """The changes between 2 snapshots of the same clan's raid weekend.
+
+    The members, attack log and districts of both are walked once, the first time any of the changes is needed,
+    and every raid event of the update shares the result. If the 2 snapshots are of different raid weekends,
+    everything in the new one counts as new.
+    """
+
+    __slots__ = ("_attacks", "_destroyed_districts", "_member_loot")
+
+    def __init__(self, cached, live):
+        super().__init__(cached, live)
+        self._attacks = None
+        self._destroyed_districts = None
+        self._member_loot = None
+
+    @property
+    def raid(self) -> "RaidLogEntry":
+        """:class:`RaidLogEntry`: The raid weekend that was just fetched."""
+        return self.live
+
+    @property
+    def new_raid(self) -> bool:
+        """:class:`bool`: Whether the raid weekend that was just fetched isn't the one from the previous update."""
+        return self.cached is None or self.cached.start_time != self.live.start_time
+
+    @property
+    def finished(self) -> bool:
+        """:class:`bool`: Whether the raid weekend has ended since the previous update."""
+        return not self.new_raid and self.cached.state != "ended" and self.live.state == "ended"
+
+    @property
+    def attacks(self) -> List["RaidAttack"]:
+        """List[:class:`RaidAttack`]: The attacks made since the previous update."""
+        if self._attacks is None:
+            self._compare()
+        return self._attacks
+
+    @property
+    def destroyed_districts(self) -> List["RaidDistrict"]:
+        """List[:class:`RaidDistrict`]: The districts that have been destroyed since the previous update."""
+        if self._destroyed_districts is None:
+            self._compare()
+        return self._destroyed_districts
+
+    @property
+    def member_loot(self) -> List[Tuple[Optional["RaidMember"], "RaidMember"]]:
+        """List[Tuple[Optional[:class:`RaidMember`], :class:`RaidMember`]]: The ``(old, new)`` members whose capital
+        resources looted have changed since the previous update. ``old`` is ``None`` for a member's first attack."""
+        if self._member_loot is None:
+            self._compare()
+        return self._member_loot
+
+    def _compare(self):
+        # (raid clan tag, its index in the attack log, district ID): the attacks on it, and whether it was destroyed.
+        cached_districts = {}
+        cached_members = {}
+        if not self.new_raid:
+            for raid_clan in self.cached.attack_log:
+                for district in raid_clan.districts:
+                    cached_districts[(raid_clan.tag, raid_clan.index, district.id)] = (
+                        Counter(_attack_key(attack) for attack in district.attacks),
+                        district.destruction == 100,
+                    )
+            cached_members = {member.tag: member for member in self.cached.members}
+
+        attacks, destroyed = [], []
+        for raid_clan in self.live.attack_log:
+            for district in raid_clan.districts:
+                district_key = (raid_clan.tag, raid_clan.index, district.id)
+                seen, was_destroyed = cached_districts.get(district_key, (Counter(), False))
+                if district.destruction == 100 and not was_destroyed:
+                    destroyed.append(district)
+                for attack in district.attacks:
+                    key = _attack_key(attack)
+                    if seen[key]:
+                        seen[key] -= 1
+                    else:
+                        attacks.append(attack)
+
+        member_loot = []
+        for member in self.live.members:
+            cached_member = cached_members.get(member.tag)
+            cached_loot = cached_member.capital_resources_looted if cached_member is not None else 0
+            if member.capital_resources_looted != cached_loot:
+                member_loot.append((cached_member, member))
+
+        self._attacks, self._destroyed_districts, self._member_loot = attacks, destroyed, member_loot
@@ -0,0 +1,286 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import logging
+
+from collections import deque
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_LISTENER_WORKERS = 50
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_DELAY = 1.0
+
+
+class ListenerDispatcher:
+    """Runs event listeners in a bounded pool of tasks, so that slow listeners don't hold up polling.
+
+    Parameters
+    -----------
+    workers:
+        :class:`int` - The max number of listeners to run at once.
+    timeout:
+        Optional[:class:`float`] - The max number of seconds a listener may run for before it is cancelled.
+        Defaults to ``None``, which is no timeout.
+    queue_size:
+        :class:`int` - The max number of listeners waiting to run. Once reached, :meth:`ListenerDispatcher.submit`
+        waits for a listener to finish, which slows polling down to the speed of the listeners.
+    ordered:
+        :class:`bool` - Whether listeners for the same key, ie. a tag, run one after another in the order they were
+        submitted. Listeners for different keys always run concurrently.
+    on_error:
+        Optional[Callable] - Called with any exception raised by a listener, including :exc:`asyncio.TimeoutError`.
+    on_finish:
+        Optional[Callable] - Called with the key of every listener that finishes, and the number of seconds it ran for.
+
+    Attributes
+    -----------
+    depth:
+        :class:`int` - The number of listeners waiting to run.
+    max_depth:
+        :class:`int` - The highest ``depth`` seen so far.
+    running:
+        :class:`int` - The number of listeners running right now.
+    completed:
+        :class:`int` - The number of listeners that have finished, including any that failed.
+    errors:
+        :class:`int` - The number of listeners that raised an exception.
+    timeouts:
+        :class:`int` - The number of listeners that were cancelled for running longer than ``timeout``.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_LISTENER_WORKERS,
+        timeout: Optional[float] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        ordered: bool = True,
+        on_error: Optional[Callable[[BaseException], Any]] = None,
+        on_finish: Optional[Callable[[Hashable, float], Any]] = None,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.ordered = ordered
+        self.on_error = on_error
+        self.on_finish = on_finish
+
+        self._queue = None
+        self._capacity = None
+        self._tasks = []
+        # key: listeners waiting for the one currently running for that key to finish.
+        self._pending: Dict[Hashable, deque] = {}
+
+        self.depth = 0
+        self.running = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.max_depth = 0
+
+    def __repr__(self):
+        return "<%s depth=%s running=%s>" % (self.__class__.__name__, self.depth, self.running)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Dict[:class:`str`, :class:`int`]: A snapshot of the queue depth and listener counters."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "running": self.running,
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        self._capacity = asyncio.Semaphore(self.queue_size)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, key: Hashable, listener: Callable[..., Awaitable], *args) -> None:
+        """Queue a listener to be called with ``args``. This only waits if the queue is full."""
+        if not self._tasks:
+            self._start()
+
+        await self._capacity.acquire()
+        job = (listener, args)
+        if self.ordered and key in self._pending:
+            # a listener for this key is already running, so this one goes after it.
+            self._pending[key].append(job)
+        else:
+            if self.ordered:
+                self._pending[key] = deque()
+            self._queue.put_nowait((key, job))
+
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    async def join(self) -> None:
+        """Wait until every listener submitted so far has finished."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _work(self):
+        while True:
+            key, job = await self._queue.get()
+            try:
+                await self._run(key, job)
+                if self.ordered:
+                    pending = self._pending.get(key)
+                    while pending:
+                        await self._run(key, pending.popleft())
+                    self._pending.pop(key, None)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, key, job):
+        # pylint: disable=broad-except
+        listener, args = job
+        self.depth -= 1
+        self.running += 1
+        start = monotonic()
+        try:
+            await asyncio.wait_for(listener(*args), timeout=self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError as exception:
+            self.timeouts += 1
+            self._handle_error(exception)
+        except Exception as exception:
+            self.errors += 1
+            self._handle_error(exception)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._capacity.release()
+            if self.on_finish:
+                self.on_finish(key, monotonic() - start)
+
+    def _handle_error(self, exception):
+        if self.on_error:
+            self.on_error(exception)
+        else:
+            LOG.exception("Ignoring exception in a listener", exc_info=exception)
+
+    def close(self) -> None:
+        """Cancel every running listener and drop any waiting ones."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+        self.depth = self.running = 0
+
+
+class BatchedEvent(NamedTuple):
+    """An event that fired for a batched listener.
+
+    Attributes
+    -----------
+    event:
+        :class:`str` - The name of the event, ie. ``trophies`` or ``member_join``.
+    cached:
+        The clan, player or war from the previous update.
+    current:
+        The clan, player or war that was just fetched.
+    args:
+        :class:`tuple` - The arguments the event would have passed to a regular listener, ie. ``(member, clan)``.
+    """
+
+    event: str
+    cached: Any
+    current: Any
+    args: tuple
+
+
+class EventBatcher:
+    """Collects the events of a batched listener, and passes them to it as a list of :class:`BatchedEvent`.
+
+    A batch is delivered once it has ``max_size`` events, ``max_delay`` seconds after its first event, or when
+    :meth:`EventBatcher.flush` is called, whichever comes first.
+
+    Parameters
+    -----------
+    callback:
+        The coroutine function called with every batch.
+    max_size:
+        :class:`int` - The max number of events in a batch.
+    max_delay:
+        Optional[:class:`float`] - The max number of seconds an event waits to be delivered.
+        ``None`` means events are only delivered when a batch is full, or is flushed.
+    deliver:
+        Optional[Callable] - The coroutine function batches are passed to, instead of ``callback``.
+        This is used to deliver batches through a :class:`ListenerDispatcher`.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[BatchedEvent]], Awaitable],
+        max_size: int = DEFAULT_BATCH_SIZE,
+        max_delay: Optional[float] = DEFAULT_BATCH_DELAY,
+        deliver: Optional[Callable[[List[BatchedEvent]], Awaitable]] = None,
+    ):
+        self.callback = callback
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.deliver = deliver or callback
+
+        self._events: List[BatchedEvent] = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def __repr__(self):
+        return "<%s events=%s>" % (self.__class__.__name__, len(self))
+
+    async def collect(self, event: str, cached, current, *args) -> None:
+        """Add an event to the current batch, delivering it if it's full."""
+        self._events.append(BatchedEvent(event, cached, current, args))
+        if len(self._events) >= self.max_size:
+            await self.flush()
+        elif self._timer is None and self.max_delay is not None:
+            self._timer = asyncio.get_event_loop().call_later(self.max_delay, self._flush_later)
+
+    def _flush_later(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    def drain(self) -> List[BatchedEvent]:
+        """Remove and return the events of the current batch, without delivering them."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        events, self._events = self._events, []
+        return events
+
+    async def flush(self) -> None:
+        """Deliver the current batch, if there are any events in it."""
+        events = self.drain()
+        if events:
+            await self.deliver(events)
@@ -22,23 +22,102 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import asyncio
+import functools
 import logging
+import math
 import traceback
 
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from time import monotonic
+from operator import itemgetter
 from datetime import datetime, timedelta, timezone
+from typing import Dict
 
 import coc.raid
 from .client import Client
 from .clans import Clan
+from .cwl import LeagueRequestCache
+from .diff import PlayerDiff, RaidDiff, SnapshotDiff
+from .dispatcher import (
+    EventBatcher,
+    ListenerDispatcher,
+    DEFAULT_BATCH_DELAY,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_LISTENER_WORKERS,
+    DEFAULT_QUEUE_SIZE,
+)
 from .enums import WarRound
-from .players import Player
 from .wars import ClanWar
 from .errors import Maintenance, PrivateWarLog
-from .utils import correct_tag, get_season_end, get_clan_games_start, get_clan_games_end
+from .executor import ListenerExecutors, LoopLagMonitor
+from .metrics import UpdaterMetrics
+from .scheduler import ClockScheduler, PollScheduler, DEFAULT_WORKERS
+from .sharding import ShardRouter
+from .sinks import DEFAULT_CLOSE_TIMEOUT
+from .persistence import SnapshotRecord
+from .planner import CapacityPlan, plan_capacity, tune_retry_intervals
+from .snapshots import CompactSnapshotStore, ModelStore
+from .utils import (
+    correct_tag,
+    get_clan_games_end,
+    get_clan_games_start,
+    get_cwl_start,
+    get_raid_weekend_end,
+    get_season_start,
+)
 
 LOG = logging.getLogger(__name__)
 DEFAULT_SLEEP = 10
+DEFAULT_CHECKPOINT_INTERVAL = 300
+DEFAULT_CAPACITY_TARGET = 0.9
+DEFAULT_PLANNER_INTERVAL = 60
+DEFAULT_METRICS_INTERVAL = 60
+DEFAULT_LOOP_LAG_INTERVAL = 1.0
+RAID_IDLE_SLEEP = 60 * 60
+
+#: The player attributes that are also in a clan's member list, so their events can be worked out from clan updates.
+MEMBER_FIELDS = frozenset((
+    "name", "exp_level", "trophies", "builder_base_trophies", "donations", "received", "role", "league",
+    "builder_base_league", "town_hall", "clan_rank", "clan_previous_rank", "builder_base_rank",
+))
+
+MAINTENANCE_EVENTS = ("maintenance_start", "maintenance_completion")
+RAID_WEEKEND_EVENTS = ("raid_weekend_start", "raid_weekend_end")
+
+
+def _next_season_start(after):
+    # a season ends when the next one starts, on the last monday of the month.
+    start = get_season_start(after.month, after.year)
+    if start <= after:
+        month, year = (1, after.year + 1) if after.month == 12 else (after.month + 1, after.year)
+        start = get_season_start(month, year)
+    return start
+
+
+def _strictly_after(function):
+    # the clan games helpers return the running clan games, which may have already started or ended.
+    def next_time(after):
+        time = function(after)
+        return time if time > after else function(after + timedelta(days=7))
+
+    return next_time
+
+
+def _seconds_until_raid_weekend(now=None):
+    # 0 during a raid weekend.
+    now = now or datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    start = get_raid_weekend_end(now) - timedelta(days=3)
+    return max((start - now).total_seconds(), 0.0)
+
+
+# client events that are worked out from the clock, and when they're next due.
+CLOCK_EVENTS = {
+    "new_season_start": _next_season_start,
+    "clan_games_start": _strictly_after(get_clan_games_start),
+    "clan_games_end": _strictly_after(get_clan_games_end),
+}
 
 
 class Event:
@@ -47,19 +126,33 @@ class Event:
     tags and type.
     """
 
-    __slots__ = ("runner", "callback", "tags", "type")
+    __slots__ = ("runner", "callback", "tags", "type", "field", "name", "batcher")
 
-    def __init__(self, runner, callback, tags, type_):
+    def __init__(self, runner, callback, tags, type_, batcher=None):
         self.runner = runner
         self.callback = callback
         self.tags = tags
         self.type = type_
+        # the attribute this event watches, if it only ever fires when that attribute changes.
+        self.field = getattr(runner, "event_field", None)
+        self.name = getattr(runner, "event_name", "")
+        # batched events are collected by this, rather than calling the callback.
+        self.batcher = batcher
+
+    def __call__(self, cached, current, diff=None):
+        callback = self.callback
+        if self.batcher is not None:
+            callback = functools.partial(self.batcher.collect, self.name, cached, current)
 
-    def __call__(self, cached, current):
-        return self.runner(cached, current, self.callback)
+        if diff is not None and getattr(self.runner, "uses_diff", False):
+            return self.runner(cached, current, callback, diff)
+        return self.runner(cached, current, callback)
 
     def __eq__(self, other):
-        return isinstance(self, other.__class__) and self.runner == other.runner and self.callback == other.callback
+        # listeners that run in an executor are wrapped, but are still equal to the function they wrap.
+        return isinstance(self, other.__class__) and self.runner == other.runner \
+            and getattr(self.callback, "__wrapped__", self.callback) \
+            == getattr(other.callback, "__wrapped__", other.callback)
 
     @classmethod
     def from_decorator(cls, func, runner):
@@ -67,6 +160,66 @@ class Event:
         return cls(runner, func, func.event_tags, func.event_type)
 
 
+class ListenerIndex:
+    """Routes an update to the events that could fire for it.
+
+    Events are indexed by the attribute they watch and by tag, so that an update only runs the events
+    whose attribute has changed and whose tags match. Events that don't watch a single attribute,
+    ie. ``member_join`` or custom events, are run for every update of a matching tag.
+    """
+
+    __slots__ = ("_fields", "_always", "_counter")
+
+    def __init__(self):
+        # field: {tag: [(order, event)]}, where a tag of ``None`` matches every tag.
+        self._fields = {}
+        self._always = {}
+        self._counter = count()
+
+    def __len__(self):
+        return sum(len(events) for by_tag in self._iter_indexes() for events in by_tag.values())
+
+    def _iter_indexes(self):
+        yield self._always
+        yield from self._fields.values()
+
+    def add(self, event: Event) -> None:
+        """Add an event to the index."""
+        by_tag = self._always if event.field is None else self._fields.setdefault(event.field, {})
+        entry = (next(self._counter), event)
+        for tag in set(event.tags or (None, )):
+            by_tag.setdefault(tag, []).append(entry)
+
+    def remove(self, event: Event) -> None:
+        """Remove an event from the index."""
+        by_tag = self._always if event.field is None else self._fields.get(event.field, {})
+        for tag in set(event.tags or (None, )):
+            entries = by_tag.get(tag, [])
+            for entry in entries:
+                if entry[1] == event:
+                    entries.remove(entry)
+                    break
+            if not entries:
+                by_tag.pop(tag, None)
+
+        if event.field is not None and not by_tag:
+            self._fields.pop(event.field, None)
+
+    def get(self, tag: str, diff: SnapshotDiff) -> list:
+        """Get the events to run for an update of a tag, in the order they were added."""
+        entries = []
+        for field, by_tag in self._fields.items():
+            if (None in by_tag or tag in by_tag) and diff.get_field(field) is not None:
+                entries.extend(by_tag.get(None, ()))
+                entries.extend(by_tag.get(tag, ()))
+
+        entries.extend(self._always.get(None, ()))
+        entries.extend(self._always.get(tag, ()))
+        if len(entries) > 1:
+            entries.sort(key=itemgetter(0))
+        return [event for _, event in entries]
+
+
 class _ValidateEvent:
     """Helper class to validate and register a function as an event."""
 
@@ -107,11 +260,11 @@ class _ValidateEvent:
 
             def decorator(func):
                 if nested:
-                    wrap = _ValidateEvent.wrap_clan_member_pred
+                    runner = _ValidateEvent.wrap_clan_member_pred(pred)
                 else:
-                    wrap = _ValidateEvent.wrap_pred
+                    runner = _ValidateEvent.wrap_field(item)
                 return _ValidateEvent.register_event(
-                    func, wrap(pred), tags, custom_class, retry_interval, self.cls.event_type, item
+                    func, runner, tags, custom_class, retry_interval, self.cls.event_type, item
                 )
 
             return decorator
@@ -137,6 +290,27 @@ class _ValidateEvent:
 
         return wrapped
 
+    @staticmethod
+    def uses_diff(runner):
+        """Marks an event runner as taking the :class:`SnapshotDiff` shared by every listener of an update."""
+        runner.uses_diff = True
+        return runner
+
+    @staticmethod
+    def wrap_field(item):
+        """Wraps an attribute in a coroutine that awaits the callback if the attribute has changed."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached, live, callback, diff=None):
+            if diff is None:
+                diff = SnapshotDiff(cached, live)
+            if diff.get_field(item) is not None:
+                await callback(cached, live)
+
+        # lets the client skip this event altogether when the attribute hasn't changed.
+        wrapped.event_field = item
+        return wrapped
+
     @staticmethod
     def wrap_clan_member_pred(pred):
         """Wraps a predicate for a clan member (ie nested) attribute from clan objects, and calls the callback."""
@@ -158,8 +332,8 @@ class _ValidateEvent:
         if getattr(func, "is_event_listener", False) and func.event_type != event_type:
             raise RuntimeError("maximum of one event type per callback function.")
 
-        if not asyncio.iscoroutinefunction(func):
-            raise TypeError("callback function must be of type coroutine.")
+        if not callable(func):
+            raise TypeError("callback function must be callable.")
 
         if not tags:
             tags = ()
@@ -176,6 +350,9 @@ class _ValidateEvent:
         if not asyncio.iscoroutinefunction(runner):
             raise TypeError("runner function must be of type coroutine")
 
+        # shortcut events don't pass a name, so use the name of the classmethod that made the runner.
+        runner.event_name = event_name or runner.__qualname__.split(".<locals>")[0].rsplit(".", 1)[-1]
+
         func.event_type = event_type
         func.event_tags = tags
         func.is_event_listener = True
@@ -229,7 +406,11 @@ class ClanEvents:
 
 @_ValidateEvent
 class PlayerEvents:
-    """Class that defines all valid player events."""
+    """Class that defines all valid player events.
+
+    Listeners are passed objects of the client's ``player_cls``, unless ``member_player_events`` is on and the event
+    comes from a tracked clan's member list, when they're passed :class:`ClanMember` objects instead.
+    """
 
     event_type = "player"
 
@@ -237,9 +418,11 @@ class PlayerEvents:
     def achievement_change(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has increased the value of an achievement."""
 
-        async def wrapped(cached_player, player, callback):
-            achievement_updates = (n for n in player.achievements if n not in set(cached_player.achievements))
-            for achievement in achievement_updates:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for achievement in diff.achievements:
                 await callback(cached_player, player, achievement)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -248,9 +431,11 @@ class PlayerEvents:
     def troop_change(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has upgraded or unlocked a troop."""
 
-        async def wrapped(cached_player, player, callback):
-            troop_upgrades = (n for n in player.troops if n not in set(cached_player.troops))
-            for troop in troop_upgrades:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for troop in diff.troops:
                 await callback(cached_player, player, troop)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -259,9 +444,11 @@ class PlayerEvents:
     def spell_change(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has upgraded or unlocked a spell."""
 
-        async def wrapped(cached_player, player, callback):
-            spell_upgrades = (n for n in player.spells if n not in set(cached_player.spells))
-            for spell in spell_upgrades:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for spell in diff.spells:
                 await callback(cached_player, player, spell)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -270,20 +457,37 @@ class PlayerEvents:
     def hero_change(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has upgraded or unlocked a hero."""
 
-        async def wrapped(cached_player, player, callback):
-            hero_upgrades = (n for n in player.heroes if n not in set(cached_player.heroes))
-            for hero in hero_upgrades:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for hero in diff.heroes:
                 await callback(cached_player, player, hero)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
 
+    @classmethod
+    def pet_change(cls, tags=None, custom_class=None, retry_interval=None):
+        """Event for when a player has upgraded or unlocked a pet."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for pet in diff.pets:
+                await callback(cached_player, player, pet)
+
+        return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
+
     @classmethod
     def equipment_change(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has upgraded or unlocked an equipment."""
 
-        async def wrapped(cached_player, player, callback):
-            equipment_upgrades = (n for n in player.equipment if n not in set(cached_player.equipment))
-            for equipment in equipment_upgrades:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            for equipment in diff.equipment:
                 await callback(cached_player, player, equipment)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -307,10 +511,11 @@ class PlayerEvents:
     def joined_clan(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has joined a new clan."""
 
-        async def wrapped(cached_player, player, callback):
-            if cached_player.clan is None and player.clan is not None:
-                await callback(cached_player, player)
-            elif cached_player.clan is not None and player.clan is not None and cached_player.clan != player.clan:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            if diff.joined_clan:
                 await callback(cached_player, player)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -319,10 +524,11 @@ class PlayerEvents:
     def left_clan(cls, tags=None, custom_class=None, retry_interval=None):
         """Event for when a player has joined a new clan."""
 
-        async def wrapped(cached_player, player, callback):
-            if cached_player.clan is not None and player.clan is None:
-                await callback(cached_player, player)
-            elif cached_player.clan and player.clan and cached_player.clan.tag != player.clan.tag:
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_player, player, callback, diff=None):
+            if diff is None:
+                diff = PlayerDiff(cached_player, player)
+            if diff.left_clan:
                 await callback(cached_player, player)
 
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, PlayerEvents.event_type)
@@ -393,6 +599,66 @@ class WarEvents:
         return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, WarEvents.event_type)
 
 
+@_ValidateEvent
+class RaidEvents:
+    """Class that defines all valid capital raid weekend events, for the clans added with
+    :meth:`EventsClient.add_raid_updates`."""
+
+    event_type = "raid"
+
+    @classmethod
+    def raid_attack(cls, tags=None, custom_class=None, retry_interval=None):
+        """Event for when a member has made a capital raid attack."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_raid, raid, callback, diff=None):
+            if diff is None:
+                diff = RaidDiff(cached_raid, raid)
+            for attack in diff.attacks:
+                await callback(attack, raid)
+
+        return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, RaidEvents.event_type)
+
+    @classmethod
+    def district_destroyed(cls, tags=None, custom_class=None, retry_interval=None):
+        """Event for when an enemy district has been destroyed."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_raid, raid, callback, diff=None):
+            if diff is None:
+                diff = RaidDiff(cached_raid, raid)
+            for district in diff.destroyed_districts:
+                await callback(district, raid)
+
+        return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, RaidEvents.event_type)
+
+    @classmethod
+    def member_loot_change(cls, tags=None, custom_class=None, retry_interval=None):
+        """Event for when a member's capital resources looted have changed."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_raid, raid, callback, diff=None):
+            if diff is None:
+                diff = RaidDiff(cached_raid, raid)
+            for cached_member, member in diff.member_loot:
+                await callback(cached_member, member)
+
+        return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, RaidEvents.event_type)
+
+    @classmethod
+    def raid_finished(cls, tags=None, custom_class=None, retry_interval=None):
+        """Event for when a raid weekend has ended."""
+
+        @_ValidateEvent.uses_diff
+        async def wrapped(cached_raid, raid, callback, diff=None):
+            if diff is None:
+                diff = RaidDiff(cached_raid, raid)
+            if diff.finished:
+                await callback(raid)
+
+        return _ValidateEvent.shortcut_register(wrapped, tags, custom_class, retry_interval, RaidEvents.event_type)
+
+
 @_ValidateEvent
 class ClientEvents:
     """Class that defines all valid client/misc events."""
@@ -417,6 +683,34 @@ class EventsClient(Client):
 
     def __init__(self, **options):
         super().__init__(**options)
+        self.poll_workers = options.pop("poll_workers", DEFAULT_WORKERS)
+        self.poll_policy = options.pop("poll_policy", None)
+        self.listener_workers = options.pop("listener_workers", DEFAULT_LISTENER_WORKERS)
+        self.listener_timeout = options.pop("listener_timeout", None)
+        self.listener_queue_size = options.pop("listener_queue_size", DEFAULT_QUEUE_SIZE)
+        self.ordered_listeners = options.pop("ordered_listeners", True)
+        self.executor_workers = options.pop("executor_workers", None)
+        self.loop_lag_interval = options.pop("loop_lag_interval", None)
+        self.member_player_events = options.pop("member_player_events", False)
+        self.compact_snapshots = options.pop("compact_snapshots", False)
+        self.snapshot_persistence = options.pop("snapshot_persistence", None)
+        self.checkpoint_interval = options.pop("checkpoint_interval", DEFAULT_CHECKPOINT_INTERVAL)
+        self.shard_id = options.pop("shard_id", None)
+        self.auto_tune_intervals = options.pop("auto_tune_intervals", False)
+        self.capacity_target = options.pop("capacity_target", DEFAULT_CAPACITY_TARGET)
+        self.planner_interval = options.pop("planner_interval", DEFAULT_PLANNER_INTERVAL)
+        self.metrics_interval = options.pop("metrics_interval", DEFAULT_METRICS_INTERVAL)
+        self.recorder = options.pop("recorder", None)
+        self.event_pipeline = options.pop("event_pipeline", None)
+        self.event_pipeline_close_timeout = options.pop("event_pipeline_close_timeout", DEFAULT_CLOSE_TIMEOUT)
+        self._replaying = False
+        shards = options.pop("shards", None)
+        self.shard_router = ShardRouter(shards) if shards is not None else None
+        if self.shard_router is not None and self.shard_id not in self.shard_router:
+            raise ValueError("shard_id {!r} isn't one of the shards".format(self.shard_id))
+        if self.compact_snapshots or self.snapshot_persistence is not None or self.recorder is not None:
+            # they all keep responses rather than objects.
+            self.raw_attribute = True
         self._setup()
 
         self._in_maintenance_event = asyncio.Event()
@@ -427,43 +721,109 @@ class EventsClient(Client):
         self.clan_retry_interval = 0
         self.player_retry_interval = 0
         self.war_retry_interval = 0
+        self.raid_retry_interval = 0
+        # the retry intervals listeners asked for, which tuning never goes below.
+        self._retry_floors = {"clan": 0, "player": 0, "war": 0, "raid": 0}
 
         self.clan_cls = self.objects_cls['Clan']
         self.player_cls = self.objects_cls['Player']
         self.war_cls = self.objects_cls['ClanWar']
+        self.raid_cls = self.objects_cls['RaidLogEntry']
 
         self.clan_loops_run = 0
         self.player_loops_run = 0
         self.war_loops_run = 0
+        self.raid_loops_run = 0
 
         self.is_cwl_active = options.pop("cwl_active", True)
         self.check_cwl_prep = options.pop("check_cwl_prep", False)
 
-        self._locks = {}
+        # the number of updates skipped because the response was identical to the cached one.
+        self.skipped_updates = {"clan": 0, "player": 0, "war": 0, "raid": 0}
 
     def _setup(self):
-        self._updater_tasks = {
-            "clan": self.loop.create_task(self._clan_updater()),
-            "player": self.loop.create_task(self._player_updater()),
-            "war": self.loop.create_task(self._war_updater()),
-            "maintenance": self.loop.create_task(self._maintenance_poller()),
-            "season": self.loop.create_task(self._end_of_season_poller()),
-            "raid_weekend": self.loop.create_task(self._raid_poller()),
-            "clan_games": self.loop.create_task(self._clan_games_poller())
-        }
+        def on_error(exception):
+            self.dispatch("event_error", exception)
 
-        for task in self._updater_tasks.values():
-            task.add_done_callback(self._task_callback_check)
+        def on_update_error(type_, exception):
+            self._metrics[type_].record_error(exception)
+            on_error(exception)
+
+        def on_finish(key, seconds):
+            # every listener is submitted with the type of tag it's for first.
+            metrics = self._metrics.get(key[0])
+            if metrics is not None:
+                metrics.record_listener(seconds)
+
+        self._metrics = {type_: UpdaterMetrics() for type_ in ("clan", "player", "war", "raid")}
+        # tags are never refreshed more than once every DEFAULT_SLEEP seconds, ie. when there's no cache header.
+        self._schedulers = {
+            type_: PollScheduler(
+                worker, self.poll_workers, DEFAULT_SLEEP, functools.partial(on_update_error, type_), DEFAULT_SLEEP
+            )
+            for type_, worker in (
+                ("clan", self._run_clan_update),
+                ("player", self._run_player_update),
+                ("war", self._run_war_updates),
+                ("raid", self._run_raid_update),
+            )
+        }
+        # listeners run in their own pool of tasks, so a slow listener doesn't hold up refreshing other tags.
+        self._dispatcher = ListenerDispatcher(
+            self.listener_workers,
+            self.listener_timeout,
+            self.listener_queue_size,
+            self.ordered_listeners,
+            on_error,
+            on_finish,
+        )
+        self._executors = ListenerExecutors(self.executor_workers)
+        self._loop_lag = LoopLagMonitor(self.loop_lag_interval or DEFAULT_LOOP_LAG_INTERVAL)
+        # the lag is only measured once it's asked for, so an idle client doesn't wake up the loop.
+        self._watch_loop_lag = self.loop_lag_interval is not None
+        # updates wait for the snapshots from before a restart, so the first one is compared to them.
+        self._snapshots_restored = asyncio.Event()
+
+        # the season and clan games events are worked out from the clock, so they share a task that's rarely awake.
+        self._clock = ClockScheduler()
+
+        # the rest of the pollers are only started once a tag or listener needs them, see _refresh_pollers.
+        self._updater_tasks = {}
+        if self._watch_loop_lag:
+            self._start_poller("loop_lag")
+        if self.snapshot_persistence is not None:
+            # a single thread means the persistence is never called concurrently.
+            self._persistence_executor = ThreadPoolExecutor(1, thread_name_prefix="coc-snapshots")
+            self._start_poller("snapshots")
+        else:
+            self._snapshots_restored.set()
 
         self._clan_updates = set()
         self._player_updates = set()
         self._war_updates = set()
+        self._raid_updates = set()
+        # tags that were added, but are refreshed by another shard.
+        self._unowned = {"clan": set(), "player": set(), "war": set(), "raid": set()}
 
-        self._listeners = {"clan": [], "player": [], "war": [], "client": {}}
-
-        self._clans = {}
-        self._players = {}
-        self._wars = {}
+        self._listeners = {"clan": [], "player": [], "war": [], "raid": [], "client": {}}
+        self._listener_index = {
+            "clan": ListenerIndex(), "player": ListenerIndex(), "war": ListenerIndex(), "raid": ListenerIndex()
+        }
+        self._batchers = {"clan": {}, "player": {}, "war": {}, "raid": {}}
+        # player tag: the tag of the tracked clan they were last seen in.
+        self._member_clans = {}
+        # clans in the same league group share its requests during a war loop.
+        self._league_requests = LeagueRequestCache()
+
+        store_cls = CompactSnapshotStore if self.compact_snapshots else ModelStore
+        self._stores = {type_: store_cls(self) for type_ in ("clan", "player", "war", "raid")}
+        # raid log entries don't keep the fingerprint of their response, so it's kept here instead.
+        self._raid_fingerprints = {}
+        # the tags whose snapshots have changed or been removed since the last checkpoint.
+        self._unsaved = {"clan": set(), "player": set(), "war": set(), "raid": set()}
+        self._removed = {"clan": set(), "player": set(), "war": set(), "raid": set()}
+        # (type, tag): when the restored snapshot of a tag that isn't tracked yet goes stale.
+        self._restored_expiry = {}
 
     def add_clan_updates(self, *tags):
         """Add clan tags to receive updates for.
@@ -485,7 +845,14 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("clan tag must be of type str not {0!r}".format(tag))
-            self._clan_updates.add(correct_tag(tag))
+            tag = correct_tag(tag)
+            if not self.owns_tag(tag):
+                # another shard refreshes it, but it's kept in case the shards change.
+                self._unowned["clan"].add(tag)
+                continue
+            self._clan_updates.add(tag)
+            self._schedulers["clan"].add(tag, self._restored_delay("clan", tag))
+        self._refresh_pollers()
 
     def remove_clan_updates(self, *tags):
         """Remove clan tags that you receive events updates for.
@@ -507,11 +874,21 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("clan tag must be of type str not {0!r}".format(tag))
+            self._unowned["clan"].discard(correct_tag(tag))
             try:
                 self._clan_updates.remove(correct_tag(tag))
+                self._schedulers["clan"].remove(correct_tag(tag))
+                self._remove_snapshot("clan", correct_tag(tag))
+                if self.poll_policy is not None:
+                    self.poll_policy.remove("clan", correct_tag(tag))
             except KeyError:
                 pass  # tag didn't exist to start with
 
+            # the clan's members have to be requested again.
+            for player_tag in [k for k, v in self._member_clans.items() if v == correct_tag(tag)]:
+                del self._member_clans[player_tag]
+        self._refresh_pollers()
+
     def add_player_updates(self, *tags):
         r"""Add player tags to receive events for.
 
@@ -533,7 +910,14 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("player tag must be of type str not {0!r}".format(tag))
-            self._player_updates.add(correct_tag(tag))
+            tag = correct_tag(tag)
+            if not self.owns_tag(tag):
+                # another shard refreshes it, but it's kept in case the shards change.
+                self._unowned["player"].add(tag)
+                continue
+            self._player_updates.add(tag)
+            self._schedulers["player"].add(tag, self._restored_delay("player", tag))
+        self._refresh_pollers()
 
     def remove_player_updates(self, *tags):
         r"""Remove player tags that you receive events updates for.
@@ -556,10 +940,17 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("player tag must be of type str not {0!r}".format(tag))
+            self._unowned["player"].discard(correct_tag(tag))
             try:
                 self._player_updates.remove(correct_tag(tag))
+                self._schedulers["player"].remove(correct_tag(tag))
+                self._remove_snapshot("player", correct_tag(tag))
+                self._member_clans.pop(correct_tag(tag), None)
+                if self.poll_policy is not None:
+                    self.poll_policy.remove("player", correct_tag(tag))
             except KeyError:
                 pass  # the tag was never added
+        self._refresh_pollers()
 
     def add_war_updates(self, *tags):
         r"""Add clan tags to receive war events for.
@@ -582,7 +973,14 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("clan war tags must be of type str not {0!r}".format(tag))
-            self._war_updates.add(correct_tag(tag))
+            tag = correct_tag(tag)
+            if not self.owns_tag(tag):
+                # another shard refreshes it, but it's kept in case the shards change.
+                self._unowned["war"].add(tag)
+                continue
+            self._war_updates.add(tag)
+            self._schedulers["war"].add(tag, self._restored_delay("war", tag))
+        self._refresh_pollers()
 
     def remove_war_updates(self, *tags):
         r"""Remove player tags that you receive events updates for.
@@ -605,39 +1003,125 @@ class EventsClient(Client):
         for tag in tags:
             if not isinstance(tag, str):
                 raise TypeError("clan war tags must be of type str not {0!r}".format(tag))
+            self._unowned["war"].discard(correct_tag(tag))
             try:
                 self._war_updates.remove(correct_tag(tag))
+                self._schedulers["war"].remove(correct_tag(tag))
+                self._remove_snapshot("war", correct_tag(tag))
+                self._league_requests.remove(correct_tag(tag))
+                if self.poll_policy is not None:
+                    for cwl_round in (WarRound.current_war, WarRound.current_preparation):
+                        self.poll_policy.remove("war", (correct_tag(tag), cwl_round))
+            except KeyError:
+                pass  # tag didn't exist to start with
+        self._refresh_pollers()
+
+    def add_raid_updates(self, *tags):
+        r"""Add clan tags to receive capital raid weekend events for.
+
+        Clans are only requested during the raid weekend, and once more after it to see how it ended.
+
+        Parameters
+        ----------
+        \\*tags : str
+            The clan tags to add that will receive raid events.
+            If you wish to pass in an iterable, you must unpack it with \*\.
+
+        Example
+        -------
+        .. code-block:: python3
+
+            client.add_raid_updates("#tag1", "#tag2", "#tag3")
+
+            tags = ["#tag4", "#tag5", "#tag6"]
+            client.add_raid_updates(*tags)
+        """
+        for tag in tags:
+            if not isinstance(tag, str):
+                raise TypeError("clan tags must be of type str not {0!r}".format(tag))
+            tag = correct_tag(tag)
+            if not self.owns_tag(tag):
+                # another shard refreshes it, but it's kept in case the shards change.
+                self._unowned["raid"].add(tag)
+                continue
+            self._raid_updates.add(tag)
+            self._schedulers["raid"].add(tag, self._restored_delay("raid", tag))
+        self._refresh_pollers()
+
+    def remove_raid_updates(self, *tags):
+        r"""Remove clan tags that you receive capital raid weekend events for.
+
+        Parameters
+        ----------
+        \\*tags : str
+            The clan tags to remove that will receive raid events.
+            If you wish to pass in an iterable, you must unpack it with \*\.
+
+        Example
+        -------
+        .. code-block:: python3
+
+            client.remove_raid_updates("#tag1", "#tag2", "#tag3")
+
+            tags = ["#tag4", "#tag5", "#tag6"]
+            client.remove_raid_updates(*tags)
+        """
+        for tag in tags:
+            if not isinstance(tag, str):
+                raise TypeError("clan tags must be of type str not {0!r}".format(tag))
+            tag = correct_tag(tag)
+            self._unowned["raid"].discard(tag)
+            try:
+                self._raid_updates.remove(tag)
+                self._schedulers["raid"].remove(tag)
+                self._remove_snapshot("raid", tag)
+                self._raid_fingerprints.pop(tag, None)
+                if self.poll_policy is not None:
+                    self.poll_policy.remove("raid", tag)
             except KeyError:
                 pass  # tag didn't exist to start with
+        self._refresh_pollers()
 
     def _get_cached_clan(self, clan_tag):
-        try:
-            return self._clans[clan_tag]
-        except KeyError:
-            return None
+        return self._stores["clan"].get(clan_tag)
 
     def _update_clan(self, clan):
-        self._clans[clan.tag] = clan
+        self._stores["clan"].set(clan.tag, clan)
+        self._snapshot_changed("clan", clan.tag)
 
     def _get_cached_player(self, player_tag):
-        try:
-            return self._players[player_tag]
-        except KeyError:
-            return None
+        return self._stores["player"].get(player_tag)
 
     def _update_player(self, player):
-        self._players[player.tag] = player
+        self._stores["player"].set(player.tag, player, load_game_data=player._load_game_data)
+        self._snapshot_changed("player", player.tag)
 
     def _get_cached_war(self, key):
-        try:
-            return self._wars[key]
-        except KeyError:
-            return None
+        return self._stores["war"].get(key)
 
     def _update_war(self, key, war):
-        self._wars[key] = war
+        # wars are built from the perspective of the clan, so it has to be the same if it's built again.
+        self._stores["war"].set(key, war, clan_tag=war.clan_tag)
+        self._snapshot_changed("war", key)
+
+    def _record(self, type_, tag, model, fingerprint=None):
+        # pylint: disable=protected-access
+        if self.recorder is None or model._raw_data is None:
+            return
+        data = model._raw_data
+        if fingerprint is not None and "_fingerprint" not in data:
+            # raids don't keep the fingerprint of the raid log they came from.
+            data = {**data, "_fingerprint": fingerprint}
+        self.recorder.record(type_, tag, data)
+
+    def _get_cached_raid(self, clan_tag):
+        return self._stores["raid"].get(clan_tag)
 
-    def event(self, function):
+    def _update_raid(self, clan_tag, raid):
+        self._stores["raid"].set(clan_tag, raid, clan_tag=clan_tag)
+        self._snapshot_changed("raid", clan_tag)
+
+    def event(self, function=None, *, executor=None, batch_size=None, batch_delay=None):
         """A decorator or regular function that registers an event.
 
         The function **may be** be a coroutine.
@@ -646,6 +1130,21 @@ class EventsClient(Client):
         ----------
         function : function
             The function to be registered (not needed if used with a decorator)
+        executor : Optional[Union[:class:`str`, :class:`concurrent.futures.Executor`]]
+            Run the function in a ``"thread"`` pool, a ``"process"`` pool or the given executor, instead of in the
+            event loop. Use this for CPU-heavy listeners, which would otherwise hold up every other listener and
+            request. The function is passed copies of the objects that have no client, see :class:`ModelSnapshot`.
+            For a ``"process"`` pool, it must be defined at the top level of a module.
+        batch_size : Optional[:class:`int`]
+            Pass the function a list of :class:`BatchedEvent` with at most this many events, rather than calling it
+            once per event. Batches are also delivered at the end of every loop of refreshes.
+            Defaults to 500 if only ``batch_delay`` is passed.
+        batch_delay : Optional[:class:`float`]
+            The max number of seconds an event of a batched listener waits to be delivered.
+            Defaults to 1 second if only ``batch_size`` is passed.
+
+        Player events are passed objects of the client's ``player_cls``. With ``member_player_events=True``, those
+        that come from a tracked clan's member list are passed :class:`ClanMember` objects instead.
 
         Example
         --------
@@ -672,6 +1171,21 @@ class EventsClient(Client):
             async def maintenance_has_started():
                 print('maintenance has started!')
 
+        .. code-block:: python3
+
+            @client.event(executor="process")
+            @coc.WarEvents.war_attack()
+            def render_attack(attack, war):
+                ...  # this doesn't block the event loop
+
+        .. code-block:: python3
+
+            @client.event(batch_size=500, batch_delay=1)
+            @coc.PlayerEvents.trophies_change()
+            @coc.PlayerEvents.donations_change()
+            async def save_events(events):
+                await db.insert_many((e.event, e.current.tag, e.current.trophies) for e in events)
+
         .. note::
 
             The order of decorators is important - the ``@client.event`` one must lay **above**
@@ -680,24 +1194,56 @@ class EventsClient(Client):
         --------
         function : The function registered
         """
+        if function is None:
+            return functools.partial(self.event, executor=executor, batch_size=batch_size, batch_delay=batch_delay)
+
+        callback = function
+        if executor is None and not asyncio.iscoroutinefunction(function):
+            raise TypeError("callback function must be of type coroutine, unless it runs in an executor.")
+        if executor is not None:
+            # executor listeners are passed copies of objects built from their raw data, so keep it around.
+            self.raw_attribute = True
+            callback = self._executors.wrap(function, executor)
+
         if getattr(function, "is_client_event", False):
             try:
-                self._listeners["client"][function.event_name].append(function)
+                self._listeners["client"][function.event_name].append(callback)
             except KeyError:
-                self._listeners["client"][function.event_name] = [function]
+                self._listeners["client"][function.event_name] = [callback]
+            self._refresh_pollers()
             return function
 
         if not getattr(function, "is_event_listener", None):
             raise ValueError("no events found to register to this callback")
 
-        events = [Event.from_decorator(function, runner) for runner in function.event_runners]
+        batcher = None
+        if batch_size is not None or batch_delay is not None:
+            batcher = EventBatcher(
+                callback,
+                batch_size or DEFAULT_BATCH_SIZE,
+                DEFAULT_BATCH_DELAY if batch_delay is None else batch_delay,
+                # batches of the same listener are delivered one after another.
+                functools.partial(self._dispatcher.submit, (function.event_type, function), callback),
+            )
+            self._batchers[function.event_type][function] = batcher
+
+        # events keep the function as their callback, so they can be found again by remove_events.
+        events = [
+            Event(runner, function if batcher else callback, function.event_tags, function.event_type, batcher)
+            for runner in function.event_runners
+        ]
 
         retry_interval = getattr(function, "event_retry_interval")
         cls = getattr(function, "event_cls")
         tags = getattr(function, "event_tags")
         event_type = events[0].type
+        if retry_interval:
+            # tuning mustn't poll quicker than any listener asked for.
+            self._retry_floors[event_type] = max(self._retry_floors[event_type], retry_interval)
 
         self._listeners[event_type].extend(events)
+        for event in events:
+            self._listener_index[event_type].add(event)
 
         if event_type == "clan":
             self.clan_cls = cls or self.clan_cls
@@ -714,6 +1260,10 @@ class EventsClient(Client):
             self.war_cls = cls or self.war_cls
             self.war_retry_interval = retry_interval or self.war_retry_interval
             self.add_war_updates(*tags)
+        elif event_type == "raid":
+            self.raid_cls = cls or self.raid_cls
+            self.raid_retry_interval = retry_interval or self.raid_retry_interval
+            self.add_raid_updates(*tags)
 
         LOG.info("Successfully registered %s event", function)
         return function
@@ -740,9 +1290,92 @@ class EventsClient(Client):
             The event listener functions to remove.
         """
         for function in events:
+            if getattr(function, "is_client_event", False):
+                listeners = self._listeners["client"].get(function.event_name, [])
+                if function in listeners:
+                    listeners.remove(function)
+                continue
+
             for runner in function.event_runners:
                 event = Event.from_decorator(function, runner)
                 self._listeners[event.type].remove(event)
+                self._listener_index[event.type].remove(event)
+
+            batcher = self._batchers.get(function.event_type, {}).pop(function, None)
+            if batcher is not None:
+                asyncio.ensure_future(batcher.flush())
+
+        self._refresh_pollers()
+
+    @property
+    def listener_stats(self) -> Dict[str, int]:
+        """Dict[:class:`str`, :class:`int`]: The number of listeners waiting, running, completed, failed and timed out.
+
+        See :attr:`ListenerDispatcher.stats` for more info.
+        """
+        return self._dispatcher.stats
+
+    @property
+    def loop_lag(self) -> Dict[str, float]:
+        """Dict[:class:`str`, :class:`float`]: The ``last``, ``mean`` and ``max`` number of seconds the event loop
+        was late by recently.
+
+        The lag is measured from the first time this is read, or from the start if ``loop_lag_interval`` is passed.
+        See :class:`LoopLagMonitor` for more info.
+        """
+        if not self._watch_loop_lag:
+            self._watch_loop_lag = True
+            self._refresh_pollers()
+        return self._loop_lag.stats
+
+    @property
+    def poll_metrics(self) -> Dict[str, Dict]:
+        """Dict[:class:`str`, Dict]: How well the clan, player, war and raid updaters are keeping up with their tags.
+
+        Each updater's metrics are those of :attr:`UpdaterMetrics.stats`, along with the number of ``tags`` it
+        tracks, the number of ``snapshots`` kept for them, and the number of updates ``skipped`` because the
+        response hadn't changed.
+        """
+        tracked = self._tracked_tags()
+        return {
+            type_: {
+                **metrics.stats,
+                "tags": len(tracked[type_]),
+                "snapshots": len(self._stores[type_]),
+                "skipped": self.skipped_updates[type_],
+            }
+            for type_, metrics in self._metrics.items()
+        }
+
+    async def close(self) -> None:
+        """Closes the HTTP connection and cancels any running listeners.
+
+        Batched listeners are passed any events they haven't received yet first.
+        """
+        # pylint: disable=broad-except
+        for batcher in (batcher for batchers in self._batchers.values() for batcher in batchers.values()):
+            events = batcher.drain()
+            if not events:
+                continue
+            try:
+                await batcher.callback(events)
+            except Exception as exception:
+                self.dispatch("event_error", exception)
+
+        if self.snapshot_persistence is not None:
+            self._updater_tasks["snapshots"].cancel()
+            await self.checkpoint()
+            await self.loop.run_in_executor(self._persistence_executor, self.snapshot_persistence.close)
+            self._persistence_executor.shutdown(wait=False)
+
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.event_pipeline is not None:
+            await self.event_pipeline.close(self.event_pipeline_close_timeout)
+
+        self._dispatcher.close()
+        self._executors.shutdown()
+        await super().close()
 
     def run_forever(self):
         """A blocking call which runs the loop and script.
@@ -796,19 +1429,68 @@ class EventsClient(Client):
 
         LOG.exception("Task raised an exception that was unhandled. Restarting the task.", exc_info=exception)
 
-        lookup = {
+        for name, value in list(self._updater_tasks.items()):
+            if value == result:
+                self._start_poller(name)
+
+    def _pollers(self):
+        return {
             "clan": self._clan_updater,
             "player": self._player_updater,
             "war": self._war_updater,
+            "raid": self._raid_updater,
             "maintenance": self._maintenance_poller,
-            "season": self._end_of_season_poller
+            "raid_weekend": self._raid_poller,
+            "clock": self._clock.run,
+            "loop_lag": self._loop_lag.run,
+            "snapshots": self._snapshot_poller,
+            "planner": self._planner_poller,
+            "metrics": self._metrics_poller,
         }
 
-        for name, value in self._updater_tasks.items():
-            if value != result:
-                continue
-            self._updater_tasks[name] = self.loop.create_task(lookup[name]())
-            self._updater_tasks[name].add_done_callback(self._task_callback_check)
+    def _start_poller(self, name):
+        task = self._updater_tasks[name] = self.loop.create_task(self._pollers()[name]())
+        task.add_done_callback(self._task_callback_check)
+
+    def _needed_pollers(self):
+        client = self._listeners["client"]
+        # nothing is requested while a replay feeds in the updates.
+        tracked = not self._replaying and (
+            self._clan_updates or self._player_updates or self._war_updates or self._raid_updates
+        )
+        return {
+            "clan": bool(tracked and self._clan_updates),
+            "player": bool(tracked and self._player_updates),
+            "war": bool(tracked and self._war_updates),
+            "raid": bool(tracked and self._raid_updates),
+            # tags are paused during maintenance, so it needs watching whenever there are any.
+            "maintenance": bool(tracked) or any(client.get(name) for name in MAINTENANCE_EVENTS),
+            "raid_weekend": any(client.get(name) for name in RAID_WEEKEND_EVENTS),
+            "planner": self.auto_tune_intervals and bool(tracked),
+            "metrics": bool(client.get("poll_metrics")),
+            "loop_lag": self._watch_loop_lag,
+        }
+
+    def _refresh_pollers(self):
+        """Start the pollers that tags or listeners need, and stop the ones that nothing needs anymore."""
+        client = self._listeners["client"]
+        for event_name, next_time in CLOCK_EVENTS.items():
+            if client.get(event_name):
+                self._clock.add(event_name, next_time, functools.partial(self.dispatch, event_name))
+            else:
+                self._clock.remove(event_name)
+
+        needed = self._needed_pollers()
+        needed["clock"] = bool(self._clock)
+        for name, is_needed in needed.items():
+            task = self._updater_tasks.get(name)
+            if is_needed and task is None:
+                self._start_poller(name)
+            elif not is_needed and task is not None:
+                self._updater_tasks.pop(name).cancel()
+                if name == "maintenance":
+                    # nothing is waiting for maintenance to end anymore.
+                    self._in_maintenance_event.set()
 
     async def _raid_poller(self):
         # pylint: disable=broad-except, protected-access
@@ -838,39 +1520,6 @@ class EventsClient(Client):
             self.dispatch("event_error", exception)
             return await self._raid_poller()
 
-    async def _end_of_season_poller(self):
-        try:
-            while self.loop.is_running():
-                end_of_season = get_season_end()
-                now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
-                await asyncio.sleep((end_of_season - now).total_seconds())
-                self.dispatch("new_season_start")
-        except asyncio.CancelledError:
-            pass
-        except (Exception, BaseException) as exception:
-            self.dispatch("event_error", exception)
-            return await self._end_of_season_poller()
-
-    async def _clan_games_poller(self):
-        try:
-            while self.loop.is_running():
-                clan_games_start = get_clan_games_start()
-                clan_games_end = get_clan_games_end()
-                now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
-                if now < clan_games_start:
-                    event = "clan_games_start"
-                    mute_time = clan_games_start - now
-                else:
-                    event = "clan_games_end"
-                    mute_time = clan_games_end - now
-                await asyncio.sleep(mute_time.total_seconds())
-                self.dispatch(event)
-        except asyncio.CancelledError:
-            pass
-        except (Exception, BaseException) as exception:
-            self.dispatch("event_error", exception)
-            return await self._end_of_season_poller()
-
     async def _maintenance_poller(self):
         # pylint: disable=broad-except, protected-access
         maintenance_start = None
@@ -900,193 +1549,514 @@ class EventsClient(Client):
             self.dispatch("event_error", exception)
             return await self._maintenance_poller()
 
-    async def _war_updater(self):
+    async def _snapshot_poller(self):
         # pylint: disable=broad-except
         try:
+            if not self._snapshots_restored.is_set():
+                try:
+                    await self._restore_snapshots()
+                finally:
+                    self._snapshots_restored.set()
+
             while self.loop.is_running():
-                await asyncio.sleep(DEFAULT_SLEEP)
-                await self._in_maintenance_event.wait()  # don't run if we're hitting maintenance errors.
+                await asyncio.sleep(self.checkpoint_interval)
+                await self.checkpoint()
+        except asyncio.CancelledError:
+            pass
+        except (Exception, BaseException) as exception:
+            self.dispatch("event_error", exception)
+            return await self._snapshot_poller()
 
-                self.dispatch("war_loop_start", self.war_loops_run)
+    async def _restore_snapshots(self):
+        records = await self.loop.run_in_executor(self._persistence_executor, self.snapshot_persistence.load)
+        self._restore_records(records)
 
-                if self.is_cwl_active and self.check_cwl_prep:
-                    options = (WarRound.current_war, WarRound.current_preparation)
-                else:
-                    options = (WarRound.current_war, )
+    def _restore_records(self, records):
+        classes = {"clan": self.clan_cls, "player": self.player_cls, "war": self.war_cls, "raid": self.raid_cls}
+        tracked = self._tracked_tags()
+        now = datetime.now(tz=timezone.utc).timestamp()
 
-                tasks = [
-                    self.loop.create_task(self._run_war_update(tag, option))
-                    for tag in self._war_updates for option in options
-                ]
-                await asyncio.gather(*tasks)
-                self.dispatch("war_loop_finish", self.war_loops_run)
-                self.war_loops_run += 1
+        for record in records:
+            if record.type not in classes or not self.owns_tag(record.key):
+                continue
+            self._stores[record.type].set_raw(
+                record.key, classes[record.type], record.data, **self._snapshot_kwargs(record.type, record.key)
+            )
+            # there's no point requesting it again until the response we have goes stale.
+            expiry = (record.data.get("timestamp") or 0) + (record.data.get("_response_retry") or 0)
+            if record.key in tracked[record.type]:
+                self._schedulers[record.type].schedule(record.key, max(expiry - now, 0))
+            else:
+                self._restored_expiry[(record.type, record.key)] = expiry
+
+    def _tracked_tags(self):
+        return {
+            "clan": self._clan_updates,
+            "player": self._player_updates,
+            "war": self._war_updates,
+            "raid": self._raid_updates,
+        }
 
-        except asyncio.CancelledError:
+    def owns_tag(self, tag: str) -> bool:
+        """Whether this shard refreshes a tag. This is always ``True`` if there aren't any ``shards``.
+
+        Parameters
+        ----------
+        tag: str
+            The clan or player tag.
+        """
+        return self.shard_router is None or self.shard_router.owner(correct_tag(tag)) == self.shard_id
+
+    async def reshard(self, shards) -> None:
+        """Change the shards that tags are spread across, ie. when a shard is added or removed.
+
+        Only the tags whose owner has changed are moved. Tags this shard gives up stop being refreshed, and
+        their snapshots are saved to the ``snapshot_persistence`` straight away. Tags it takes over are loaded
+        from it, so they carry on from where the previous shard left off. This means shards losing tags should
+        be resharded before shards gaining them.
+
+        Parameters
+        ----------
+        shards: Union[int, Iterable]
+            The new shard IDs, or the number of shards.
+        """
+        router = ShardRouter(shards)
+        if self.shard_id not in router:
+            raise ValueError("shard_id {!r} isn't one of the shards".format(self.shard_id))
+        self.shard_router = router
+
+        records = []
+        for type_, tags in self._tracked_tags().items():
+            for tag in [tag for tag in tags if not self.owns_tag(tag)]:
+                data = self._stores[type_].get_raw(tag)
+                if data is not None:
+                    records.append(SnapshotRecord(type_, tag, data))
+                self._release_tag(type_, tag)
+        if records and self.snapshot_persistence is not None:
+            await self.loop.run_in_executor(self._persistence_executor, self.snapshot_persistence.save, records, [])
+
+        acquired = {type_: [tag for tag in tags if self.owns_tag(tag)] for type_, tags in self._unowned.items()}
+        if self.snapshot_persistence is not None:
+            keys = [(type_, tag) for type_, tags in acquired.items() for tag in tags]
+            if keys:
+                self._restore_records(
+                    await self.loop.run_in_executor(self._persistence_executor, self.snapshot_persistence.load, keys)
+                )
+
+        self.add_clan_updates(*acquired["clan"])
+        self.add_player_updates(*acquired["player"])
+        self.add_war_updates(*acquired["war"])
+        self.add_raid_updates(*acquired["raid"])
+        for type_, tags in acquired.items():
+            self._unowned[type_].difference_update(tags)
+        self._refresh_pollers()
+
+    def _release_tag(self, type_, tag):
+        self._tracked_tags()[type_].discard(tag)
+        self._unowned[type_].add(tag)
+        self._schedulers[type_].remove(tag)
+        # the snapshot is handed over to the new owner rather than deleted.
+        self._stores[type_].remove(tag)
+        self._unsaved[type_].discard(tag)
+        if self.poll_policy is not None:
+            for key in ((tag, WarRound.current_war), (tag, WarRound.current_preparation)) if type_ == "war" else (tag,):
+                self.poll_policy.remove(type_, key)
+
+        if type_ == "clan":
+            for player_tag in [k for k, v in self._member_clans.items() if v == tag]:
+                del self._member_clans[player_tag]
+        elif type_ == "player":
+            self._member_clans.pop(tag, None)
+        elif type_ == "war":
+            self._league_requests.remove(tag)
+        else:
+            self._raid_fingerprints.pop(tag, None)
+
+    def _restored_delay(self, type_, tag):
+        expiry = self._restored_expiry.pop((type_, tag), None)
+        if expiry is None:
+            return 0.0
+        return max(expiry - datetime.now(tz=timezone.utc).timestamp(), 0.0)
+
+    def _snapshot_kwargs(self, type_, key):
+        if type_ == "player":
+            return {"load_game_data": True if self.load_game_data.always else False}
+        if type_ in ("war", "raid"):
+            return {"clan_tag": key}
+        return {}
+
+    def _snapshot_changed(self, type_, key):
+        if self.snapshot_persistence is not None:
+            self._unsaved[type_].add(key)
+            self._removed[type_].discard(key)
+
+    def _remove_snapshot(self, type_, key):
+        self._stores[type_].remove(key)
+        self._restored_expiry.pop((type_, key), None)
+        if self.snapshot_persistence is not None:
+            self._unsaved[type_].discard(key)
+            self._removed[type_].add(key)
+
+    async def checkpoint(self) -> None:
+        """Save the snapshot of every tag that has changed since the last checkpoint to the ``snapshot_persistence``.
+
+        This runs every ``checkpoint_interval`` seconds, and when the client is closed.
+        Snapshots restored for tags that still haven't been added are kept until their response goes stale,
+        so tags that are added lazily still carry on from them. After that, they're deleted.
+        """
+        # pylint: disable=broad-except
+        if self.snapshot_persistence is None:
             return
-        except (Exception, BaseException) as exception:
+
+        tracked = self._tracked_tags()
+        now = datetime.now(tz=timezone.utc).timestamp()
+        for type_, store in self._stores.items():
+            for key in [key for key in store if key not in tracked[type_]]:
+                if self._restored_expiry.get((type_, key), 0) <= now:
+                    self._remove_snapshot(type_, key)
+
+        unsaved, self._unsaved = self._unsaved, {type_: set() for type_ in self._unsaved}
+        removed, self._removed = self._removed, {type_: set() for type_ in self._removed}
+        updated = []
+        for type_, keys in unsaved.items():
+            for key in keys:
+                data = self._stores[type_].get_raw(key)
+                if data is not None:
+                    updated.append(SnapshotRecord(type_, key, data))
+        deleted = [(type_, key) for type_, keys in removed.items() for key in keys]
+        if not updated and not deleted:
+            return
+
+        try:
+            await self.loop.run_in_executor(
+                self._persistence_executor, self.snapshot_persistence.save, updated, deleted
+            )
+        except Exception as exception:
+            # try again at the next checkpoint, unless they've changed since.
+            for type_, keys in unsaved.items():
+                self._unsaved[type_].update(keys - self._removed[type_])
+            for type_, keys in removed.items():
+                self._removed[type_].update(keys - self._unsaved[type_])
             self.dispatch("event_error", exception)
 
-            for lock in (v for k, v in self._locks.items() if "war" in k):
-                self._safe_unlock(lock)
+    def _request_costs(self):
+        rounds = 2 if self.is_cwl_active and self.check_cwl_prep else 1
+        if self.is_cwl_active and get_cwl_start() <= datetime.now(tz=timezone.utc).replace(tzinfo=None):
+            # the clan's war, its league group and a league war. The group and war are shared within a loop,
+            # so this is the most a clan could cost.
+            rounds *= 3
+        # a raid update is one request for the latest entry of the raid log.
+        return {"clan": 1.0, "player": 1.0, "war": float(rounds), "raid": 1.0}
+
+    def _tag_ttls(self):
+        ttls = {}
+        for type_, tags in self._tracked_tags().items():
+            if type_ == "raid" and _seconds_until_raid_weekend() > 0:
+                # raids aren't requested outside the raid weekend.
+                tags = ()
+            store = self._stores[type_]
+            # players whose events come from their clan's member list aren't requested.
+            ttls[type_] = [
+                store.response_retry(tag) for tag in tags if type_ != "player" or not self._derives_from_clan(tag)
+            ]
+        return ttls
+
+    def plan_capacity(self) -> CapacityPlan:
+        """Work out whether the keys can keep up with refreshing every tag this client tracks.
+
+        The requests needed are worked out from how long the last response of every tag is cached for, and
+        the ``retry_interval`` of each type. The requests available are ``key_count * throttle_limit``.
+
+        Tags that haven't been refreshed yet are counted as if they're refreshed as often as possible,
+        so the plan is most accurate once every tag has been refreshed once.
 
-            return await self._war_updater()
+        Returns
+        --------
+        :class:`CapacityPlan`
+            The requests needed and available, and how stale each type of tag is expected to get.
+        """
+        intervals = {
+            "clan": self.clan_retry_interval,
+            "player": self.player_retry_interval,
+            "war": self.war_retry_interval,
+            "raid": self.raid_retry_interval,
+        }
+        capacity = self.correct_key_count * self.throttle_limit
+        return plan_capacity(self._tag_ttls(), intervals, capacity, self._request_costs(), DEFAULT_SLEEP)
 
-    async def _clan_updater(self):
+    def tune_intervals(self) -> CapacityPlan:
+        """Set the retry interval of each type to the shortest that keeps the requests needed within
+        ``capacity_target`` of the requests available.
+
+        The retry intervals are never lowered below the ``retry_interval`` passed to a listener.
+        This runs every ``planner_interval`` seconds if ``auto_tune_intervals`` is ``True``.
+
+        Returns
+        --------
+        :class:`CapacityPlan`
+            The plan with the new retry intervals.
+        """
+        ttls = self._tag_ttls()
+        budget = self.correct_key_count * self.throttle_limit * self.capacity_target
+        intervals = tune_retry_intervals(ttls, self._retry_floors, budget, self._request_costs(), DEFAULT_SLEEP)
+        for type_, seconds in intervals.items():
+            seconds = math.ceil(seconds)
+            if seconds != getattr(self, "{}_retry_interval".format(type_)):
+                LOG.info("Changed the %s retry interval to %s seconds", type_, seconds)
+                setattr(self, "{}_retry_interval".format(type_), seconds)
+        return self.plan_capacity()
+
+    async def _metrics_poller(self):
         # pylint: disable=broad-except
         try:
             while self.loop.is_running():
-                await asyncio.sleep(DEFAULT_SLEEP)
-                await self._in_maintenance_event.wait()  # don't run if we're hitting maintenance errors.
-
-                self.dispatch("clan_loop_start", self.clan_loops_run)
-                tasks = [
-                    self.loop.create_task(self._run_clan_update(index, tag))
-                    for index, tag in enumerate(self._clan_updates)
-                ]
-                await asyncio.gather(*tasks)
-                self.dispatch("clan_loop_finish", self.clan_loops_run)
-                self.clan_loops_run += 1
+                await asyncio.sleep(self.metrics_interval)
+                self.dispatch("poll_metrics", self.poll_metrics)
+        except asyncio.CancelledError:
+            pass
+        except (Exception, BaseException) as exception:
+            self.dispatch("event_error", exception)
+            return await self._metrics_poller()
 
+    async def _planner_poller(self):
+        # pylint: disable=broad-except
+        try:
+            while self.loop.is_running():
+                await asyncio.sleep(self.planner_interval)
+                plan = self.tune_intervals()
+                if plan.over_capacity:
+                    LOG.warning(
+                        "%.1f requests per second are needed, but only %.1f are available",
+                        plan.required, plan.capacity,
+                    )
+        except asyncio.CancelledError:
+            pass
+        except (Exception, BaseException) as exception:
+            self.dispatch("event_error", exception)
+            return await self._planner_poller()
+
+    async def _run_updater(self, name):
+        scheduler = self._schedulers[name]
+        await asyncio.sleep(DEFAULT_SLEEP)
+        await self._snapshots_restored.wait()
+        while self.loop.is_running():
+            # only wake up when a tag is due for a refresh, rather than walking every tag.
+            await scheduler.wait()
+            await self._in_maintenance_event.wait()  # don't run if we're hitting maintenance errors.
+
+            loops_run = getattr(self, "{}_loops_run".format(name))
+            self.dispatch("{}_loop_start".format(name), loops_run)
+            start = monotonic()
+            if name == "war":
+                # every tracked clan in a league group shares its requests, but only for this loop.
+                self._league_requests.start_loop()
+            try:
+                polled = await scheduler.run_due()
+            finally:
+                if name == "war":
+                    self._league_requests.end_loop()
+            # every batched listener gets a batch per loop, so they line up with the loop_finish event.
+            for batcher in self._batchers[name].values():
+                await batcher.flush()
+            self._metrics[name].record_loop(monotonic() - start, polled, scheduler.lag)
+            self.dispatch("{}_loop_finish".format(name), loops_run)
+            setattr(self, "{}_loops_run".format(name), loops_run + 1)
+
+    async def _raid_updater(self):
+        # pylint: disable=broad-except
+        try:
+            await self._run_updater("raid")
         except asyncio.CancelledError:
             return
         except (Exception, BaseException) as exception:
             self.dispatch("event_error", exception)
+            return await self._raid_updater()
 
-            for lock in (v for k, v in self._locks.items() if "clan" in k):
-                self._safe_unlock(lock)
+    async def _war_updater(self):
+        # pylint: disable=broad-except
+        try:
+            await self._run_updater("war")
+        except asyncio.CancelledError:
+            return
+        except (Exception, BaseException) as exception:
+            self.dispatch("event_error", exception)
+            return await self._war_updater()
 
+    async def _clan_updater(self):
+        # pylint: disable=broad-except
+        try:
+            await self._run_updater("clan")
+        except asyncio.CancelledError:
+            return
+        except (Exception, BaseException) as exception:
+            self.dispatch("event_error", exception)
             return await self._clan_updater()
 
     async def _player_updater(self):
         # pylint: disable=broad-except
         try:
-            while self.loop.is_running():
-                await asyncio.sleep(DEFAULT_SLEEP)
-                await self._in_maintenance_event.wait()  # don't run if we're hitting maintenance errors.
-
-                self.dispatch("player_loop_start", self.player_loops_run)
-                tasks = [
-                    self.loop.create_task(self._run_player_update(index, tag))
-                    for index, tag in enumerate(self._player_updates)
-                ]
-                await asyncio.gather(*tasks)
-                self.dispatch("player_loop_finish", self.player_loops_run)
-                self.player_loops_run += 1
-
+            await self._run_updater("player")
         except asyncio.CancelledError:
             return
         except (Exception, BaseException) as exception:
             self.dispatch("event_error", exception)
-
-            for lock in (v for k, v in self._locks.items() if "player" in k):
-                self._safe_unlock(lock)
-
             return await self._player_updater()
 
-    @staticmethod
-    def _safe_unlock(lock):
-        try:
-            lock.release()
-        except RuntimeError:
-            pass
-
-    async def _run_player_update(self, index, player_tag):
-        # pylint: disable=protected-access, broad-except
-        await asyncio.sleep(0.005 * index)
-
-        key = "player:{}".format(player_tag)
-        try:
-            lock = self._locks[key]
-        except KeyError:
-            self._locks[key] = lock = asyncio.Lock()
+    async def _get_league_group_data(self, clan_tag, **kwargs):
+        fetch = functools.partial(super()._get_league_group_data, clan_tag, **kwargs)
+        if not self._league_requests.active:
+            return await fetch()
+        return await self._league_requests.get_group(clan_tag, fetch)
+
+    async def _get_league_war_data(self, war_tag, **kwargs):
+        fetch = functools.partial(super()._get_league_war_data, war_tag, **kwargs)
+        if not self._league_requests.active:
+            return await fetch()
+        return await self._league_requests.get_war(war_tag, fetch)
+
+    def _get_poll_interval(self, type_, tag, seconds, cached=None, live=None, changed=None):
+        if self.poll_policy is None:
+            return seconds
+        return self.poll_policy.get_interval(type_, tag, seconds, cached, live, changed)
+
+    def _needs_cached(self, type_):
+        # building the cached object can be skipped if nothing would compare it to the new one.
+        if self._listeners[type_] or self.poll_policy is not None:
+            return True
+        return type_ == "clan" and self.member_player_events and bool(self._player_updates)
+
+    async def _dispatch_update(self, type_, tag, diff):
+        for listener in self._listener_index[type_].get(tag, diff):
+            if listener.batcher is not None:
+                # batched listeners only collect the event, which is cheap enough to do straight away.
+                await listener(diff.cached, diff.live, diff)
+            else:
+                await self._dispatcher.submit((type_, tag), listener, diff.cached, diff.live, diff)
+
+    def _derives_from_clan(self, player_tag):
+        # a player's events come from their clan's member list if they're in a tracked clan,
+        # and every event of theirs is for an attribute that's in the member list.
+        if not self.member_player_events or player_tag not in self._member_clans:
+            return False
+        return all(
+            event.field in MEMBER_FIELDS
+            for event in self._listeners["player"]
+            if not event.tags or player_tag in event.tags
+        )
+
+    async def _dispatch_member_updates(self, cached_clan, clan):
+        tracked, member_clans = self._player_updates, self._member_clans
+        cached_members = cached_clan.members_dict if cached_clan is not None else {}
+
+        for member in clan.members:
+            if member.tag not in tracked:
+                continue
+            member_clans[member.tag] = clan.tag
+            cached_member = cached_members.get(member.tag)
+            if cached_member is not None and self._derives_from_clan(member.tag):
+                await self._dispatch_update("player", member.tag, SnapshotDiff(cached_member, member))
 
-        if lock.locked():
-            # fast return to speed up events
-            return
-        await lock.acquire()
+        for tag in cached_members.keys() - clan.members_dict.keys():
+            if member_clans.get(tag) == clan.tag:
+                # they left, so go back to requesting the player.
+                del member_clans[tag]
 
+    async def _run_player_update(self, player_tag):
+        # pylint: disable=protected-access, broad-except
+        if self._derives_from_clan(player_tag):
+            # no need to request the player, their events come from the clan. Check again once it's refreshed.
+            if player_tag in self._stores["player"]:
+                self._remove_snapshot("player", player_tag)
+            retry = self._stores["clan"].response_retry(self._member_clans[player_tag])
+            return max(retry, self.clan_retry_interval, DEFAULT_SLEEP)
+
+        store = self._stores["player"]
         try:
             player = await self.get_player(
-                player_tag, cls=self.player_cls, load_game_data=True if self.load_game_data.always else False
+                player_tag,
+                cls=self.player_cls,
+                load_game_data=True if self.load_game_data.always else False,
+                if_none_match=store.fingerprint(player_tag),
             )
-        except Maintenance:
-            self._safe_unlock(lock)
-            return
+        except Maintenance as exception:
+            self._metrics["player"].record_error(exception)
+            return DEFAULT_SLEEP
         except (Exception, BaseException) as exception:
+            self._metrics["player"].record_error(exception)
             self.dispatch("event_error", exception)
-            self._safe_unlock(lock)
-            return
+            return DEFAULT_SLEEP
 
-        # sleep for either
-        seconds = max(player._response_retry, self.player_retry_interval)
-        self.loop.call_later(seconds, self._safe_unlock, lock)
+        return await self._apply_player_update(player_tag, player)
 
-        cached_player = self._get_cached_player(player_tag)
+    async def _apply_player_update(self, player_tag, player):
+        # pylint: disable=protected-access
+        if player is None:
+            # the response is identical to the cached player's, so there's nothing to build or compare.
+            self.skipped_updates["player"] += 1
+            seconds = max(self._stores["player"].response_retry(player_tag), self.player_retry_interval)
+            return self._get_poll_interval("player", player_tag, seconds, changed=False)
+
+        self._record("player", player_tag, player)
+        cached_player = self._get_cached_player(player_tag) if self._needs_cached("player") else None
         self._update_player(player)
 
-        if cached_player is None:
-            self._safe_unlock(lock)
-            return
+        if cached_player is not None:
+            # every listener of this update shares the same diff, so nothing is compared twice.
+            diff = PlayerDiff(cached_player, player)
+            await self._dispatch_update("player", player_tag, diff)
 
-        for listener in self._listeners["player"]:
-            if listener.tags and player_tag not in listener.tags:
-                continue
-            await listener(cached_player, player)
+        # refresh after either the global retry or whenever a new player object is available, whichever is larger.
+        seconds = max(player._response_retry, self.player_retry_interval)
+        return self._get_poll_interval("player", player_tag, seconds, cached_player, player)
 
-    async def _run_clan_update(self, index, clan_tag):
+    async def _run_clan_update(self, clan_tag):
         # pylint: disable=protected-access, broad-except
-        await asyncio.sleep(0.005 * index)
-
-        key = "clan:{}".format(clan_tag)
-        try:
-            lock = self._locks[key]
-        except KeyError:
-            self._locks[key] = lock = asyncio.Lock()
-
-        if lock.locked():
-            # fast return to speed up events
-            return
-        await lock.acquire()
-
+        store = self._stores["clan"]
         try:
-            clan = await self.get_clan(clan_tag, cls=self.clan_cls)
-        except Maintenance:
-            self._safe_unlock(lock)
-            return
+            clan = await self.get_clan(clan_tag, cls=self.clan_cls, if_none_match=store.fingerprint(clan_tag))
+        except Maintenance as exception:
+            self._metrics["clan"].record_error(exception)
+            return DEFAULT_SLEEP
         except (Exception, BaseException) as exception:
+            self._metrics["clan"].record_error(exception)
             self.dispatch("event_error", exception)
-            self._safe_unlock(lock)
-            return
+            return DEFAULT_SLEEP
 
-        # sleep for either the global retry or whenever a new player object is available, whichever is smaller.
-        self.loop.call_later(max(clan._response_retry, self.clan_retry_interval), self._safe_unlock, lock)
+        return await self._apply_clan_update(clan_tag, clan)
 
-        cached_clan = self._get_cached_clan(clan_tag)
+    async def _apply_clan_update(self, clan_tag, clan):
+        # pylint: disable=protected-access
+        if clan is None:
+            # the response is identical to the cached clan's, so there's nothing to build or compare.
+            self.skipped_updates["clan"] += 1
+            seconds = max(self._stores["clan"].response_retry(clan_tag), self.clan_retry_interval)
+            return self._get_poll_interval("clan", clan_tag, seconds, changed=False)
+
+        self._record("clan", clan_tag, clan)
+        cached_clan = self._get_cached_clan(clan_tag) if self._needs_cached("clan") else None
         self._update_clan(clan)
 
-        if not cached_clan:
-            self._safe_unlock(lock)
-            return
+        if cached_clan:
+            diff = SnapshotDiff(cached_clan, clan)
+            await self._dispatch_update("clan", clan_tag, diff)
+        if self.member_player_events and self._player_updates:
+            await self._dispatch_member_updates(cached_clan, clan)
 
-        for listener in self._listeners["clan"]:
-            if listener.tags and clan_tag not in listener.tags:
-                continue
-            await listener(cached_clan, clan)
+        # refresh after either the global retry or whenever a new clan object is available, whichever is larger.
+        seconds = max(clan._response_retry, self.clan_retry_interval)
+        return self._get_poll_interval("clan", clan_tag, seconds, cached_clan, clan)
 
-    async def _run_war_update(self, clan_tag, cwl_round=None):
-        # pylint: disable=protected-access, broad-except
-        key = "war:{}:{}".format(cwl_round, clan_tag)
-        try:
-            lock = self._locks[key]
-        except KeyError:
-            self._locks[key] = lock = asyncio.Lock()
+    async def _run_war_updates(self, clan_tag):
+        if self.is_cwl_active and self.check_cwl_prep:
+            options = (WarRound.current_war, WarRound.current_preparation)
+        else:
+            options = (WarRound.current_war, )
 
-        if lock.locked():
-            # fast return to speed up events
-            return
-        await lock.acquire()
+        delays = [await self._run_war_update(clan_tag, option) for option in options]
+        return min(delays)
 
+    async def _run_war_update(self, clan_tag, cwl_round=None):
+        # pylint: disable=protected-access, broad-except
         if self.is_cwl_active:
             meth = self.get_current_war
         else:
@@ -1094,29 +2064,84 @@ class EventsClient(Client):
 
         try:
             war = await meth(clan_tag, cls=self.war_cls, round=cwl_round)
-        except (Maintenance, PrivateWarLog):
-            self._safe_unlock(lock)
-            return
+        except (Maintenance, PrivateWarLog) as exception:
+            self._metrics["war"].record_error(exception)
+            return DEFAULT_SLEEP
         except (Exception, BaseException) as exception:
+            self._metrics["war"].record_error(exception)
             self.dispatch("event_error", exception)
-            self._safe_unlock(lock)
-            return
+            return DEFAULT_SLEEP
 
         if war is None:
-            self._safe_unlock(lock)
-            return
+            return DEFAULT_SLEEP
 
-        # sleep for either the global retry or whenever a new war object is available, whichever is smaller.
-        self.loop.call_later(max(war._response_retry, self.war_retry_interval), self._safe_unlock, lock)
+        return await self._apply_war_update(clan_tag, war, cwl_round)
 
-        cached_war = self._get_cached_war(clan_tag)
+    async def _apply_war_update(self, clan_tag, war, cwl_round=None):
+        # pylint: disable=protected-access
+        if war._fingerprint is not None and war._fingerprint == self._stores["war"].fingerprint(clan_tag):
+            # working out the current war needs the war object, but identical wars don't need to be compared.
+            self.skipped_updates["war"] += 1
+            seconds = max(war._response_retry, self.war_retry_interval)
+            return self._get_poll_interval("war", (clan_tag, cwl_round), seconds, changed=False)
+
+        self._record("war", clan_tag, war)
+        cached_war = self._get_cached_war(clan_tag) if self._needs_cached("war") else None
         self._update_war(clan_tag, war)
 
-        if not cached_war:
-            self._safe_unlock(lock)
-            return
+        if cached_war:
+            diff = SnapshotDiff(cached_war, war)
+            await self._dispatch_update("war", clan_tag, diff)
 
-        for listener in self._listeners["war"]:
-            if listener.tags and clan_tag not in listener.tags:
-                continue
-            await listener(cached_war, war)
+        # refresh after either the global retry or whenever a new war object is available, whichever is larger.
+        seconds = max(war._response_retry, self.war_retry_interval)
+        return self._get_poll_interval("war", (clan_tag, cwl_round), seconds, cached_war, war)
+
+    async def _run_raid_update(self, clan_tag):
+        # pylint: disable=protected-access, broad-except
+        until_weekend = _seconds_until_raid_weekend()
+        if until_weekend > 0:
+            cached_raid = self._get_cached_raid(clan_tag)
+            if cached_raid is None or cached_raid.state == "ended":
+                # nothing happens outside the raid weekend, so don't request anything until it starts.
+                # the clock is checked at least every hour, in case it changes.
+                return min(until_weekend, RAID_IDLE_SLEEP)
+            # otherwise, the raid weekend has just ended, so it's requested until it shows up as ended.
+
+        try:
+            raid_log = await self.get_raid_log(clan_tag, cls=self.raid_cls, limit=1)
+        except (Maintenance, PrivateWarLog) as exception:
+            self._metrics["raid"].record_error(exception)
+            return DEFAULT_SLEEP
+        except (Exception, BaseException) as exception:
+            self._metrics["raid"].record_error(exception)
+            self.dispatch("event_error", exception)
+            return DEFAULT_SLEEP
+
+        if not raid_log:
+            # the clan has never raided.
+            return DEFAULT_SLEEP
+
+        return await self._apply_raid_update(clan_tag, raid_log[0], raid_log._init_data.get("_fingerprint"))
+
+    async def _apply_raid_update(self, clan_tag, raid, fingerprint=None):
+        # pylint: disable=protected-access
+        if fingerprint is not None and fingerprint == self._raid_fingerprints.get(clan_tag):
+            # the response is identical to the cached raid's, so there's nothing to compare.
+            self.skipped_updates["raid"] += 1
+            seconds = max(raid._response_retry, self.raid_retry_interval)
+            return self._get_poll_interval("raid", clan_tag, seconds, changed=False)
+
+        self._record("raid", clan_tag, raid, fingerprint)
+        cached_raid = self._get_cached_raid(clan_tag) if self._needs_cached("raid") else None
+        self._update_raid(clan_tag, raid)
+        self._raid_fingerprints[clan_tag] = fingerprint
+
+        if cached_raid is not None:
+            # every raid event of this update shares the same walk over the members, attacks and districts.
+            diff = RaidDiff(cached_raid, raid)
+            await self._dispatch_update("raid", clan_tag, diff)
+
+        # refresh after either the global retry or whenever a new raid log is available, whichever is larger.
+        seconds = max(raid._response_retry, self.raid_retry_interval)
+        return self._get_poll_interval("raid", clan_tag, seconds, cached_raid, raid)
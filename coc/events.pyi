@@ -1,10 +1,17 @@
-from typing import Iterable, Callable, Union, Coroutine, Type, Dict
+from concurrent.futures import Executor
+from typing import Iterable, Callable, Union, Coroutine, Type, Dict, Optional, Hashable
 
 from coc.client import Client
 from coc.players import Player, ClanMember
 from coc.clans import Clan
 from coc.wars import ClanWar
+from coc.raid import RaidLogEntry
 from coc.war_attack import WarAttack
+from coc.persistence import SnapshotPersistence
+from coc.planner import CapacityPlan
+from coc.replay import ReplayRecorder
+from coc.sinks import EventPipeline
+from coc.sharding import ShardRouter
 
 _ClanType = Type[Clan]
 _PlayerType = Type[Player]
@@ -154,6 +161,8 @@ class PlayerEvents:
     @classmethod
     def labels(cls, tags: Iterable = None, custom_class: _PlayerType = Player, retry_interval: int = None) -> _EventDecoratorReturn: ...
     @classmethod
+    def pet_change(cls, tags: Iterable = None, custom_class: _PlayerType = Player, retry_interval: int = None) -> _EventDecoratorReturn: ...
+    @classmethod
     def equipment_change(cls, tags: Iterable = None, custom_class: _PlayerType = Player, retry_interval: int = None) -> _EventDecoratorReturn: ...
     @classmethod
     def active_equipment_change(cls, tags: Iterable = None, custom_class: _PlayerType = Player, retry_interval: int = None) -> _EventDecoratorReturn: ...
@@ -169,6 +178,17 @@ class WarEvents:
     @classmethod
     def new_war(cls, tags: Iterable = None, custom_class: Type[ClanWar] = ClanWar, retry_interval: int = None) -> _EventDecoratorReturn: ...
 
+class RaidEvents:
+    event_type: str
+    @classmethod
+    def raid_attack(cls, tags: Iterable = None, custom_class: Type[RaidLogEntry] = RaidLogEntry, retry_interval: int = None) -> _EventDecoratorReturn: ...
+    @classmethod
+    def district_destroyed(cls, tags: Iterable = None, custom_class: Type[RaidLogEntry] = RaidLogEntry, retry_interval: int = None) -> _EventDecoratorReturn: ...
+    @classmethod
+    def member_loot_change(cls, tags: Iterable = None, custom_class: Type[RaidLogEntry] = RaidLogEntry, retry_interval: int = None) -> _EventDecoratorReturn: ...
+    @classmethod
+    def raid_finished(cls, tags: Iterable = None, custom_class: Type[RaidLogEntry] = RaidLogEntry, retry_interval: int = None) -> _EventDecoratorReturn: ...
+
 
 class ClientEvents:
     @classmethod
@@ -201,32 +221,84 @@ class ClientEvents:
     def war_loop_start(cls): ...
     @classmethod
     def war_loop_finish(cls): ...
+    @classmethod
+    def raid_loop_start(cls): ...
+    @classmethod
+    def raid_loop_finish(cls): ...
+    @classmethod
+    def poll_metrics(cls): ...
 
 class EventsClient(Client):
     clan_retry_interval: int
     player_retry_interval: int
     war_retry_interval: int
+    raid_retry_interval: int
 
     clan_cls: Type[Clan]
     player_cls: Type[Player]
     war_cls: Type[ClanWar]
+    raid_cls: Type[RaidLogEntry]
 
     _player_updates: set
     _clan_updates: set
     _war_updates: set
+    _raid_updates: set
 
     _listeners: Dict
 
+    skipped_updates: Dict[str, int]
+
+    listener_workers: int
+    listener_timeout: Optional[float]
+    listener_queue_size: int
+    ordered_listeners: bool
+    executor_workers: Optional[int]
+    loop_lag_interval: Optional[float]
+    member_player_events: bool
+    compact_snapshots: bool
+    snapshot_persistence: Optional[SnapshotPersistence]
+    checkpoint_interval: float
+    shard_id: Optional[Hashable]
+    shard_router: Optional[ShardRouter]
+    auto_tune_intervals: bool
+    capacity_target: float
+    planner_interval: float
+    metrics_interval: float
+    recorder: Optional[ReplayRecorder]
+    event_pipeline: Optional[EventPipeline]
+    event_pipeline_close_timeout: Optional[float]
+
 
     is_cwl_active: bool
 
     def add_clan_updates(self, *tags: str) -> None: ...
     def add_player_updates(self, *tags: str) -> None: ...
     def add_war_updates(self, *tags: str) -> None: ...
+    def add_raid_updates(self, *tags: str) -> None: ...
     def remove_clan_updates(self, *tags: str) -> None: ...
     def remove_player_updates(self, *tags: str) -> None: ...
     def remove_war_updates(self, *tags: str) -> None: ...
-    def event(self, event: Callable) -> Callable: ...
+    def remove_raid_updates(self, *tags: str) -> None: ...
+    def event(
+        self,
+        function: Optional[Callable] = None,
+        *,
+        executor: Optional[Union[str, Executor]] = None,
+        batch_size: Optional[int] = None,
+        batch_delay: Optional[float] = None,
+    ) -> Callable: ...
     def add_events(self, *events: Callable) -> None: ...
     def remove_events(self, *events: Callable) -> None: ...
+    @property
+    def listener_stats(self) -> Dict[str, int]: ...
+    @property
+    def loop_lag(self) -> Dict[str, float]: ...
+    @property
+    def poll_metrics(self) -> Dict[str, Dict]: ...
+    async def close(self) -> None: ...
+    async def checkpoint(self) -> None: ...
+    def owns_tag(self, tag: str) -> bool: ...
+    async def reshard(self, shards: Union[int, Iterable[Hashable]]) -> None: ...
+    def plan_capacity(self) -> CapacityPlan: ...
+    def tune_intervals(self) -> CapacityPlan: ...
     def run_forever(self) -> None: ...
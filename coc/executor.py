@@ -0,0 +1,265 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import functools
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Union
+
+from .players import ClanMember
+from .raid import RaidAttack, RaidClan, RaidDistrict, RaidLogEntry, RaidMember
+from .war_attack import WarAttack
+from .wars import ClanWar
+
+
+class ModelSnapshot:
+    """A picklable copy of a clan, player or war, which doesn't hold on to the client.
+
+    This is what listeners registered with an ``executor`` are passed under the hood. It only holds the
+    object's class and the data it was built from, and is turned back into an object by :meth:`ModelSnapshot.load`.
+
+    Objects that can only be built by their parent, such as a raid attack, are snapshotted as the parent and
+    the path to them, so they're rebuilt along with everything they link back to.
+
+    Attributes
+    -----------
+    cls:
+        The class of the object, or of its parent.
+    data:
+        :class:`dict` - The data the object, or its parent, was built from.
+    kwargs:
+        :class:`dict` - Any other arguments the object needs, such as the war of an attack.
+    path:
+        Tuple[Tuple[:class:`str`, :class:`int`]] - The attributes and list indexes leading from the parent to
+        the object. Empty if the object was snapshotted itself.
+    """
+
+    __slots__ = ("cls", "data", "kwargs", "path")
+
+    def __init__(self, cls, data: dict, path: tuple = (), **kwargs):
+        self.cls = cls
+        self.data = data
+        self.kwargs = kwargs
+        self.path = path
+
+    def __repr__(self):
+        return "<%s cls=%s path=%s>" % (self.__class__.__name__, self.cls.__name__, self.path)
+
+    def load(self):
+        """Build a new object from the snapshot. The object has no client, so it can't make any requests."""
+        kwargs = {key: load_snapshot(value) for key, value in self.kwargs.items()}
+        obj = self.cls(data=self.data, client=None, **kwargs)
+        for attribute, index in self.path:
+            obj = getattr(obj, attribute)[index]
+        return obj
+
+
+def snapshot(obj: Any) -> Any:
+    """Turn an object into a :class:`ModelSnapshot`, if it was built with its raw data.
+
+    Lists and tuples, such as a batch of events, are snapshotted item by item.
+    Anything else, such as a troop or an int, is returned as is.
+    """
+    if isinstance(obj, (list, tuple)):
+        return _map_items(snapshot, obj)
+    if isinstance(obj, (RaidAttack, RaidClan, RaidDistrict, RaidMember)):
+        return _snapshot_raid_child(obj)
+
+    data = getattr(obj, "_raw_data", None)
+    if data is None:
+        return obj
+
+    kwargs = {}
+    if isinstance(obj, ClanWar):
+        # so the clan and opponent aren't switched around when it's rebuilt.
+        kwargs["clan_tag"] = obj.clan_tag
+    elif isinstance(obj, RaidLogEntry):
+        kwargs["clan_tag"] = obj.clan_tag
+    elif isinstance(obj, WarAttack):
+        kwargs["war"] = snapshot(obj.war)
+    elif isinstance(obj, ClanMember):
+        clan = snapshot(obj.clan)
+        if isinstance(clan, ModelSnapshot):
+            kwargs["clan"] = clan
+
+    return ModelSnapshot(type(obj), data, **kwargs)
+
+
+def _index(items, obj):
+    for index, item in enumerate(items):
+        if item is obj:
+            return index
+    return None
+
+
+def _raid_path(obj) -> tuple:
+    # the children of a raid log entry need the objects they belong to, so they're found again from the entry.
+    if isinstance(obj, RaidMember):
+        return (("members", _index(obj.raid_log_entry.members, obj)), )
+    if isinstance(obj, RaidClan):
+        entry = obj.raid_log_entry
+        index = _index(entry.attack_log, obj)
+        if index is not None:
+            return (("attack_log", index), )
+        return (("defense_log", _index(entry.defense_log, obj)), )
+    if isinstance(obj, RaidDistrict):
+        return _raid_path(obj.raid_clan) + (("districts", _index(obj.raid_clan.districts, obj)), )
+    return _raid_path(obj.district) + (("attacks", _index(obj.district.attacks, obj)), )
+
+
+def _snapshot_raid_child(obj):
+    entry = obj.raid_log_entry
+    data = getattr(entry, "_raw_data", None)
+    if data is None:
+        return obj
+    path = _raid_path(obj)
+    if any(index is None for _, index in path):
+        # it isn't one of the entry's own objects, so it can't be found again.
+        return obj
+    return ModelSnapshot(type(entry), data, path=path, clan_tag=entry.clan_tag)
+
+
+def load_snapshot(obj: Any) -> Any:
+    """The reverse of :func:`snapshot`."""
+    if isinstance(obj, (list, tuple)):
+        return _map_items(load_snapshot, obj)
+    return obj.load() if isinstance(obj, ModelSnapshot) else obj
+
+
+def _map_items(function, items):
+    if isinstance(items, list):
+        return [function(item) for item in items]
+    if hasattr(items, "_fields"):
+        # a named tuple, ie. a BatchedEvent.
+        return type(items)(*(function(item) for item in items))
+    return tuple(function(item) for item in items)
+
+
+def _call_listener(function, args):
+    # this runs in the executor, so it must be importable for process pools.
+    result = function(*(load_snapshot(arg) for arg in args))
+    if asyncio.iscoroutine(result):
+        asyncio.run(result)
+
+
+class ListenerExecutors:
+    """Keeps the thread and process pools that listeners registered with an ``executor`` run in.
+
+    Parameters
+    -----------
+    max_workers:
+        Optional[:class:`int`] - The max number of threads or processes in each pool.
+        Defaults to ``None``, which is the default of :class:`concurrent.futures.ThreadPoolExecutor`
+        and :class:`concurrent.futures.ProcessPoolExecutor`.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._pools: Dict[str, Executor] = {}
+
+    def __repr__(self):
+        return "<%s pools=%s>" % (self.__class__.__name__, list(self._pools))
+
+    def get(self, executor: Union[str, Executor]) -> Executor:
+        """Get the pool for ``"thread"`` or ``"process"``, creating it if it doesn't exist yet.
+
+        An :class:`concurrent.futures.Executor` is returned as is.
+        """
+        if isinstance(executor, Executor):
+            return executor
+
+        try:
+            return self._pools[executor]
+        except KeyError:
+            pass
+
+        if executor == "thread":
+            pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="coc-listener")
+        elif executor == "process":
+            pool = ProcessPoolExecutor(self.max_workers)
+        else:
+            raise ValueError("executor must be 'thread', 'process' or an Executor, not {!r}".format(executor))
+
+        self._pools[executor] = pool
+        return pool
+
+    def wrap(self, function: Callable, executor: Union[str, Executor]) -> Callable:
+        """Wrap a listener in a coroutine that runs it in the executor, with its arguments as snapshots."""
+        pool = self.get(executor)
+
+        @functools.wraps(function)
+        async def wrapped(*args):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(pool, _call_listener, function, tuple(snapshot(arg) for arg in args))
+
+        return wrapped
+
+    def shutdown(self) -> None:
+        """Shut down every pool created by this, without waiting for running listeners."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+        self._pools.clear()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps for ``interval`` seconds.
+
+    A loop that isn't blocked wakes it up on time. A listener that blocks the loop, for example by rendering an
+    image, shows up as lag, which makes this useful to see the benefit of moving listeners to an executor.
+
+    Parameters
+    -----------
+    interval:
+        :class:`float` - The number of seconds between 2 measurements.
+    window:
+        :class:`int` - The number of recent measurements the mean and max are worked out from.
+    """
+
+    def __init__(self, interval: float = 1.0, window: int = 60):
+        self.interval = interval
+        self._samples = deque(maxlen=window)
+
+    def __repr__(self):
+        return "<%s lag=%.3f>" % (self.__class__.__name__, self.stats["last"])
+
+    def record(self, lag: float) -> None:
+        """Record a measurement, in seconds."""
+        self._samples.append(max(lag, 0.0))
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Dict[:class:`str`, :class:`float`]: The ``last``, ``mean`` and ``max`` lag in seconds."""
+        samples = self._samples
+        if not samples:
+            return {"last": 0.0, "mean": 0.0, "max": 0.0}
+        return {"last": samples[-1], "mean": sum(samples) / len(samples), "max": max(samples)}
+
+    async def run(self) -> None:
+        """Measure the lag until cancelled."""
+        while True:
+            start = monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(monotonic() - start - self.interval)
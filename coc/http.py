@@ -22,6 +22,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import asyncio
+import hashlib
 import logging
 import re
 
@@ -46,11 +47,24 @@ from .errors import (
     InvalidCredentials,
     GatewayError,
 )
-from .utils import FIFO, HTTPStats
+from .utils import (
+    FIFO,
+    HTTPStats,
+    from_timestamp,
+    get_cwl_start,
+    get_raid_weekend_start,
+    get_season_end,
+)
 
 LOG = logging.getLogger(__name__)
 KEY_MINIMUM, KEY_MAXIMUM = 1, 10
 stats_url_matcher = re.compile(r"%23[\da-zA-Z]+|\d{8,}|global")
+season_matcher = re.compile(r"\d{4}-\d{2}")
+
+
+def fingerprint(body: bytes) -> str:
+    """A short, stable hash of a response body, used to tell whether a resource has changed between 2 requests."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
 
 
 async def json_or_text(response: aiohttp.ClientResponse):
@@ -143,6 +157,102 @@ class BatchThrottler:
         pass
 
 
+class CachePolicy:
+    """Computes how long a successful response is cached for, based on the decoded payload.
+
+    The API's ``Cache-Control`` header is only a lower bound - a lot of the data can't change anymore
+    once certain conditions hold (an ended war, an ended raid weekend, a league catalogue...).
+    Subclass this and override :attr:`rules` or any of the rule methods to tweak the built-in rules.
+
+    This only affects how long a response is kept in the cache, the ``_response_retry`` attribute of
+    returned objects always reflects the ``Cache-Control`` header.
+    """
+
+    #: How long league, location and label catalogues are cached for, in seconds.
+    catalogue_max_age = 24 * 60 * 60
+    #: How long historical pages (war log pages after a cursor, finished league seasons) are cached for.
+    history_max_age = 24 * 60 * 60
+
+    rules = {
+        "/clanwarleagues/wars/{}": "league_war",
+        "/clans/{}/currentwar/leaguegroup": "league_group",
+        "/clans/{}/capitalraidseasons": "raid_log",
+        "/clans/{}/warlog": "war_log",
+        "/goldpass/seasons/current": "gold_pass_season",
+        "/leagues/{}/seasons/{}": "history",
+        "/leagues": "catalogue",
+        "/leagues/{}": "catalogue",
+        "/builderbaseleagues": "catalogue",
+        "/builderbaseleagues/{}": "catalogue",
+        "/warleagues": "catalogue",
+        "/warleagues/{}": "catalogue",
+        "/capitalleagues": "catalogue",
+        "/capitalleagues/{}": "catalogue",
+        "/locations": "catalogue",
+        "/locations/{}": "catalogue",
+        "/labels/clan": "catalogue",
+        "/labels/players": "catalogue",
+    }
+
+    def __call__(self, route, data, max_age):
+        """Return the number of seconds to cache ``data`` for. ``max_age`` is the ``Cache-Control`` max age."""
+        rule = self.rules.get(season_matcher.sub("{}", route.stats_key.split("?", 1)[0]))
+        if rule is None:
+            return max_age
+
+        ttl = getattr(self, rule)(route, data)
+        if ttl is None:
+            return max_age
+        return max(max_age, int(ttl))
+
+    @staticmethod
+    def _now():
+        return datetime.now(tz=timezone.utc).replace(tzinfo=None)
+
+    def _seconds_until(self, time):
+        return (time - self._now()).total_seconds()
+
+    def league_war(self, route, data):
+        # ended CWL wars can't change anymore, and their war tag won't be used after the season.
+        if data.get("state") == "warEnded":
+            return self._seconds_until(get_season_end())
+        return None
+
+    def league_group(self, route, data):
+        # an ended league group stays the same until sign-up for the next CWL opens. During a CWL it could be
+        # last month's group, which is replaced as soon as the clan signs up, so it isn't kept for longer then.
+        if data.get("state") == "ended":
+            start = get_cwl_start(self._now())
+            if start > self._now():
+                return self._seconds_until(start)
+        return None
+
+    def raid_log(self, route, data):
+        # once every raid weekend on the page has ended, a new entry only appears with the next raid weekend.
+        items = data.get("items")
+        if items and all(item.get("state") == "ended" for item in items):
+            return self._seconds_until(get_raid_weekend_start())
+        return None
+
+    def war_log(self, route, data):
+        # pages after a cursor only contain wars that have ended a while ago.
+        if "after=" in route.url:
+            return self.history_max_age
+        return None
+
+    def gold_pass_season(self, route, data):
+        end_time = data.get("endTime")
+        if end_time:
+            return self._seconds_until(from_timestamp(end_time))
+        return None
+
+    def history(self, route, data):
+        return self.history_max_age
+
+    def catalogue(self, route, data):
+        return self.catalogue_max_age
+
+
 class Route:
     """Helper class to create endpoint URLs."""
     ignored_kwargs = ['lookup_cache', 'update_cache', 'ignore_cached_errors']
@@ -214,6 +324,7 @@ class HTTPClient:
             lookup_cache=True,
             update_cache=True,
             ignore_cached_errors=None,
+            cache_policy=CachePolicy,
     ):
         self.aiohttp_request_kwargs = ['params', 'data', 'json', 'cookies', 'headers', 'skip_auto_headers',
                                        'auth', 'allow_redirects', 'max_redirects', 'compress', 'chunked', 'expect100',
@@ -235,6 +346,7 @@ class HTTPClient:
         self.__session: Optional[aiohttp.ClientSession] = None
         self.__lock = asyncio.Semaphore(per_second)
         self.cache = cache_max_size and FIFO(cache_max_size)
+        self.cache_policy = cache_policy and cache_policy()
         self._cache_remove_count = 0
         self.stats = stats_max_size and HTTPStats(max_size=stats_max_size)
         if base_url and isinstance(base_url, str) and len(base_url) > 0:
@@ -300,8 +412,8 @@ class HTTPClient:
             try:
                 data = cache[cache_control_key]
                 status_code = data.get("status_code")
-                if data.get("timestamp") and data.get("timestamp") + data.get("_response_retry", 0) < datetime.now(
-                        tz=timezone.utc).timestamp():
+                max_age = data.get("_cache_max_age", data.get("_response_retry", 0))
+                if data.get("timestamp") and data.get("timestamp") + max_age < datetime.now(tz=timezone.utc).timestamp():
                     self._cache_remove(cache_control_key)
                 elif not status_code or 200 <= status_code < 300:
                     return data
@@ -335,6 +447,9 @@ class HTTPClient:
                         if isinstance(data, dict):
                             data["status_code"] = response.status
                             data["timestamp"] = datetime.now(tz=timezone.utc).timestamp()
+                            if 200 <= response.status < 300:
+                                # the body has already been read, so this doesn't read it twice.
+                                data["_fingerprint"] = fingerprint(await response.read())
                         try:
                             # set a callback to remove the item from cache once it's stale.
                             delta = int(response.headers["Cache-Control"].strip("max-age=").strip("public max-age="))
@@ -342,6 +457,9 @@ class HTTPClient:
                             # 600 but that is not true. Correct is 0
                             data["_response_retry"] = delta if 'realtime' not in url else 0
                             if isinstance(cache, FIFO) and (update_cache or (update_cache is None and 'realtime' not in url)):
+                                if self.cache_policy and 200 <= response.status < 300:
+                                    # some responses are known to stay the same for longer than the header says.
+                                    delta = data["_cache_max_age"] = self.cache_policy(route, data, delta)
                                 self.cache[cache_control_key] = data
                                 LOG.debug("Cache-Control max age: %s seconds, key: %s", delta, cache_control_key)
                                 self.loop.call_later(delta, self._cache_remove, cache_control_key)
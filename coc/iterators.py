@@ -138,6 +138,9 @@ class PlayerIterator(TaggedIterator):
         self.members = kwargs.pop("members", {})
 
     async def get_player(self, tag, cls=None, **kwargs):
+        if tag in self.members:
+            # the player is mutated below, so it mustn't be an object shared through the client's model cache.
+            kwargs["model_cache"] = False
         if cls:
             player = await self.client.get_player(tag, cls=cls, **kwargs)
         else:
@@ -165,6 +168,12 @@ class LeagueWarIterator(TaggedIterator):
         self.get_method = client.get_league_war
         self.clan_tag = clan_tag
 
+    async def _fill_queue(self):
+        if self.clan_tag is not None:
+            # pylint: disable=protected-access
+            self.tags = list(self.client._league_war_index.filter_tags(self.tags, self.clan_tag))
+        await super()._fill_queue()
+
     async def _next(self):
         war = await super()._next()
         if war is None:
@@ -0,0 +1,129 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections import Counter, deque
+from time import monotonic
+from typing import Any, Dict, Optional
+
+
+class UpdaterMetrics:
+    """Measures how well one of the clan, player, war or raid updaters is keeping up with its tags.
+
+    A loop that takes longer and longer, or tags that are refreshed later and later after they're due, show that
+    the updater is falling behind, well before its events do.
+
+    Parameters
+    -----------
+    window:
+        :class:`int` - The number of recent loops the mean and max loop duration are worked out from.
+    rate_window:
+        :class:`float` - The number of seconds the tags polled per second are worked out over.
+
+    Attributes
+    -----------
+    loops:
+        :class:`int` - The number of loops run so far.
+    tags_polled:
+        :class:`int` - The number of tags refreshed so far.
+    lag:
+        :class:`float` - The number of seconds the most overdue tag was refreshed late by in the last loop.
+    max_lag:
+        :class:`float` - The highest ``lag`` seen so far.
+    errors:
+        :class:`collections.Counter` - The number of errors raised while refreshing a tag, by the name of the
+        exception, ie. ``Maintenance``.
+    listener_calls:
+        :class:`int` - The number of listeners of this updater that have finished.
+    listener_time:
+        :class:`float` - The total number of seconds those listeners ran for.
+    """
+
+    def __init__(self, window: int = 60, rate_window: float = 60.0):
+        self.rate_window = rate_window
+        self.loops = 0
+        self.tags_polled = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.errors = Counter()
+        self.listener_calls = 0
+        self.listener_time = 0.0
+
+        self._durations = deque(maxlen=window)
+        # (monotonic time a loop finished, the number of tags it refreshed)
+        self._polls = deque()
+        self._started = monotonic()
+
+    def __repr__(self):
+        return "<%s loops=%s lag=%.3f>" % (self.__class__.__name__, self.loops, self.lag)
+
+    def record_loop(self, duration: float, tags: int, lag: float, now: Optional[float] = None) -> None:
+        """Record a loop that took ``duration`` seconds to refresh ``tags`` tags, the most overdue of which was
+        ``lag`` seconds late."""
+        now = monotonic() if now is None else now
+        self.loops += 1
+        self.tags_polled += tags
+        self.lag = max(lag, 0.0)
+        self.max_lag = max(self.max_lag, self.lag)
+        self._durations.append(duration)
+        self._polls.append((now, tags))
+        while self._polls and self._polls[0][0] < now - self.rate_window:
+            self._polls.popleft()
+
+    def record_error(self, exception: BaseException) -> None:
+        """Record an error raised while refreshing a tag."""
+        self.errors[type(exception).__name__] += 1
+
+    def record_listener(self, seconds: float) -> None:
+        """Record a listener that ran for ``seconds`` seconds."""
+        self.listener_calls += 1
+        self.listener_time += seconds
+
+    def tags_per_second(self, now: Optional[float] = None) -> float:
+        """The number of tags refreshed per second over the last ``rate_window`` seconds."""
+        now = monotonic() if now is None else now
+        polls = [tags for finished, tags in self._polls if finished >= now - self.rate_window]
+        # an updater that started less than rate_window seconds ago has only had that long to refresh them.
+        elapsed = min(self.rate_window, now - self._started)
+        return sum(polls) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Dict[:class:`str`, Any]: A snapshot of every measurement.
+
+        ``last_duration``, ``mean_duration`` and ``max_duration`` are in seconds, and ``errors`` is a plain
+        :class:`dict`.
+        """
+        durations = self._durations
+        return {
+            "loops": self.loops,
+            "last_duration": durations[-1] if durations else 0.0,
+            "mean_duration": sum(durations) / len(durations) if durations else 0.0,
+            "max_duration": max(durations) if durations else 0.0,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "tags_polled": self.tags_polled,
+            "tags_per_second": self.tags_per_second(),
+            "errors": dict(self.errors),
+            "listener_calls": self.listener_calls,
+            "listener_time": self.listener_time,
+        }
@@ -0,0 +1,122 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import sqlite3
+import zlib
+
+from abc import ABC, abstractmethod
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import orjson
+
+
+class SnapshotRecord(NamedTuple):
+    """The last response seen for a tracked tag, as it's persisted.
+
+    Attributes
+    -----------
+    type:
+        :class:`str` - The type of tag, ie. ``clan``, ``player`` or ``war``.
+    key:
+        :class:`str` - The tag. For wars, this is the tag of the clan.
+    data:
+        :class:`dict` - The raw data of the response, including when it was received and its fingerprint.
+    """
+
+    type: str
+    key: str
+    data: dict
+
+
+class SnapshotPersistence(ABC):
+    """The base class for somewhere the last response of every tracked tag is saved to, so that an
+    :class:`EventsClient` can carry on where it left off after a restart.
+
+    Every method is called in a thread, so they may block. They are never called concurrently.
+    """
+
+    @abstractmethod
+    def load(self, keys: Optional[Iterable[Tuple[str, str]]] = None) -> Iterable[SnapshotRecord]:
+        """Load every record which has been saved, or only those of the ``(type, key)`` pairs in ``keys``."""
+
+    @abstractmethod
+    def save(self, updated: Iterable[SnapshotRecord], removed: Iterable[Tuple[str, str]]) -> None:
+        """Save the records which have changed since the last save, and delete the ``(type, key)``
+        pairs of tags which are no longer tracked."""
+
+    def close(self) -> None:
+        """Close any connection. This is called when the client is closed."""
+
+
+class SQLiteSnapshotPersistence(SnapshotPersistence):
+    """Saves records to a local SQLite database, compressed with :mod:`zlib`.
+
+    Parameters
+    -----------
+    path:
+        :class:`str` - The path of the database file, which is created if it doesn't exist.
+    level:
+        :class:`int` - The :mod:`zlib` compression level, from 1 (quickest) to 9 (smallest).
+    """
+
+    def __init__(self, path: str = "coc_snapshots.db", level: int = 6):
+        self.path = path
+        self.level = level
+        self._connection = None
+
+    def __repr__(self):
+        return "<%s path=%r>" % (self.__class__.__name__, self.path)
+
+    def _connect(self):
+        if self._connection is None:
+            # every call is made from whichever thread is free, but never 2 at once.
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots "
+                "(type TEXT NOT NULL, key TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (type, key))"
+            )
+        return self._connection
+
+    def load(self, keys: Optional[Iterable[Tuple[str, str]]] = None) -> List[SnapshotRecord]:
+        connection = self._connect()
+        if keys is None:
+            rows = connection.execute("SELECT type, key, data FROM snapshots").fetchall()
+        else:
+            query = "SELECT type, key, data FROM snapshots WHERE type = ? AND key = ?"
+            rows = [row for key in keys for row in connection.execute(query, key)]
+        return [SnapshotRecord(type_, key, orjson.loads(zlib.decompress(data))) for type_, key, data in rows]
+
+    def save(self, updated: Iterable[SnapshotRecord], removed: Iterable[Tuple[str, str]]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO snapshots (type, key, data) VALUES (?, ?, ?)",
+                ((record.type, record.key, zlib.compress(orjson.dumps(record.data), self.level)) for record in updated),
+            )
+            connection.executemany("DELETE FROM snapshots WHERE type = ? AND key = ?", removed)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,176 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from typing import Dict, Iterable, NamedTuple, Optional
+
+
+class TagClassPlan(NamedTuple):
+    """How often the tags of one type are refreshed, and what that costs.
+
+    Attributes
+    -----------
+    type:
+        :class:`str` - The type of tag, ie. ``clan``, ``player`` or ``war``.
+    tags:
+        :class:`int` - The number of tags that are requested.
+    interval:
+        :class:`float` - The mean number of seconds between 2 refreshes of a tag, if there's enough capacity.
+    requests:
+        :class:`float` - The number of requests per second needed to refresh every tag that often.
+    staleness:
+        :class:`float` - The mean number of seconds between 2 refreshes of a tag once capacity is shared out,
+        ie. how old an update may be by the time it's seen.
+    """
+
+    type: str
+    tags: int
+    interval: float
+    requests: float
+    staleness: float
+
+
+class CapacityPlan(NamedTuple):
+    """Whether the requests needed to refresh every tracked tag fit within the requests available.
+
+    Attributes
+    -----------
+    capacity:
+        :class:`float` - The number of requests per second available, ie. ``key_count * throttle_limit``.
+    required:
+        :class:`float` - The number of requests per second needed.
+    classes:
+        Dict[:class:`str`, :class:`TagClassPlan`] - The plan of each type of tag.
+    """
+
+    capacity: float
+    required: float
+    classes: Dict[str, TagClassPlan]
+
+    @property
+    def utilisation(self) -> float:
+        """:class:`float`: The share of the capacity needed. Anything above 1 can't keep up."""
+        return self.required / self.capacity if self.capacity else float("inf")
+
+    @property
+    def over_capacity(self) -> bool:
+        """:class:`bool`: Whether more requests are needed than are available."""
+        return self.utilisation > 1
+
+
+def _interval(ttl, retry_interval, min_interval):
+    # a tag is refreshed when its response goes stale, but never more often than the retry interval allows.
+    return max(ttl, retry_interval, min_interval)
+
+
+def _required(ttls, retry_intervals, costs, min_interval):
+    return sum(
+        costs.get(type_, 1.0) / _interval(ttl, retry_intervals.get(type_, 0), min_interval)
+        for type_, values in ttls.items()
+        for ttl in values
+    )
+
+
+def plan_capacity(
+    ttls: Dict[str, Iterable[float]],
+    retry_intervals: Dict[str, float],
+    capacity: float,
+    costs: Optional[Dict[str, float]] = None,
+    min_interval: float = 1.0,
+) -> CapacityPlan:
+    """Work out how many requests are needed to refresh every tag, and how stale they get.
+
+    Parameters
+    -----------
+    ttls:
+        Dict[:class:`str`, Iterable[:class:`float`]] - The number of seconds the last response of every tag,
+        by type, is cached for. ``0`` if it isn't known yet.
+    retry_intervals:
+        Dict[:class:`str`, :class:`float`] - The min number of seconds between 2 refreshes of a tag, by type.
+    capacity:
+        :class:`float` - The number of requests per second available.
+    costs:
+        Optional[Dict[:class:`str`, :class:`float`]] - The number of requests a refresh takes, by type.
+        Defaults to 1.
+    min_interval:
+        :class:`float` - The min number of seconds between 2 refreshes of any tag.
+    """
+    costs = costs or {}
+    plans = {}
+    for type_, values in ttls.items():
+        intervals = [_interval(ttl, retry_intervals.get(type_, 0), min_interval) for ttl in values]
+        plans[type_] = (
+            len(intervals),
+            sum(intervals) / len(intervals) if intervals else 0.0,
+            sum(costs.get(type_, 1.0) / interval for interval in intervals),
+        )
+
+    required = sum(requests for _, _, requests in plans.values())
+    # once there are more requests than capacity, every tag is refreshed that much less often.
+    slowdown = max(required / capacity, 1.0) if capacity else float("inf")
+    classes = {
+        type_: TagClassPlan(type_, tags, interval, requests, interval * slowdown if tags else 0.0)
+        for type_, (tags, interval, requests) in plans.items()
+    }
+    return CapacityPlan(capacity, required, classes)
+
+
+def tune_retry_intervals(
+    ttls: Dict[str, Iterable[float]],
+    min_retry_intervals: Dict[str, float],
+    budget: float,
+    costs: Optional[Dict[str, float]] = None,
+    min_interval: float = 1.0,
+) -> Dict[str, float]:
+    """Work out the shortest retry intervals that keep the requests needed within ``budget``.
+
+    Every type's retry interval is raised to the same number of seconds, so the tags that are refreshed most often
+    are slowed down first. A retry interval is never lowered below its ``min_retry_intervals``.
+
+    Returns
+    --------
+    Dict[:class:`str`, :class:`float`]
+        The retry interval of each type.
+    """
+    costs = costs or {}
+    ttls = {type_: list(values) for type_, values in ttls.items()}
+
+    def retry_intervals(seconds):
+        return {type_: max(min_retry_intervals.get(type_, 0), seconds) for type_ in ttls}
+
+    if _required(ttls, retry_intervals(0), costs, min_interval) <= budget:
+        return retry_intervals(0)
+
+    # the requests needed only go down as the interval goes up, so look for the lowest one that fits.
+    low, high = 0.0, 1.0
+    while _required(ttls, retry_intervals(high), costs, min_interval) > budget:
+        low, high = high, high * 2
+        if high > 7 * 24 * 60 * 60:
+            break
+
+    for _ in range(30):
+        middle = (low + high) / 2
+        if _required(ttls, retry_intervals(middle), costs, min_interval) > budget:
+            low = middle
+        else:
+            high = middle
+    return retry_intervals(high)
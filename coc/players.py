@@ -51,6 +51,11 @@ if TYPE_CHECKING:
     from .clans import Clan  # noqa
 
 
+def _load_without_game_data(data, townhall, default, **_):
+    # used instead of the client's holders when a player is built without a client.
+    return default(data=data, townhall=townhall)
+
+
 class ClanMember(BasePlayer):
     """Represents a Clash of Clans Clan Member.
 
@@ -361,11 +366,11 @@ class Player(ClanMember):
 
         label_cls = self.label_cls
         achievement_cls = self.achievement_cls
-        troop_loader = self._client._troop_holder.load if self._client else None
-        hero_loader = self._client._hero_holder.load if self._client else None
-        spell_loader = self._client._spell_holder.load if self._client else None
-        pet_loader = self._client._pet_holder.load if self._client else None
-        equipment_loader = self._client._equipment_holder.load if self._client else None
+        troop_loader = self._client._troop_holder.load if self._client else _load_without_game_data
+        hero_loader = self._client._hero_holder.load if self._client else _load_without_game_data
+        spell_loader = self._client._spell_holder.load if self._client else _load_without_game_data
+        pet_loader = self._client._pet_holder.load if self._client else _load_without_game_data
+        equipment_loader = self._client._equipment_holder.load if self._client else _load_without_game_data
 
         if self._game_files_loaded:
             pet_lookup = [p.name for p in self._client._pet_holder.items]
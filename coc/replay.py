@@ -0,0 +1,300 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import os
+import time
+
+from time import monotonic
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import orjson
+
+
+class ReplayRecord(NamedTuple):
+    """A response of a tracked tag, as it's recorded and replayed.
+
+    Attributes
+    -----------
+    type:
+        :class:`str` - The type of tag, ie. ``clan``, ``player``, ``war`` or ``raid``.
+    tag:
+        :class:`str` - The tag. For wars and raids, this is the tag of the clan.
+    data:
+        :class:`dict` - The raw data of the response.
+    time:
+        Optional[:class:`float`] - The unix timestamp the response was received at, if it's known.
+    """
+
+    type: str
+    tag: str
+    data: dict
+    time: Optional[float] = None
+
+
+def _make_record(type_: str, data: dict, tag: Optional[str] = None, time_: Optional[float] = None) -> ReplayRecord:
+    if "body" in data and "response_code" in data:
+        # a response as it's saved in tests/mockdata.
+        data = data["body"]
+    # a war's clan is the one it's for, unless the record says otherwise.
+    tag = tag or data.get("tag") or (data.get("clan") or {}).get("tag")
+    if tag is None:
+        raise ValueError("a {} record needs the tag of its clan".format(type_))
+    return ReplayRecord(type_, tag, data, time_)
+
+
+def read_records(source: Union[str, os.PathLike, IO]) -> Iterator[ReplayRecord]:
+    """Read the records of an NDJSON file, one at a time.
+
+    Every line is an object with the ``type`` and ``data`` of a response, and optionally its ``tag`` and ``time``,
+    as they're written by :class:`ReplayRecorder`. The ``data`` can also be a response as it's saved in
+    ``tests/mockdata``.
+
+    Parameters
+    -----------
+    source:
+        The path of the file, or a file object opened to read it.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            yield from read_records(file)
+        return
+
+    for line in source:
+        line = line.strip()
+        if not line:
+            continue
+        item = orjson.loads(line)
+        yield _make_record(item["type"], item["data"], item.get("tag"), item.get("time"))
+
+
+def read_mockdata(type_: str, *paths: Union[str, os.PathLike], tag: Optional[str] = None) -> List[ReplayRecord]:
+    """Make a record of every response saved in ``tests/mockdata``, in the order of ``paths``.
+
+    Wars and raids need the ``tag`` of the clan they're for, unless it's in the response.
+    """
+    records = []
+    for path in paths:
+        with open(path, "rb") as file:
+            records.append(_make_record(type_, orjson.loads(file.read()), tag))
+    return records
+
+
+class ReplayRecorder:
+    """Writes every new clan, player, war and raid an :class:`EventsClient` gets to an NDJSON file, which can
+    be replayed with :class:`ReplayDriver` later.
+
+    Pass it to the client as ``recorder``. Objects need their raw data, so this turns on ``raw_attribute``.
+    Responses that haven't changed since the last one of the tag aren't written.
+
+    Parameters
+    -----------
+    path:
+        :class:`str` - The path of the file. Records are added to the end of it if it exists.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        self.records = 0
+        self._file = None
+
+    def __repr__(self):
+        return "<%s path=%r records=%s>" % (self.__class__.__name__, self.path, self.records)
+
+    def record(self, type_: str, tag: str, data: dict, time_: Optional[float] = None) -> None:
+        """Write a response of a tag."""
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        item = {"time": time.time() if time_ is None else time_, "type": type_, "tag": tag, "data": data}
+        self._file.write(orjson.dumps(item) + b"\n")
+        self.records += 1
+
+    def close(self) -> None:
+        """Close the file. This is called when the client is closed."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ReplayReport(NamedTuple):
+    """How quickly a :class:`ReplayDriver` got through its records.
+
+    Attributes
+    -----------
+    records:
+        :class:`int` - The number of records fed through the client.
+    skipped:
+        :class:`int` - The number of records that were identical to the last one of their tag.
+    events:
+        :class:`int` - The number of listeners, and batches of batched listeners, that finished.
+    seconds:
+        :class:`float` - How long the replay took, until every listener had finished.
+    mean_latency:
+        :class:`float` - The mean number of seconds a listener ran for.
+    p95_latency:
+        :class:`float` - The number of seconds 95% of listeners finished within.
+    max_latency:
+        :class:`float` - The longest a listener ran for.
+    """
+
+    records: int
+    skipped: int
+    events: int
+    seconds: float
+    mean_latency: float
+    p95_latency: float
+    max_latency: float
+
+    @property
+    def records_per_second(self) -> float:
+        """:class:`float`: The number of records fed through per second."""
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        """:class:`float`: The number of listeners that finished per second."""
+        return self.events / self.seconds if self.seconds > 0 else 0.0
+
+
+class ReplayDriver:
+    """Feeds recorded responses through the listeners of an :class:`EventsClient`, without requesting anything.
+
+    Every record goes through the same comparison and dispatch as a response the client requested itself, so
+    listeners get the same events they would have live. The client doesn't need to be logged in, and its tags
+    aren't requested while the replay runs. Game data for players is loaded the first time it's needed, as it
+    would have been by logging in.
+
+    Parameters
+    -----------
+    client:
+        :class:`EventsClient` - The client, with the listeners to replay the records to.
+    records:
+        Iterable[:class:`ReplayRecord`] - The records, in the order they're fed through.
+    speed:
+        Optional[:class:`float`] - How much quicker than they were recorded to feed the records through, ie. ``2``
+        for twice as quick. This needs the ``time`` of every record. Defaults to ``None``, which feeds them
+        through as quickly as possible.
+    """
+
+    def __init__(self, client, records: Iterable[ReplayRecord], speed: Optional[float] = None):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be greater than 0")
+        self.client = client
+        self.records = records
+        self.speed = speed
+
+    def __repr__(self):
+        return "<%s speed=%s>" % (self.__class__.__name__, self.speed)
+
+    async def _wait(self, record, start, first_time):
+        if self.speed is None or record.time is None or first_time is None:
+            return
+        delay = (record.time - first_time) / self.speed - (monotonic() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _feed(self, record: ReplayRecord) -> None:
+        # pylint: disable=protected-access
+        client, type_, tag, data = self.client, record.type, record.tag, record.data
+        if "_response_retry" not in data:
+            # responses saved without it, ie. in tests/mockdata, are treated as not cached.
+            data = {**data, "_response_retry": 0}
+        fingerprint = data.get("_fingerprint")
+        if type_ in ("clan", "player") and fingerprint is not None \
+                and fingerprint == client._stores[type_].fingerprint(tag):
+            # the client would have skipped building an identical response, too.
+            model = None
+        elif type_ == "clan":
+            model = client.clan_cls(data=data, client=client)
+        elif type_ == "player":
+            model = client.player_cls(data=data, client=client, load_game_data=client.load_game_data.always)
+        elif type_ == "war":
+            model = client.war_cls(data=data, client=client, clan_tag=tag)
+        elif type_ == "raid":
+            model = client.raid_cls(data=data, client=client, clan_tag=tag)
+        else:
+            raise ValueError("{!r} isn't a type of record".format(type_))
+
+        if type_ == "clan":
+            await client._apply_clan_update(tag, model)
+        elif type_ == "player":
+            await client._apply_player_update(tag, model)
+        elif type_ == "war":
+            await client._apply_war_update(tag, model)
+        else:
+            await client._apply_raid_update(tag, model, fingerprint)
+
+    async def run(self) -> ReplayReport:
+        """Feed every record through the client, and wait for their listeners to finish.
+
+        Batched listeners are passed their batch at the end.
+        """
+        # pylint: disable=protected-access
+        client = self.client
+        dispatcher = client._dispatcher
+        on_finish = dispatcher.on_finish
+        latencies = []
+
+        def record_latency(key, seconds):
+            latencies.append(seconds)
+            if on_finish is not None:
+                on_finish(key, seconds)
+
+        if not hasattr(client, "_troop_holder"):
+            # players need the holders, which are only created when logging in.
+            client._create_holders()
+
+        dispatcher.on_finish = record_latency
+        client._replaying = True
+        client._refresh_pollers()
+        skipped = sum(client.skipped_updates.values())
+        records = 0
+        start = monotonic()
+        try:
+            first_time = None
+            for record in self.records:
+                if first_time is None:
+                    first_time = record.time
+                await self._wait(record, start, first_time)
+                await self._feed(record)
+                records += 1
+
+            for batchers in client._batchers.values():
+                for batcher in batchers.values():
+                    await batcher.flush()
+            await dispatcher.join()
+        finally:
+            dispatcher.on_finish = on_finish
+            client._replaying = False
+            client._refresh_pollers()
+
+        latencies.sort()
+        return ReplayReport(
+            records,
+            sum(client.skipped_updates.values()) - skipped,
+            len(latencies),
+            monotonic() - start,
+            sum(latencies) / len(latencies) if latencies else 0.0,
+            latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else 0.0,
+            latencies[-1] if latencies else 0.0,
+        )
@@ -0,0 +1,398 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import heapq
+import logging
+
+from datetime import datetime, timezone
+from itertools import count
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 100
+
+
+def _get_nested(obj, attr):
+    for name in attr.split("."):
+        obj = getattr(obj, name, None)
+    return obj
+
+
+class PollScheduler:
+    """Keeps track of when every key, ie. a tag, is next due for a refresh.
+
+    Keys are kept in a min-heap ordered by the time they are next due, so finding the due keys doesn't
+    require walking every key. Due keys are passed to the worker by a fixed number of concurrent workers,
+    and are rescheduled with the number of seconds the worker returns.
+
+    Parameters
+    -----------
+    worker:
+        The coroutine function called with every due key. It returns the number of seconds until the key is next due.
+    workers:
+        :class:`int` - The max number of keys to refresh concurrently.
+    error_delay:
+        :class:`float` - The number of seconds until a key is retried if the worker raised an exception.
+    min_delay:
+        :class:`float` - The min number of seconds between 2 refreshes of a key.
+    on_error:
+        Optional[Callable] - Called with any exception raised by the worker.
+
+    Attributes
+    -----------
+    lag:
+        :class:`float` - The number of seconds the most overdue key was late by when due keys were last popped.
+    """
+
+    def __init__(
+        self,
+        worker: Callable[[Hashable], Awaitable[float]],
+        workers: int = DEFAULT_WORKERS,
+        error_delay: float = 10.0,
+        on_error: Optional[Callable[[BaseException], Any]] = None,
+        min_delay: float = 0.0,
+    ):
+        self.worker = worker
+        self.workers = workers
+        self.error_delay = error_delay
+        self.min_delay = min_delay
+        self.on_error = on_error
+
+        self._heap = []
+        # key: the time it is next due, or ``None`` while it is being refreshed.
+        # heap entries whose time doesn't match this are stale and skipped.
+        self._due: Dict[Hashable, Optional[float]] = {}
+        self._counter = count()
+        self._wakeup = asyncio.Event()
+        self.lag = 0.0
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, key):
+        return key in self._due
+
+    def __repr__(self):
+        return "<%s keys=%s>" % (self.__class__.__name__, len(self))
+
+    def add(self, key: Hashable, delay: float = 0.0) -> None:
+        """Start refreshing a key, which is due in ``delay`` seconds. Keys already added are left untouched."""
+        if key not in self._due:
+            self.schedule(key, delay)
+
+    def remove(self, key: Hashable) -> None:
+        """Stop refreshing a key. A refresh that is already running will finish, but the key won't be rescheduled."""
+        self._due.pop(key, None)
+
+    def schedule(self, key: Hashable, delay: float = 0.0) -> None:
+        """Set the key to be due in ``delay`` seconds."""
+        due = monotonic() + delay
+        self._due[key] = due
+        # the counter breaks ties, as keys aren't necessarily comparable.
+        heapq.heappush(self._heap, (due, next(self._counter), key))
+        if self._heap[0][0] == due:
+            self._wakeup.set()
+
+    def next_due(self) -> Optional[float]:
+        """The :func:`time.monotonic` time the next key is due at, or ``None`` if there are no keys."""
+        heap = self._heap
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float = None) -> List[Hashable]:
+        """Pop every key which is due, marking them as being refreshed."""
+        now = monotonic() if now is None else now
+        heap, keys = self._heap, []
+        while heap and heap[0][0] <= now:
+            due, _, key = heapq.heappop(heap)
+            if self._due.get(key) == due:
+                if not keys:
+                    # keys are popped in the order they were due, so the first is the most overdue.
+                    self.lag = now - due
+                self._due[key] = None
+                keys.append(key)
+        return keys
+
+    async def wait(self) -> None:
+        """Wait until at least one key is due."""
+        while True:
+            self._wakeup.clear()
+            due = self.next_due()
+            if due is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = due - monotonic()
+            if delay <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self) -> int:
+        """Refresh every key which is due, returning once they have all finished.
+
+        Returns
+        --------
+        :class:`int`
+            The number of keys refreshed.
+        """
+        keys = self.pop_due()
+        if not keys:
+            return 0
+
+        pending = iter(keys)
+        try:
+            await asyncio.gather(*(self._work(pending) for _ in range(min(self.workers, len(keys)))))
+        finally:
+            # if we were cancelled part way through, make sure none of the keys are left behind.
+            for key in keys:
+                if key in self._due and self._due[key] is None:
+                    self.schedule(key)
+        return len(keys)
+
+    async def _work(self, pending):
+        # pylint: disable=broad-except
+        for key in pending:
+            try:
+                delay = await self.worker(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exception:
+                delay = self.error_delay
+                if self.on_error:
+                    self.on_error(exception)
+                else:
+                    LOG.exception("Ignoring exception while refreshing %s", key)
+
+            if key in self._due and self._due[key] is None:
+                # it hasn't been removed or rescheduled while it was being refreshed.
+                self.schedule(key, max(delay, self.min_delay))
+
+
+class AdaptivePollPolicy:
+    """Polls tags that have changed recently more often, and backs off tags that haven't changed in a while.
+
+    Every refresh that doesn't see a change multiplies the tag's interval by ``backoff``, up to ``max_interval``.
+    As soon as a change is seen, the tag goes back to being refreshed as often as its response allows.
+
+    If ``request_budget`` is set, every interval is stretched by the same factor when the tracked tags would
+    otherwise need more requests per second than the budget.
+
+    Example
+    -------
+    .. code-block:: python3
+
+        policy = coc.AdaptivePollPolicy(max_interval=6 * 60 * 60, request_budget=200)
+        client = coc.EventsClient(poll_policy=policy)
+
+    Parameters
+    -----------
+    max_interval:
+        :class:`float` - The max number of seconds between 2 refreshes of an inactive tag. Defaults to 6 hours.
+    backoff:
+        :class:`float` - The factor the interval grows by for every refresh without a change. Defaults to 2.
+    request_budget:
+        Optional[:class:`float`] - The max number of requests per second to spend on refreshes, across every
+        tracked tag. Defaults to ``None``, which is no budget.
+    """
+
+    #: Maps the type of tag to the attributes compared to decide whether a tag has changed.
+    #: Changes to any other attribute still fire events, but don't reset the interval.
+    activity_attributes: Dict[str, Tuple[str, ...]] = {
+        "player": (
+            "name", "exp_level", "town_hall", "trophies", "builder_base_trophies", "attack_wins", "defense_wins",
+            "donations", "received", "war_stars", "clan_capital_contributions",
+        ),
+        "clan": (
+            "name", "level", "member_count", "points", "builder_base_points", "capital_points", "war_wins",
+            "war_ties", "war_losses", "description",
+        ),
+        "war": (
+            "state", "preparation_start_time", "clan.attacks_used", "clan.stars", "opponent.attacks_used",
+            "opponent.stars",
+        ),
+        "raid": ("state", "start_time", "attack_count", "total_loot", "destroyed_district_count"),
+    }
+
+    def __init__(self, max_interval: float = 6 * 60 * 60, backoff: float = 2.0, request_budget: float = None):
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.request_budget = request_budget
+
+        self._unchanged: Dict[Hashable, int] = {}
+        self._rates: Dict[Hashable, float] = {}
+        self._total_rate = 0.0
+
+    def __repr__(self):
+        return "<%s tags=%s requests_per_second=%.2f>" % (self.__class__.__name__, len(self._rates), self.rate)
+
+    @property
+    def rate(self) -> float:
+        """:class:`float`: The number of requests per second the tracked tags need, before applying the budget."""
+        return self._total_rate
+
+    def has_changed(self, type_: str, cached, live) -> bool:
+        """Whether the tag has changed between 2 refreshes."""
+        if cached is None:
+            return True
+        return any(
+            _get_nested(cached, attr) != _get_nested(live, attr) for attr in self.activity_attributes.get(type_, ())
+        )
+
+    def get_interval(
+        self, type_: str, tag: Hashable, base: float, cached=None, live=None, changed: Optional[bool] = None
+    ) -> float:
+        """Get the number of seconds until a tag is next refreshed.
+
+        Parameters
+        -----------
+        type_:
+            :class:`str` - The type of tag, ie. ``player``.
+        tag:
+            The tag that was refreshed.
+        base:
+            :class:`float` - The number of seconds until a new response is available.
+        cached:
+            The object from the previous refresh, if any.
+        live:
+            The object that was just fetched.
+        changed:
+            Optional[:class:`bool`] - Whether the tag has changed, if it's already known.
+            This saves comparing ``cached`` and ``live``.
+        """
+        key = (type_, tag)
+        if changed is None:
+            changed = self.has_changed(type_, cached, live)
+        if changed:
+            unchanged = self._unchanged[key] = 0
+        else:
+            unchanged = self._unchanged[key] = self._unchanged.get(key, 0) + 1
+
+        # an exponent of 64 is more than enough to reach any sensible cap.
+        interval = max(min(base * self.backoff ** min(unchanged, 64), self.max_interval), base, 1.0)
+        self._set_rate(key, 1 / interval)
+
+        if self.request_budget and self._total_rate > self.request_budget:
+            interval *= self._total_rate / self.request_budget
+        return interval
+
+    def remove(self, type_: str, tag: Hashable) -> None:
+        """Forget about a tag which is no longer tracked."""
+        key = (type_, tag)
+        self._unchanged.pop(key, None)
+        self._set_rate(key, 0.0)
+
+    def _set_rate(self, key, rate):
+        self._total_rate += rate - self._rates.pop(key, 0.0)
+        if rate:
+            self._rates[key] = rate
+
+
+def _utcnow():
+    return datetime.now(tz=timezone.utc).replace(tzinfo=None)
+
+
+class ClockScheduler:
+    """Calls callbacks at times on the wall clock, ie. the end of a season, from a single task.
+
+    Rather than sleeping for weeks, which drifts from the wall clock if the machine is suspended or its clock
+    is changed, this never sleeps for more than ``max_sleep`` seconds before checking the clock again.
+
+    Parameters
+    -----------
+    max_sleep:
+        :class:`float` - The max number of seconds to sleep for before checking the clock again.
+    """
+
+    def __init__(self, max_sleep: float = 60.0):
+        self.max_sleep = max_sleep
+        # name: (the naive UTC time it's next due, the function giving the time after that, the callback)
+        self._jobs: Dict[Hashable, Tuple[datetime, Callable[[datetime], datetime], Callable[[], Any]]] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, name):
+        return name in self._jobs
+
+    def __repr__(self):
+        return "<%s jobs=%s>" % (self.__class__.__name__, len(self))
+
+    def add(self, name: Hashable, next_time: Callable[[datetime], datetime], callback: Callable[[], Any]) -> None:
+        """Call ``callback`` every time the clock reaches the time ``next_time`` returns.
+
+        ``next_time`` is passed a naive UTC datetime, and returns the first time it's due strictly after that.
+        Jobs already added are left untouched.
+        """
+        if name not in self._jobs:
+            self._jobs[name] = (next_time(_utcnow()), next_time, callback)
+            self._wakeup.set()
+
+    def remove(self, name: Hashable) -> None:
+        """Stop calling a job."""
+        self._jobs.pop(name, None)
+
+    def next_due(self) -> Optional[datetime]:
+        """The naive UTC time the next job is due at, or ``None`` if there are no jobs."""
+        return min((due for due, _, _ in self._jobs.values()), default=None)
+
+    def run_due(self, now: datetime = None) -> int:
+        """Call every job which is due, and schedule them for the next time. Returns the number of jobs called."""
+        # pylint: disable=broad-except
+        now = _utcnow() if now is None else now
+        called = 0
+        for name, (due, next_time, callback) in list(self._jobs.items()):
+            if due > now:
+                continue
+            self._jobs[name] = (next_time(due), next_time, callback)
+            called += 1
+            try:
+                callback()
+            except Exception:
+                LOG.exception("Ignoring exception in %s", name)
+        return called
+
+    async def run(self) -> None:
+        """Call jobs when they're due until cancelled."""
+        while True:
+            self._wakeup.clear()
+            due = self.next_due()
+            if due is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = (due - _utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, self.max_sleep))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.run_due()
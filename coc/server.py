@@ -0,0 +1,365 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import logging
+import time
+
+from collections import deque
+from typing import Callable, FrozenSet, Iterable, NamedTuple, Optional
+
+import orjson
+
+from aiohttp import web
+
+from .events import ClanEvents, PlayerEvents, RaidEvents, WarEvents
+from .sinks import _default
+from .utils import correct_tag
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_HISTORY = 1000
+DEFAULT_SUBSCRIBER_QUEUE = 1000
+DEFAULT_PORT = 8765
+KEEPALIVE_INTERVAL = 15
+
+EVENT_CLASSES = {"clan": ClanEvents, "player": PlayerEvents, "war": WarEvents, "raid": RaidEvents}
+# the attributes of a listener's arguments an event can be filtered by.
+TAG_ATTRIBUTES = ("tag", "clan_tag", "attacker_tag", "defender_tag")
+# older versions of aiohttp don't have typed app keys.
+HUB_KEY = web.AppKey("hub", object) if hasattr(web, "AppKey") else "hub"
+
+
+class StreamedEvent(NamedTuple):
+    """An event, as it's streamed to subscribers.
+
+    Attributes
+    -----------
+    id:
+        :class:`int` - The cursor of the event. Every event has a higher one than the last.
+    type:
+        :class:`str` - The type of the event, ie. ``clan``, ``player``, ``war`` or ``raid``.
+    event:
+        :class:`str` - The name of the event, ie. ``member_donations``.
+    tags:
+        FrozenSet[:class:`str`] - The tags of the listener's arguments, and the clans they belong to.
+    line:
+        :class:`bytes` - The event serialised to JSON, as it's sent.
+    """
+
+    id: int
+    type: str
+    event: str
+    tags: FrozenSet[str]
+    line: bytes
+
+
+def _event_tags(args) -> FrozenSet[str]:
+    tags = set()
+    for arg in args:
+        for attribute in TAG_ATTRIBUTES:
+            value = getattr(arg, attribute, None)
+            if value and isinstance(value, str):
+                tags.add(value)
+    return frozenset(tags)
+
+
+class EventSubscription:
+    """The events of an :class:`EventHub` one subscriber gets, which is iterated over to get them.
+
+    A subscriber that falls more than ``queue_size`` events behind is closed, rather than holding up the others or
+    keeping every event in memory. It still gets the events it was behind on, and can resume from the last one
+    with ``cursor``.
+
+    Attributes
+    -----------
+    tags:
+        Optional[FrozenSet[:class:`str`]] - Only events for one of these tags are sent.
+    types:
+        Optional[FrozenSet[:class:`str`]] - Only events of one of these types are sent.
+    events:
+        Optional[FrozenSet[:class:`str`]] - Only events with one of these names are sent.
+    overflowed:
+        :class:`bool` - Whether it was closed because it fell too far behind.
+    """
+
+    def __init__(self, hub, tags=None, types=None, events=None, queue_size=DEFAULT_SUBSCRIBER_QUEUE):
+        self.tags = frozenset(tags) if tags else None
+        self.types = frozenset(types) if types else None
+        self.events = frozenset(events) if events else None
+        self.queue_size = queue_size
+        self.overflowed = False
+        self.closed = False
+        self._hub = hub
+        self._queue = asyncio.Queue()
+        # the number of events replayed from a cursor that haven't been got yet, which it has room for on top of
+        # the queue size. They're queued before any live event, so they're always the first to be got.
+        self._backlog = 0
+
+    def __repr__(self):
+        return "<%s tags=%s types=%s events=%s>" % (self.__class__.__name__, self.tags, self.types, self.events)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> StreamedEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def matches(self, event: StreamedEvent) -> bool:
+        """Whether an event passes every filter of this subscription."""
+        return (
+            (self.types is None or event.type in self.types)
+            and (self.events is None or event.event in self.events)
+            and (self.tags is None or not self.tags.isdisjoint(event.tags))
+        )
+
+    def push(self, event: StreamedEvent, backlog: bool = False) -> None:
+        """Queue an event for the subscriber. Events replayed from a cursor (``backlog``) don't count towards the
+        ``queue_size``."""
+        if self.closed:
+            return
+        if backlog:
+            self._backlog += 1
+        elif self._queue.qsize() >= self.queue_size + self._backlog:
+            LOG.warning("%r fell %s events behind, so it's been closed", self, self.queue_size)
+            self.overflowed = True
+            self.close()
+            return
+        self._queue.put_nowait(event)
+
+    async def get(self) -> Optional[StreamedEvent]:
+        """Wait for the next event, or ``None`` once the subscription is closed."""
+        if self.closed and self._queue.empty():
+            return None
+        event = await self._queue.get()
+        if event is not None and self._backlog:
+            self._backlog -= 1
+        return event
+
+    def close(self) -> None:
+        """Stop getting new events. Events that were already queued can still be got."""
+        if self.closed:
+            return
+        self.closed = True
+        self._hub._subscriptions.discard(self)  # pylint: disable=protected-access
+        # marks the end, and wakes up anything waiting for the next event.
+        self._queue.put_nowait(None)
+
+
+class EventHub:
+    """Streams the events of one :class:`EventsClient` to any number of subscribers, so they share its requests.
+
+    The last ``history`` events are kept, so a subscriber that reconnects can resume from the cursor of the last
+    event it got. Cursors start again from 1 when the hub is restarted.
+
+    Parameters
+    -----------
+    history:
+        :class:`int` - The number of recent events kept for subscribers to resume from.
+    queue_size:
+        :class:`int` - The max number of events a subscriber can fall behind by before it's closed.
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscriptions = set()
+        self._last_id = 0
+
+    def __repr__(self):
+        return "<%s cursor=%s subscribers=%s>" % (self.__class__.__name__, self._last_id, len(self._subscriptions))
+
+    @property
+    def cursor(self) -> int:
+        """:class:`int`: The cursor of the last event published."""
+        return self._last_id
+
+    @property
+    def subscribers(self) -> int:
+        """:class:`int`: The number of open subscriptions."""
+        return len(self._subscriptions)
+
+    def publish(self, type_: str, event: str, *args) -> StreamedEvent:
+        """Send an event and its arguments to every subscriber it matches.
+
+        The arguments are serialised like :func:`serialise_event`.
+        """
+        self._last_id += 1
+        tags = _event_tags(args)
+        item = {
+            "id": self._last_id, "type": type_, "event": event, "tags": sorted(tags), "time": time.time(), "args": args
+        }
+        streamed = StreamedEvent(self._last_id, type_, event, tags, orjson.dumps(item, default=_default))
+        self._history.append(streamed)
+        for subscription in list(self._subscriptions):
+            if subscription.matches(streamed):
+                subscription.push(streamed)
+        return streamed
+
+    def subscribe(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        types: Optional[Iterable[str]] = None,
+        events: Optional[Iterable[str]] = None,
+        cursor: Optional[int] = None,
+    ) -> EventSubscription:
+        """Subscribe to the events that match every filter given.
+
+        Parameters
+        -----------
+        tags:
+            Optional[Iterable[:class:`str`]] - Only get events for one of these tags. This includes the events of
+            their members, wars and raids.
+        types:
+            Optional[Iterable[:class:`str`]] - Only get events of these types, ie. ``clan`` or ``war``.
+        events:
+            Optional[Iterable[:class:`str`]] - Only get events with these names, ie. ``member_donations``.
+        cursor:
+            Optional[:class:`int`] - Get the events after this cursor first, as far back as the history goes.
+            A cursor from before the hub was restarted is ignored.
+        """
+        subscription = EventSubscription(self, tags, types, events, self.queue_size)
+        if cursor is not None and cursor <= self._last_id:
+            for event in self._history:
+                if event.id > cursor and subscription.matches(event):
+                    subscription.push(event, backlog=True)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def listener(self, type_: str, event: str) -> Callable:
+        """Make a listener that publishes every event it gets as ``event`` of ``type_``."""
+
+        async def publish(*args):
+            self.publish(type_, event, *args)
+
+        publish.__name__ = publish.__qualname__ = "publish_{}_{}".format(type_, event)
+        return publish
+
+    def register(self, client, *events: str) -> None:
+        """Add a listener to the client for every event, given as ``type:name``, ie. ``clan:member_donations`` or
+        ``war:war_attack``, that publishes to this hub."""
+        for spec in events:
+            type_, _, name = spec.partition(":")
+            if type_ not in EVENT_CLASSES or not name:
+                raise ValueError("events must be given as type:name, ie. clan:member_donations, not {!r}".format(spec))
+            decorator = getattr(EVENT_CLASSES[type_], name)()
+            client.add_events(decorator(self.listener(type_, name)))
+
+    def close(self) -> None:
+        """Close every subscription."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+
+def _split(request, name):
+    value = request.query.get(name)
+    return [item for item in value.split(",") if item] if value else None
+
+
+def _subscribe(request) -> EventSubscription:
+    tags = _split(request, "tags")
+    cursor = request.query.get("cursor") or request.headers.get("Last-Event-ID")
+    try:
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="cursor must be an int") from None
+    return request.app[HUB_KEY].subscribe(
+        tags=[correct_tag(tag) for tag in tags] if tags else None,
+        types=_split(request, "types"),
+        events=_split(request, "events"),
+        cursor=cursor,
+    )
+
+
+async def _stream_sse(request):
+    subscription = _subscribe(request)
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                # a comment, so a subscriber that has gone away is noticed even when there are no events.
+                await response.write(b": keep-alive\n\n")
+                continue
+            if event is None:
+                break
+            await response.write(b"id: %d\ndata: %s\n\n" % (event.id, event.line))
+    except ConnectionResetError:
+        pass
+    finally:
+        subscription.close()
+    return response
+
+
+async def _stream_websocket(request):
+    subscription = _subscribe(request)
+    websocket = web.WebSocketResponse(heartbeat=KEEPALIVE_INTERVAL)
+    await websocket.prepare(request)
+
+    async def read():
+        # nothing is expected from the subscriber, but this notices when it disconnects.
+        async for _ in websocket:
+            pass
+        subscription.close()
+
+    reader = asyncio.ensure_future(read())
+    try:
+        async for event in subscription:
+            await websocket.send_str(event.line.decode())
+    except ConnectionResetError:
+        pass
+    finally:
+        reader.cancel()
+        subscription.close()
+        await websocket.close()
+    return websocket
+
+
+def create_app(hub: EventHub) -> web.Application:
+    """Make the :class:`aiohttp.web.Application` that streams the events of a hub.
+
+    Events are streamed as server-sent events from ``/events``, and as WebSocket text messages from ``/ws``. Both take
+    the ``tags``, ``types`` and ``events`` filters of :meth:`EventHub.subscribe` as comma separated query parameters,
+    and a ``cursor`` to resume from. Server-sent events also resume from the ``Last-Event-ID`` header.
+    """
+    app = web.Application()
+    app[HUB_KEY] = hub
+    app.router.add_get("/events", _stream_sse)
+    app.router.add_get("/ws", _stream_websocket)
+    return app
+
+
+async def serve_events(hub: EventHub, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> web.AppRunner:
+    """Start streaming the events of a hub on ``host`` and ``port``.
+
+    The returned :class:`aiohttp.web.AppRunner` stops the server when it's cleaned up.
+    """
+    runner = web.AppRunner(create_app(hub))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
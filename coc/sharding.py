@@ -0,0 +1,83 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from hashlib import blake2b
+from typing import Dict, Hashable, Iterable, List, Tuple, Union
+
+
+def rendezvous_score(key: str, shard: Hashable) -> int:
+    """The score of a shard for a key. The shard with the highest score owns the key.
+
+    This is stable across processes and machines, unlike :func:`hash`.
+    """
+    return int.from_bytes(blake2b("{}:{}".format(shard, key).encode(), digest_size=8).digest(), "big")
+
+
+class ShardRouter:
+    """Works out which shard owns a tag, by rendezvous (highest random weight) hashing.
+
+    Every tag goes to the shard with the highest :func:`rendezvous_score`, so adding or removing a shard only moves
+    the tags that shard gains or loses, and every process with the same shards agrees on the owner of every tag.
+
+    Parameters
+    -----------
+    shards:
+        Union[:class:`int`, Iterable] - The shard IDs, or the number of shards, which are then numbered from 0.
+    """
+
+    __slots__ = ("shards",)
+
+    def __init__(self, shards: Union[int, Iterable[Hashable]]):
+        self.shards: Tuple[Hashable, ...] = tuple(range(shards) if isinstance(shards, int) else shards)
+        if not self.shards:
+            raise ValueError("there must be at least 1 shard")
+
+    def __len__(self):
+        return len(self.shards)
+
+    def __contains__(self, shard):
+        return shard in self.shards
+
+    def __repr__(self):
+        return "<%s shards=%s>" % (self.__class__.__name__, len(self))
+
+    def owner(self, tag: str) -> Hashable:
+        """Get the shard that owns a tag."""
+        # ties are practically impossible, but are broken by the shard ID so every process still agrees.
+        return max(self.shards, key=lambda shard: (rendezvous_score(tag, shard), str(shard)))
+
+    def split(self, tags: Iterable[str]) -> Dict[Hashable, List[str]]:
+        """Group tags by the shard that owns them."""
+        groups = {shard: [] for shard in self.shards}
+        for tag in tags:
+            groups[self.owner(tag)].append(tag)
+        return groups
+
+    def moved(self, tags: Iterable[str], other: "ShardRouter") -> Dict[str, Tuple[Hashable, Hashable]]:
+        """Get the tags whose owner is different with the ``other`` shards, mapped to their old and new owner."""
+        moves = {}
+        for tag in tags:
+            old, new = self.owner(tag), other.owner(tag)
+            if old != new:
+                moves[tag] = (old, new)
+        return moves
@@ -0,0 +1,449 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import urllib.request
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import orjson
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_SINK_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+DEFAULT_CLOSE_TIMEOUT = 10.0
+
+
+def _default(obj):
+    # objects built with raw_attribute=True are sent as the data they were built from.
+    data = getattr(obj, "_raw_data", None)
+    if data is not None:
+        return data
+    if hasattr(obj, "_asdict"):
+        # a named tuple, ie. a BatchedEvent.
+        return obj._asdict()
+    if hasattr(obj, "tag"):
+        return {"tag": obj.tag, "name": getattr(obj, "name", None)}
+    return str(obj)
+
+
+def serialise_event(event: str, *args, time_: Optional[float] = None) -> bytes:
+    """Serialise an event and its arguments to a line of JSON, without the newline.
+
+    Objects built with ``raw_attribute=True`` are serialised as the data they were built from. Other objects with a
+    tag are serialised as their ``tag`` and ``name``, and anything else orjson can't serialise as its ``str``.
+    """
+    item = {"event": event, "time": time.time() if time_ is None else time_, "args": args}
+    return orjson.dumps(item, default=_default)
+
+
+class EventSink(ABC):
+    """The base class for somewhere an :class:`EventPipeline` delivers events to.
+
+    Every method is called in a thread, so they may block. They are never called concurrently. A batch that raises
+    is written again later, so sinks may receive an event more than once.
+    """
+
+    @abstractmethod
+    def write(self, lines: List[bytes]) -> None:
+        """Write a batch of events, each a line of JSON without the newline."""
+
+    def close(self) -> None:
+        """Close any file or connection. This is called when the pipeline is closed."""
+
+
+class NDJSONSink(EventSink):
+    """Appends events to a file, one line of JSON each. Every batch is flushed to disk before it counts as
+    delivered.
+
+    Parameters
+    -----------
+    path:
+        :class:`str` - The path of the file, which is created if it doesn't exist.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        self._file = None
+
+    def __repr__(self):
+        return "<%s path=%r>" % (self.__class__.__name__, self.path)
+
+    def write(self, lines: List[bytes]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(line + b"\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SQLiteSink(EventSink):
+    """Inserts events into an ``events`` table of a local SQLite database, one row each.
+
+    Parameters
+    -----------
+    path:
+        :class:`str` - The path of the database file, which is created if it doesn't exist.
+    """
+
+    def __init__(self, path: str = "coc_events.db"):
+        self.path = path
+        self._connection = None
+
+    def __repr__(self):
+        return "<%s path=%r>" % (self.__class__.__name__, self.path)
+
+    def _connect(self):
+        if self._connection is None:
+            # every call is made from the pipeline's thread, but it isn't the one that closes it.
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)"
+            )
+        return self._connection
+
+    def write(self, lines: List[bytes]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT INTO events (data) VALUES (?)", ((line.decode(),) for line in lines))
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class WebhookSink(EventSink):
+    """POSTs every batch of events to a URL as NDJSON, ie. to a service running next to the bot.
+
+    An error response raises, so the batch is sent again later.
+
+    Parameters
+    -----------
+    url:
+        :class:`str` - The URL to POST to.
+    headers:
+        Optional[Dict[:class:`str`, :class:`str`]] - Any other headers to send, ie. ``Authorization``.
+    timeout:
+        :class:`float` - The number of seconds to wait for a response.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0):
+        self.url = url
+        self.headers = {"Content-Type": "application/x-ndjson", **(headers or {})}
+        self.timeout = timeout
+
+    def __repr__(self):
+        return "<%s url=%r>" % (self.__class__.__name__, self.url)
+
+    def write(self, lines: List[bytes]) -> None:
+        body = b"".join(line + b"\n" for line in lines)
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        # an error response raises an HTTPError.
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class EventPipeline:
+    """Delivers events to one or more :class:`EventSink` in the background, so listeners don't wait for a database,
+    file or webhook, and a slow sink doesn't hold up the updaters.
+
+    Events are serialised and put in a bounded queue straight away, and written to every sink in batches. A batch
+    that a sink fails to write is retried, backing off up to a minute between attempts, until it succeeds, so
+    every event is delivered at least once. While the queue is full, new events are spilled to ``spill_path``,
+    and delivered once the queue has caught up. Without a ``spill_path``, :meth:`EventPipeline.put` waits for
+    room in the queue instead.
+
+    Parameters
+    -----------
+    sinks:
+        :class:`EventSink` - The sinks every event is written to.
+    queue_size:
+        :class:`int` - The max number of events waiting to be written, before they're spilled.
+    batch_size:
+        :class:`int` - The max number of events written to a sink at once.
+    flush_interval:
+        :class:`float` - The max number of seconds an event waits for a batch to fill up.
+    retry_delay:
+        :class:`float` - The number of seconds before a failed batch is retried the first time.
+    spill_path:
+        Optional[:class:`str`] - The path of the file events are spilled to. Events left in it when the pipeline was
+        last closed are delivered first.
+    on_error:
+        Optional[Callable[[:class:`Exception`], Any]] - Called with every exception a sink raises.
+
+    Attributes
+    -----------
+    delivered:
+        :class:`int` - The number of events every sink has written.
+    retries:
+        :class:`int` - The number of times a batch was retried.
+    spilled:
+        :class:`int` - The number of events spilled to disk so far.
+    """
+
+    def __init__(
+        self,
+        *sinks: EventSink,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_SINK_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        spill_path: Optional[Union[str, os.PathLike]] = None,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+    ):
+        if not sinks:
+            raise ValueError("an EventPipeline needs at least one sink")
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.spill_path = spill_path
+        self.on_error = on_error
+
+        self.delivered = 0
+        self.retries = 0
+        self.spilled = 0
+
+        self._queue = None
+        self._queue_size = queue_size
+        self._task = None
+        self._pending = 0
+        self._idle = None
+        self._in_flight = []
+        self._wake = None
+        # the number of calls waiting for every event to be written.
+        self._hurry = 0
+        # the spill file is read from where the last batch taken from it ended.
+        self._spill_offset = 0
+        self._spill_unread = 0
+        # sinks are never called concurrently, like SnapshotPersistence.
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="coc-sink")
+
+    def __repr__(self):
+        return "<%s sinks=%s pending=%s>" % (self.__class__.__name__, len(self.sinks), self._pending)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Dict[:class:`str`, :class:`int`]: The number of events ``queued`` in memory, ``spilled`` to disk and not
+        read back yet, ``pending`` in total (including the batch being written), ``delivered``, and the number of
+        ``retries``."""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "spilled": self._spill_unread,
+            "pending": self._pending,
+            "delivered": self.delivered,
+            "retries": self.retries,
+        }
+
+    def _start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(self._queue_size)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._wake = asyncio.Event()
+        # anything left over from before it was last closed is in the spill file now.
+        self._pending = 0
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            # events left over from last time, which haven't been delivered yet.
+            with open(self.spill_path, "rb") as file:
+                self._spill_unread = sum(1 for line in file if line.strip())
+            self._add_pending(self._spill_unread)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _add_pending(self, count):
+        self._pending += count
+        if self._pending:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+    def _spill(self, lines: Sequence[bytes]) -> None:
+        with open(self.spill_path, "ab") as file:
+            file.write(b"".join(line + b"\n" for line in lines))
+        self._spill_unread += len(lines)
+        self.spilled += len(lines)
+
+    def _read_spill(self) -> List[bytes]:
+        lines = []
+        with open(self.spill_path, "rb") as file:
+            file.seek(self._spill_offset)
+            while len(lines) < self.batch_size:
+                line = file.readline()
+                if not line:
+                    break
+                if line.strip():
+                    lines.append(line.rstrip(b"\n"))
+            self._spill_offset = file.tell()
+        self._spill_unread = max(self._spill_unread - len(lines), 0)
+        return lines
+
+    def _save_spill(self, lines: List[bytes]) -> None:
+        # the lines go before any that are still unread, since they're older.
+        rest = b""
+        if os.path.exists(self.spill_path):
+            with open(self.spill_path, "rb") as file:
+                file.seek(self._spill_offset)
+                rest = file.read()
+        if lines or rest:
+            with open(self.spill_path, "wb") as file:
+                file.write(b"".join(line + b"\n" for line in lines) + rest)
+        elif os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self._spill_offset = 0
+
+    async def put(self, event: str, *args) -> None:
+        """Serialise an event and queue it to be written to every sink.
+
+        See :func:`serialise_event` for how the arguments are serialised.
+        """
+        await self.put_line(serialise_event(event, *args))
+
+    async def put_line(self, line: bytes) -> None:
+        """Queue a line of JSON, without the newline, to be written to every sink."""
+        self._start()
+        self._add_pending(1)
+        if self.spill_path is not None and (self._spill_unread or self._queue.full()):
+            # newer events go after the ones already spilled, so they're delivered in order.
+            self._spill([line])
+        else:
+            await self._queue.put(line)
+        if self._queue.qsize() >= self.batch_size - 1:
+            self._wake.set()
+
+    def listener(self, event: str) -> Callable:
+        """Make a listener that puts every event it gets into the pipeline as ``event``.
+
+        .. code-block:: python3
+
+            client.add_events(coc.ClanEvents.member_donations()(pipeline.listener("member_donations")))
+        """
+
+        async def forward(*args):
+            await self.put(event, *args)
+
+        forward.__name__ = forward.__qualname__ = "forward_{}".format(event)
+        return forward
+
+    async def _next_batch(self) -> List[bytes]:
+        queue = self._queue
+        lines = [await queue.get()]
+        if queue.qsize() + 1 < self.batch_size and not self._hurry:
+            # wait for the batch to fill up, unless something is waiting for it to be written.
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        while len(lines) < self.batch_size and not queue.empty():
+            lines.append(queue.get_nowait())
+        return lines
+
+    async def _write(self, sink: EventSink, lines: List[bytes]) -> None:
+        # pylint: disable=broad-except
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            try:
+                await loop.run_in_executor(self._executor, sink.write, lines)
+                return
+            except Exception as exception:
+                LOG.warning("%r failed to write %s events, retrying", sink, len(lines), exc_info=exception)
+                if self.on_error is not None:
+                    self.on_error(exception)
+            self.retries += 1
+            await asyncio.sleep(min(self.retry_delay * 2 ** attempt, MAX_RETRY_DELAY))
+            attempt += 1
+
+    async def _run(self) -> None:
+        while True:
+            # the queue is older than the spill file, so it's only read once the queue has caught up.
+            from_spill = self._queue.empty() and bool(self._spill_unread)
+            lines = self._in_flight = self._read_spill() if from_spill else await self._next_batch()
+            for sink in self.sinks:
+                await self._write(sink, lines)
+            self._in_flight = []
+            self.delivered += len(lines)
+            self._add_pending(-len(lines))
+            if from_spill and not self._spill_unread:
+                # everything in it has been delivered, so it can start again from empty.
+                os.remove(self.spill_path)
+                self._spill_offset = 0
+
+    async def flush(self) -> None:
+        """Wait until every event put so far has been written to every sink."""
+        if self._idle is None:
+            return
+        self._hurry += 1
+        self._wake.set()
+        try:
+            await self._idle.wait()
+        finally:
+            self._hurry -= 1
+
+    async def close(self, timeout: Optional[float] = DEFAULT_CLOSE_TIMEOUT) -> None:
+        """Wait up to ``timeout`` seconds for every event to be written, and close the sinks.
+
+        Any events that are still queued after that are spilled, to be delivered when the pipeline is next started.
+        A sink that stays down would otherwise be retried forever, so only pass ``None`` to wait for as long as
+        that takes.
+        """
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self.flush(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+            # a batch that was being written may be delivered again, but nothing is lost.
+            undelivered = list(self._in_flight)
+            while not self._queue.empty():
+                undelivered.append(self._queue.get_nowait())
+            if self.spill_path is not None:
+                self._save_spill(undelivered)
+            elif undelivered:
+                LOG.warning("%s events were never delivered", len(undelivered))
+
+        loop = asyncio.get_running_loop()
+        for sink in self.sinks:
+            await loop.run_in_executor(self._executor, sink.close)
+        self._executor.shutdown(wait=False)
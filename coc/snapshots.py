@@ -0,0 +1,169 @@
+"""
+MIT License
+
+Copyright (c) 2019-2020 mathsman5133
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import zlib
+
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+import orjson
+
+
+class ModelStore:
+    """Keeps the last clan, player or war seen for every tracked tag, which the next update is compared to.
+
+    This keeps the objects as they are, which is the quickest, but also uses the most memory.
+
+    Parameters
+    -----------
+    client:
+        The client objects are built with when they're restored from their raw data.
+    """
+
+    __slots__ = ("client", "_models")
+
+    def __init__(self, client=None):
+        self.client = client
+        self._models: Dict[Hashable, Any] = {}
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, key):
+        return key in self._models
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._models)
+
+    def __repr__(self):
+        return "<%s keys=%s>" % (self.__class__.__name__, len(self))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get the object stored for a key, or ``None`` if there isn't one."""
+        return self._models.get(key)
+
+    def set(self, key: Hashable, model, **kwargs) -> None:
+        """Store an object for a key. ``kwargs`` are any extra arguments it was built with."""
+        # pylint: disable=unused-argument
+        self._models[key] = model
+
+    def set_raw(self, key: Hashable, cls, data: dict, **kwargs) -> None:
+        """Store an object for a key from the raw data it's built from, ie. when it's restored after a restart."""
+        self.set(key, cls(data=data, client=self.client, **kwargs), **kwargs)
+
+    def get_raw(self, key: Hashable) -> Optional[dict]:
+        """Get the raw data of the object stored for a key, or ``None`` if there isn't any."""
+        return getattr(self._models.get(key), "_raw_data", None)
+
+    def remove(self, key: Hashable) -> None:
+        """Forget about a key which is no longer tracked."""
+        self._models.pop(key, None)
+
+    def fingerprint(self, key: Hashable) -> Optional[str]:
+        """Get the fingerprint of the response the stored object was built from, without building it."""
+        model = self._models.get(key)
+        return getattr(model, "_fingerprint", None)
+
+    def response_retry(self, key: Hashable) -> int:
+        """Get the number of seconds the stored object's response was cached for, without building it."""
+        model = self._models.get(key)
+        return getattr(model, "_response_retry", None) or 0
+
+
+class _Entry:
+    __slots__ = ("cls", "payload", "model", "kwargs", "fingerprint", "response_retry")
+
+    def __init__(self, cls, payload, model, kwargs, fingerprint, response_retry):
+        self.cls = cls
+        self.payload = payload
+        self.model = model
+        self.kwargs = kwargs
+        self.fingerprint = fingerprint
+        self.response_retry = response_retry
+
+
+class CompactSnapshotStore(ModelStore):
+    """A :class:`ModelStore` which keeps compressed responses rather than objects, and only builds an object again
+    when it's needed, ie. to be compared to a response that has changed.
+
+    The fingerprint and cache time of every response are kept as they are, so responses that haven't changed are
+    skipped without building anything. Objects need to have been built with their raw data, ie. with
+    ``raw_attribute=True``. Any that weren't are kept as they are.
+
+    Parameters
+    -----------
+    client:
+        The client objects are built with.
+    level:
+        :class:`int` - The :mod:`zlib` compression level, from 1 (quickest) to 9 (smallest).
+    """
+
+    __slots__ = ("level",)
+
+    def __init__(self, client, level: int = 6):
+        super().__init__(client)
+        self.level = level
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        if entry.payload is None:
+            return entry.model
+        data = orjson.loads(zlib.decompress(entry.payload))
+        return entry.cls(data=data, client=self.client, **(entry.kwargs or {}))
+
+    def set(self, key: Hashable, model, **kwargs) -> None:
+        data = getattr(model, "_raw_data", None)
+        payload = zlib.compress(orjson.dumps(data), self.level) if data is not None else None
+        self._models[key] = _Entry(
+            type(model),
+            payload,
+            # the object is only kept if it can't be built again.
+            model if payload is None else None,
+            kwargs or None,
+            getattr(model, "_fingerprint", None),
+            getattr(model, "_response_retry", None) or 0,
+        )
+
+    def set_raw(self, key: Hashable, cls, data: dict, **kwargs) -> None:
+        # there's no need to build the object just to compress its data.
+        payload = zlib.compress(orjson.dumps(data), self.level)
+        self._models[key] = _Entry(
+            cls, payload, None, kwargs or None, data.get("_fingerprint"), data.get("_response_retry") or 0
+        )
+
+    def get_raw(self, key: Hashable) -> Optional[dict]:
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        if entry.payload is None:
+            return getattr(entry.model, "_raw_data", None)
+        return orjson.loads(zlib.decompress(entry.payload))
+
+    def fingerprint(self, key: Hashable) -> Optional[str]:
+        entry = self._models.get(key)
+        return entry.fingerprint if entry is not None else None
+
+    def response_retry(self, key: Hashable) -> int:
+        entry = self._models.get(key)
+        return entry.response_retry if entry is not None else 0
@@ -433,6 +433,66 @@ def get_clan_games_end(time: Optional[datetime] = None) -> datetime:
     return datetime(year=year, month=month, day=28, hour=8, minute=0, second=0)
 
 
+def get_cwl_start(time: Optional[datetime] = None) -> datetime:
+    """Get the datetime that the next clan war league (CWL) will start.
+
+    This goes by the assumption that CWL sign-up starts at 8am UTC on the 1st of each month
+    and that the last battle day is over by 8am UTC on the 12th.
+
+    .. note::
+
+        If you want the start of the next or running CWL, do not pass any parameters in,
+        for any other pass a datetime in the month before.
+
+    Parameters
+    ----------
+    time: Optional[datetime]
+        Some time in the month before the CWL you want the start of.
+
+    Returns
+    -------
+    cwl_start: :class:`datetime.datetime`
+        The start of the next or running CWL.
+    """
+    if time is None:
+        time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    month = time.month
+    year = time.year
+    this_months_cwl_end = datetime(year=time.year, month=time.month, day=12, hour=8, minute=0, second=0)
+    if time > this_months_cwl_end and month < 12:
+        month += 1
+    elif time > this_months_cwl_end:  # we're at the end of December
+        month = 1
+        year += 1
+    return datetime(year=year, month=month, day=1, hour=8, minute=0, second=0)
+
+
+def get_cwl_end(time: Optional[datetime] = None) -> datetime:
+    """Get the datetime that the next clan war league (CWL) will end.
+
+    This goes by the assumption that the last CWL battle day is over by 8am UTC on the 12th of each month.
+
+    .. note::
+
+        If you want the end of the next or running CWL, do not pass any parameters in,
+        for any other pass a datetime in the month before.
+
+    Parameters
+    ----------
+    time: Optional[datetime]
+        Some time in the month before the CWL you want the end of.
+
+    Returns
+    -------
+    cwl_end: :class:`datetime.datetime`
+        The end of the next or running CWL.
+    """
+    if time is None:
+        time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    start = get_cwl_start(time)
+    return start.replace(day=12)
+
+
 def get_raid_weekend_start(time: Optional[datetime] = None) -> datetime:
     """Get the datetime that the raid weekend will start.
 
@@ -545,6 +605,23 @@ class FIFO(UserDict):
         return self
 
 
+class LRU(dict):
+    """Implements a dict with a settable max size, which drops the least-recently-set items first."""
+
+    __slots__ = ("max_size",)
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        super().__init__()
+
+    def __setitem__(self, key, value):
+        # re-insert the key so that it moves to the end of the dict
+        self.pop(key, None)
+        super().__setitem__(key, value)
+        while len(self) > self.max_size:
+            del self[next(iter(self))]
+
+
 class HTTPStats(dict):
     """Implements a basic key: deque value to aid with HTTP performance stats."""
 
@@ -579,6 +656,43 @@ class HTTPStats(dict):
         return {k: sum(v) / len(v) for k, v in self.items()}
 
 
+class LeagueWarIndex(dict):
+    """Implements a season: {war tag: clan tags} mapping to avoid fetching league wars of other clans."""
+
+    __slots__ = ("max_seasons",)
+
+    def __init__(self, max_seasons=2):
+        self.max_seasons = max_seasons
+        super().__init__()
+
+    def add(self, season, war_tag, clan_tags):
+        """Record the clan tags taking part in a league war of a season."""
+        try:
+            index = self[season]
+        except KeyError:
+            index = self[season] = {}
+            for old_season in sorted(self)[:-self.max_seasons]:
+                del self[old_season]
+
+        index[war_tag] = tuple(clan_tags)
+
+    def get_clans(self, war_tag):
+        """Get the clan tags of a league war, or ``None`` if the war hasn't been seen yet."""
+        for index in self.values():
+            try:
+                return index[war_tag]
+            except KeyError:
+                pass
+        return None
+
+    def filter_tags(self, war_tags, clan_tag):
+        """Drop war tags which are known to belong to other clans."""
+        for war_tag in war_tags:
+            clan_tags = self.get_clans(war_tag)
+            if clan_tags is None or clan_tag in clan_tags:
+                yield war_tag
+
+
 class CaseInsensitiveDict(dict):
     def __getitem__(self, key):
         if isinstance(key, tuple):
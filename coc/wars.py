@@ -89,11 +89,13 @@ class ClanWar:
         "clan_cls",
         "_response_retry",
         "_raw_data",
+        "_fingerprint",
         "battle_modifier",
     )
 
     def __init__(self, *, data, client, **kwargs):
         self._response_retry = data.get("_response_retry")
+        self._fingerprint = data.get("_fingerprint")
         self._client = client
         self._raw_data = data if client and client.raw_attribute else None
         self.clan_tag = kwargs.pop("clan_tag", None)
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from coc import BaseLeague, Client, Player
+from coc.catalogues import CATALOGUE_SNAPSHOT_PATH, CatalogueHolder
+from coc.http import CachePolicy, Route, fingerprint
+
+BASE_URL = "https://api.clashofclans.com/v1"
+
+
+class TestCachePolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = CachePolicy()
+
+    def test_unknown_endpoint(self):
+        route = Route("GET", BASE_URL, "/players/#2PP")
+        self.assertEqual(self.policy(route, {"tag": "#2PP"}, 60), 60)
+
+    def test_league_war(self):
+        route = Route("GET", BASE_URL, "/clanwarleagues/wars/#2PP")
+        self.assertEqual(self.policy(route, {"state": "inWar"}, 60), 60)
+        self.assertGreaterEqual(self.policy(route, {"state": "warEnded"}, 60), 60)
+
+    def test_league_group(self):
+        route = Route("GET", BASE_URL, "/clans/#2PP/currentwar/leaguegroup")
+        self.assertEqual(self.policy(route, {"state": "inWar"}, 60), 60)
+
+        for now, expected in (
+            # before sign-up opens, it's kept until then.
+            (datetime(2020, 11, 1, 7), 60 * 60),
+            # during a CWL, an ended group could be last month's.
+            (datetime(2020, 11, 1, 9), 60),
+            (datetime(2020, 11, 11), 60),
+            # after a CWL, it's kept until the next sign-up and not a month longer.
+            (datetime(2020, 10, 19, 8), 13 * 24 * 60 * 60),
+            (datetime(2020, 12, 20, 8), 12 * 24 * 60 * 60),
+        ):
+            with self.subTest(now=now), mock.patch.object(CachePolicy, "_now", return_value=now):
+                self.assertEqual(self.policy(route, {"state": "ended"}, 60), expected)
+
+    def test_war_log(self):
+        self.assertEqual(self.policy(Route("GET", BASE_URL, "/clans/#2PP/warlog", limit=5), {}, 60), 60)
+        route = Route("GET", BASE_URL, "/clans/#2PP/warlog", limit=5, after="cursor")
+        self.assertEqual(self.policy(route, {}, 60), CachePolicy.history_max_age)
+
+    def test_catalogues(self):
+        for path in ("/leagues", "/leagues/29000022", "/locations", "/locations/32000006", "/labels/clan"):
+            self.assertEqual(self.policy(Route("GET", BASE_URL, path), {}, 60), CachePolicy.catalogue_max_age)
+
+        route = Route("GET", BASE_URL, "/leagues/29000022/seasons/2020-05")
+        self.assertEqual(self.policy(route, {}, 60), CachePolicy.history_max_age)
+
+    def test_gold_pass_season(self):
+        route = Route("GET", BASE_URL, "/goldpass/seasons/current")
+        self.assertEqual(self.policy(route, {"endTime": "20200101T000000.000Z"}, 60), 60)
+        self.assertGreater(self.policy(route, {"endTime": "29990101T000000.000Z"}, 60), 60)
+
+
+class TestCatalogue(unittest.TestCase):
+    def setUp(self):
+        self.holder = CatalogueHolder(max_age=60)
+        self.holder.load_snapshot(CATALOGUE_SNAPSHOT_PATH)
+
+    def test_snapshot(self):
+        for name in ("locations", "clan_labels", "player_labels"):
+            self.assertTrue(self.holder[name].items)
+        self.assertIsNone(self.holder["leagues"].items)
+
+    def test_lookups(self):
+        locations = self.holder["locations"]
+        self.assertEqual(locations.get(32000000)["name"], "Europe")
+        self.assertEqual(locations.get("32000000")["name"], "Europe")
+        self.assertIsNone(locations.get("not an id"))
+        self.assertEqual(locations.get_named("eUrOpE")["id"], 32000000)
+        self.assertEqual(locations.get_country("us")["name"], "United States")
+        self.assertIsNone(locations.get_named("Atlantis"))
+
+
+class TestCatalogueLookups(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = Client()
+        catalogue = self.client.catalogues["builder_base_leagues"]
+        catalogue.load([{"id": 44000000, "name": "Wood League V"}], updated_at=time.time())
+        self.client.catalogues._snapshot_loaded = True
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_builder_base_league_named(self):
+        league = await self.client.get_builder_base_league_named("wood league v")
+        self.assertIsInstance(league, BaseLeague)
+        self.assertEqual(league.id, 44000000)
+        self.assertIsNone(await self.client.get_builder_base_league_named("Atlantis"))
+
+        with self.assertRaises(TypeError):
+            await self.client.get_builder_base_league_named("Wood League V", cls=Player)
+
+
+class Model:
+    def __init__(self, *, data, client, **_):
+        self.data = data
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.client = Client(model_cache_max_size=2)
+        self.data = {"tag": "#2PP", "timestamp": 1.0}
+
+    def test_same_response(self):
+        model = self.client._build_model("player", "#2PP", Model, self.data)
+        self.assertIs(self.client._build_model("player", "#2PP", Model, self.data), model)
+        self.assertIsNot(self.client._build_model("player", "#2PP", Model, {**self.data, "timestamp": 2.0}), model)
+
+    def test_key(self):
+        model = self.client._build_model("player", "#2PP", Model, self.data)
+
+        class CustomModel(Model):
+            pass
+
+        self.assertIsInstance(self.client._build_model("player", "#2PP", CustomModel, self.data), CustomModel)
+        self.assertIsNot(self.client._build_model("player", "#2PP", Model, self.data, load_game_data=True), model)
+        self.assertIsNot(self.client._build_model("player", "#2PP", Model, self.data, model_cache=False), model)
+        self.assertIsNot(self.client._build_model("player", "#2PP", Model, self.data, custom_kwarg=1), model)
+
+    def test_if_none_match(self):
+        data = {**self.data, "_fingerprint": fingerprint(b'{"tag": "#2PP"}')}
+        self.assertIsNone(self.client._build_model("player", "#2PP", Model, data, if_none_match=data["_fingerprint"]))
+        self.assertIsInstance(self.client._build_model("player", "#2PP", Model, data, if_none_match="other"), Model)
+        self.assertNotEqual(fingerprint(b'{"tag": "#2PP"}'), fingerprint(b'{"tag": "#8YY"}'))
+
+    def test_max_size(self):
+        for tag in ("#2PP", "#8YY", "#9QQ"):
+            self.client._build_model("player", tag, Model, self.data)
+        self.assertEqual(len(self.client._model_cache), 2)
+
+    def test_set_object_cls(self):
+        self.client._build_model("player", "#2PP", Model, self.data)
+        self.client.set_object_cls("Player", type("CustomPlayer", (Player, ), {}))
+        self.assertFalse(self.client._model_cache)
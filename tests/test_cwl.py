@@ -0,0 +1,229 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from coc import Client, ClanWar, ClanWarLeagueGroup, WarRound
+from coc.cwl import LeagueRequestCache
+from coc.errors import GatewayError, Maintenance, NotFound, PrivateWarLog
+from coc.utils import get_cwl_end, get_cwl_start
+
+CLANS = ["#A", "#B", "#C"]
+
+
+class TestLeagueRequestCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = LeagueRequestCache()
+        self.cache.start_loop()
+        self.requests = []
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def fetch(self, key, data):
+        async def fetch():
+            self.requests.append(key)
+            await asyncio.sleep(0.01)
+            if isinstance(data, Exception):
+                raise data
+            return data
+
+        return fetch
+
+    def group(self, clan_tag, clans=CLANS):
+        data = {"season": "2026-10", "clans": [{"tag": tag} for tag in clans]}
+        return self.cache.get_group(clan_tag, self.fetch(clan_tag, data))
+
+    async def test_group_shared_by_its_clans(self):
+        # the first loop doesn't know the clans are in the same group yet.
+        await asyncio.gather(*(self.group(tag) for tag in CLANS))
+        self.assertEqual(len(self.requests), 3)
+
+        self.cache.end_loop()
+        self.cache.start_loop()
+        self.requests.clear()
+        groups = await asyncio.gather(*(self.group(tag) for tag in CLANS))
+        self.assertEqual(self.requests, ["#A"])
+        self.assertTrue(all(group is groups[0] for group in groups))
+        self.assertEqual(self.cache.hits, 2)
+
+    async def test_new_group(self):
+        await self.group("#A")
+        self.cache.end_loop()
+        self.cache.start_loop()
+
+        await self.group("#B", clans=["#B", "#D"])
+        # #A is still thought to be with #B, but the group it gets back doesn't have #A in it anymore.
+        await self.group("#A", clans=["#A", "#C"])
+        self.assertEqual(self.requests, ["#A", "#B", "#A"])
+
+    async def test_error_isnt_shared(self):
+        await self.group("#A")
+        self.cache.end_loop()
+        self.cache.start_loop()
+
+        failing = self.cache.get_group("#A", self.fetch("#A", NotFound(404, {})))
+        results = await asyncio.gather(failing, self.group("#B"), return_exceptions=True)
+        self.assertIsInstance(results[0], NotFound)
+        self.assertEqual(results[1]["season"], "2026-10")
+
+    async def test_war_once_per_loop(self):
+        wars = await asyncio.gather(*(self.cache.get_war("#W", self.fetch("#W", {"tag": "#W"})) for _ in range(3)))
+        self.assertEqual(self.requests, ["#W"])
+        self.assertEqual(wars, [{"tag": "#W"}] * 3)
+
+        self.cache.end_loop()
+        await self.cache.get_war("#W", self.fetch("#W", {"tag": "#W"}))
+        self.assertEqual(self.requests, ["#W", "#W"])
+
+
+def _war_data(state, clan="#A", opponent="#B"):
+    return {"state": state, "clan": {"tag": clan}, "opponent": {"tag": opponent}}
+
+
+def _war(state, clan="#A", opponent="#B"):
+    return ClanWar(data=_war_data(state, clan, opponent), client=None, clan_tag=clan)
+
+
+def _group(state, rounds, number_of_rounds=7):
+    rounds = rounds + [["#0"]] * (number_of_rounds - len(rounds))
+    data = {"state": state, "season": "2026-10", "rounds": [{"warTags": tags} for tags in rounds]}
+    return ClanWarLeagueGroup(data=data, client=None)
+
+
+class TestGetCurrentWar(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = Client()
+        self.league_wars = {}
+        self.get_clan_war = self.patch(mock.patch.object(Client, "get_clan_war"))
+        self.get_league_group = self.patch(mock.patch.object(Client, "get_league_group"))
+        self.get_league_war = self.patch(mock.patch.object(Client, "get_league_war", side_effect=self.league_war))
+        # the CWL window is open, unless a test closes it.
+        self.get_cwl_start = self.patch(mock.patch("coc.client.get_cwl_start", return_value=datetime(2000, 1, 1)))
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def patch(self, patcher):
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    async def league_war(self, war_tag, clan_tag=None, **_):
+        data = self.league_wars[war_tag]
+        if isinstance(data, Exception):
+            raise data
+        return ClanWar(data=data, client=None, clan_tag=clan_tag)
+
+    async def test_outside_cwl(self):
+        self.get_cwl_start.return_value = datetime(3000, 1, 1)
+        war = _war("inWar")
+        self.get_clan_war.return_value = war
+        self.assertIs(await self.client.get_current_war("#A"), war)
+        self.get_league_group.assert_not_awaited()
+
+    async def test_regular_war_during_cwl(self):
+        war = _war("inWar")
+        self.get_clan_war.return_value = war
+        # the league group is requested alongside the war, but its error doesn't matter.
+        self.get_league_group.side_effect = GatewayError(mock.Mock(status=504), "")
+        self.assertIs(await self.client.get_current_war("#A"), war)
+        self.get_league_group.assert_awaited_once()
+
+    async def test_private_war_log(self):
+        self.get_clan_war.side_effect = PrivateWarLog(mock.Mock(status=403), "")
+        self.get_league_group.return_value = _group("inWar", [["#W1"], ["#W2"]])
+        self.league_wars = {"#W1": _war_data("inWar", opponent="#C")}
+        war = await self.client.get_current_war("#A")
+        self.assertEqual(war.opponent.tag, "#C")
+
+    async def test_league_group_errors(self):
+        war = _war("notInWar")
+        for exception in (NotFound(mock.Mock(status=404), ""), GatewayError(mock.Mock(status=504), "")):
+            with self.subTest(exception=exception):
+                self.get_clan_war.side_effect = None
+                self.get_clan_war.return_value = war
+                self.get_league_group.side_effect = exception
+                # they're not in CWL, so the regular war is returned.
+                self.assertIs(await self.client.get_current_war("#A"), war)
+
+                # without a war to fall back on, it's treated as a private war log.
+                self.get_clan_war.side_effect = PrivateWarLog(mock.Mock(status=403), "")
+                with self.assertRaises(PrivateWarLog):
+                    await self.client.get_current_war("#A")
+
+    async def test_war_error_is_raised(self):
+        self.get_clan_war.side_effect = Maintenance(mock.Mock(status=503), "")
+        self.get_league_group.return_value = _group("inWar", [["#W1"]])
+        with self.assertRaises(Maintenance):
+            await self.client.get_current_war("#A")
+
+    async def test_errors_in_a_round(self):
+        self.get_clan_war.return_value = _war("notInWar")
+        self.get_league_group.return_value = _group("inWar", [["#W1", "#W2"], ["#W3"]])
+
+        # wars that can't be found or seen are skipped.
+        for exception in (NotFound(mock.Mock(status=404), ""), PrivateWarLog(mock.Mock(status=403), "")):
+            with self.subTest(exception=exception):
+                self.league_wars = {"#W1": exception, "#W2": _war_data("inWar", clan="#B", opponent="#A")}
+                war = await self.client.get_current_war("#A")
+                # it's turned around to be from the perspective of the clan asked for.
+                self.assertEqual((war.clan.tag, war.opponent.tag), ("#A", "#B"))
+
+        self.league_wars = {"#W1": GatewayError(mock.Mock(status=504), ""), "#W2": _war_data("inWar")}
+        with self.assertRaises(GatewayError):
+            await self.client.get_current_war("#A")
+
+    async def test_last_round_reused(self):
+        self.get_clan_war.return_value = _war("notInWar")
+        rounds = [["#W%s" % i] for i in range(1, 7)] + [["#W7", "#W8"]]
+        self.get_league_group.return_value = _group("inWar", rounds)
+        self.league_wars = {"#W7": _war_data("inWar", clan="#C", opponent="#D"), "#W8": _war_data("inWar")}
+
+        war = await self.client.get_current_war("#A")
+        self.assertEqual((war.state, war.opponent.tag), ("inWar", "#B"))
+        # the last round was only fetched once, to find out whether it's in war yet.
+        self.assertEqual(self.get_league_war.await_count, 2)
+
+    async def test_last_round_in_preparation(self):
+        self.get_clan_war.return_value = _war("notInWar")
+        rounds = [["#W%s" % i] for i in range(1, 8)]
+        self.get_league_group.return_value = _group("inWar", rounds)
+        self.league_wars = {"#W6": _war_data("inWar"), "#W7": _war_data("preparation")}
+
+        self.assertEqual((await self.client.get_current_war("#A")).state, "inWar")
+        war = await self.client.get_current_war("#A", cwl_round=WarRound.current_preparation)
+        self.assertEqual(war.state, "preparation")
+
+
+class TestCWLDates(unittest.TestCase):
+    def test_during_cwl(self):
+        for now in (datetime(2020, 12, 1, 8), datetime(2020, 12, 2), datetime(2020, 12, 9), datetime(2020, 12, 10),
+                    datetime(2020, 12, 11), datetime(2020, 12, 12, 7, 59)):
+            with self.subTest(now=now):
+                self.assertEqual(get_cwl_start(now), datetime(2020, 12, 1, 8))
+                self.assertEqual(get_cwl_end(now), datetime(2020, 12, 12, 8))
+
+    def test_before_cwl(self):
+        # sign-up hasn't opened yet on the morning of the 1st.
+        self.assertEqual(get_cwl_start(datetime(2021, 1, 1, 7)), datetime(2021, 1, 1, 8))
+        self.assertEqual(get_cwl_end(datetime(2021, 1, 1, 7)), datetime(2021, 1, 12, 8))
+
+    def test_after_cwl(self):
+        for now in (datetime(2020, 11, 12, 9), datetime(2020, 11, 30)):
+            with self.subTest(now=now):
+                self.assertEqual(get_cwl_start(now), datetime(2020, 12, 1, 8))
+                self.assertEqual(get_cwl_end(now), datetime(2020, 12, 12, 8))
+
+    def test_year_rollover(self):
+        for now in (datetime(2020, 12, 12, 9), datetime(2020, 12, 20), datetime(2020, 12, 31, 23, 59)):
+            with self.subTest(now=now):
+                self.assertEqual(get_cwl_start(now), datetime(2021, 1, 1, 8))
+                self.assertEqual(get_cwl_end(now), datetime(2021, 1, 12, 8))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+
+from coc.dispatcher import BatchedEvent, EventBatcher, ListenerDispatcher
+
+
+class TestListenerDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = []
+        self.errors = []
+        self.dispatcher = ListenerDispatcher(workers=4, on_error=self.errors.append)
+
+    async def asyncTearDown(self):
+        self.dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def listener(self, name, delay=0):
+        await asyncio.sleep(delay)
+        self.calls.append(name)
+
+    async def failing_listener(self):
+        raise ValueError("oops")
+
+    async def test_submit_doesnt_wait_for_listener(self):
+        await self.dispatcher.submit("#2PP", self.listener, "slow", 0.05)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.dispatcher.depth, 1)
+
+        await self.dispatcher.join()
+        self.assertEqual(self.calls, ["slow"])
+        self.assertEqual(self.dispatcher.stats["completed"], 1)
+        self.assertEqual(self.dispatcher.depth, 0)
+
+    async def test_ordered_per_key(self):
+        await self.dispatcher.submit("#2PP", self.listener, "first", 0.05)
+        await self.dispatcher.submit("#2PP", self.listener, "second")
+        await self.dispatcher.submit("#8YY", self.listener, "other")
+        await self.dispatcher.join()
+        # other keys don't wait for the slow listener, but the same key does.
+        self.assertEqual(self.calls, ["other", "first", "second"])
+
+    async def test_unordered(self):
+        self.dispatcher.ordered = False
+        await self.dispatcher.submit("#2PP", self.listener, "first", 0.05)
+        await self.dispatcher.submit("#2PP", self.listener, "second")
+        await self.dispatcher.join()
+        self.assertEqual(self.calls, ["second", "first"])
+
+    async def test_error_isolation(self):
+        await self.dispatcher.submit("#2PP", self.failing_listener)
+        await self.dispatcher.submit("#2PP", self.listener, "after")
+        await self.dispatcher.join()
+        self.assertEqual(self.calls, ["after"])
+        self.assertEqual(len(self.errors), 1)
+        self.assertIsInstance(self.errors[0], ValueError)
+        self.assertEqual(self.dispatcher.errors, 1)
+
+    async def test_timeout(self):
+        self.dispatcher.timeout = 0.01
+        await self.dispatcher.submit("#2PP", self.listener, "slow", 1)
+        await self.dispatcher.submit("#2PP", self.listener, "fast")
+        await self.dispatcher.join()
+        self.assertEqual(self.calls, ["fast"])
+        self.assertIsInstance(self.errors[0], asyncio.TimeoutError)
+        self.assertEqual(self.dispatcher.timeouts, 1)
+
+    async def test_on_finish(self):
+        finished = []
+        self.dispatcher.on_finish = lambda key, seconds: finished.append((key, seconds))
+        await self.dispatcher.submit("#2PP", self.listener, "slow", 0.05)
+        await self.dispatcher.submit("#8YY", self.failing_listener)
+        await self.dispatcher.join()
+        self.assertEqual(sorted(key for key, _ in finished), ["#2PP", "#8YY"])
+        self.assertGreaterEqual(dict(finished)["#2PP"], 0.05)
+
+    async def test_queue_size(self):
+        self.dispatcher.queue_size = 2
+        await self.dispatcher.submit("#2PP", self.listener, "first", 0.05)
+        await self.dispatcher.submit("#8YY", self.listener, "second", 0.2)
+        # the queue is full, so this waits for one of the others to finish.
+        await self.dispatcher.submit("#9QQ", self.listener, "third")
+        self.assertEqual(self.calls, ["first"])
+        self.assertEqual(self.dispatcher.max_depth, 2)
+        await self.dispatcher.join()
+        self.assertEqual(sorted(self.calls), ["first", "second", "third"])
+
+
+class TestEventBatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.batches = []
+        self.batcher = EventBatcher(self.callback, max_size=3, max_delay=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def callback(self, events):
+        self.batches.append(events)
+
+    async def test_max_size(self):
+        for i in range(4):
+            await self.batcher.collect("trophies", i, i + 1, "arg")
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(self.batches[0][0], BatchedEvent("trophies", 0, 1, ("arg",)))
+        self.assertEqual(len(self.batcher), 1)
+
+        await self.batcher.flush()
+        self.assertEqual([len(batch) for batch in self.batches], [3, 1])
+
+        await self.batcher.flush()
+        self.assertEqual(len(self.batches), 2)
+
+    async def test_max_delay(self):
+        self.batcher.max_delay = 0.01
+        await self.batcher.collect("trophies", 0, 1)
+        await self.batcher.collect("donations", 0, 1)
+        self.assertEqual(self.batches, [])
+
+        await asyncio.sleep(0.05)
+        self.assertEqual([[event.event for event in batch] for batch in self.batches], [["trophies", "donations"]])
+
+    async def test_drain(self):
+        self.batcher.max_delay = 0.01
+        await self.batcher.collect("trophies", 0, 1)
+        self.assertEqual(len(self.batcher.drain()), 1)
+
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.batches, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
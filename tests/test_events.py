@@ -0,0 +1,240 @@
+import asyncio
+import unittest
+
+import coc
+from coc.diff import SnapshotDiff
+from coc.dispatcher import BatchedEvent, EventBatcher
+from coc.events import Event, ListenerIndex
+
+
+class Model:
+    def __init__(self, tag, level, name="name"):
+        self.tag = tag
+        self.level = level
+        self.name = name
+
+
+def get_events(function):
+    return [Event.from_decorator(function, runner) for runner in function.event_runners]
+
+
+class TestListenerIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ListenerIndex()
+
+        @coc.ClanEvents.level()
+        async def level(old, new):
+            pass
+
+        @coc.ClanEvents.name(tags=["#2PP"])
+        async def name(old, new):
+            pass
+
+        @coc.ClanEvents.member_join()
+        async def member_join(member, clan):
+            pass
+
+        self.level, self.name, self.member_join = get_events(level), get_events(name), get_events(member_join)
+        for event in self.level + self.name + self.member_join:
+            self.index.add(event)
+
+    def test_routing(self):
+        diff = SnapshotDiff(Model("#2PP", 1), Model("#2PP", 1))
+        self.assertEqual(self.index.get("#2PP", diff), self.member_join)
+
+        diff = SnapshotDiff(Model("#2PP", 1), Model("#2PP", 2, "new name"))
+        self.assertEqual(self.index.get("#2PP", diff), self.level + self.name + self.member_join)
+
+        diff = SnapshotDiff(Model("#8YY", 1), Model("#8YY", 1, "new name"))
+        self.assertEqual(self.index.get("#8YY", diff), self.member_join)
+
+    def test_remove(self):
+        for event in self.level + self.member_join:
+            self.index.remove(event)
+        self.assertEqual(len(self.index), 1)
+
+        diff = SnapshotDiff(Model("#2PP", 1), Model("#2PP", 2))
+        self.assertEqual(self.index.get("#2PP", diff), [])
+
+
+class TestEvent(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_names(self):
+        @coc.ClanEvents.level()
+        @coc.ClanEvents.member_join()
+        async def listener(*_):
+            pass
+
+        self.assertEqual({event.name for event in get_events(listener)}, {"level", "member_join"})
+
+    async def test_batched(self):
+        batches = []
+
+        async def save(events):
+            batches.append(events)
+
+        @coc.ClanEvents.level()
+        async def level(old, new):
+            raise AssertionError("batched events shouldn't call the listener")
+
+        batcher = EventBatcher(save, max_delay=None)
+        event = Event(level.event_runners[0], level, (), "clan", batcher)
+        cached, live = Model("#2PP", 1), Model("#2PP", 2)
+        await event(cached, live, SnapshotDiff(cached, live))
+        await batcher.flush()
+
+        self.assertEqual(batches, [[BatchedEvent("level", cached, live, (cached, live))]])
+
+
+class Member:
+    def __init__(self, tag, trophies):
+        self.tag = tag
+        self.trophies = trophies
+
+
+class ClanModel:
+    def __init__(self, tag, *members):
+        self.tag = tag
+        self.members = list(members)
+        self.members_dict = {member.tag: member for member in members}
+
+
+class TestMemberPlayerEvents(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient(member_player_events=True)
+        self.calls = []
+
+        @self.client.event
+        @coc.PlayerEvents.trophies(tags=["#2PP", "#8YY"])
+        async def trophies(old, new):
+            self.calls.append((old.tag, old.trophies, new.trophies))
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_events_from_clan(self):
+        self.assertFalse(self.client._derives_from_clan("#2PP"))
+
+        await self.client._dispatch_member_updates(None, ClanModel("#CLAN", Member("#2PP", 10), Member("#9QQ", 1)))
+        self.assertTrue(self.client._derives_from_clan("#2PP"))
+        self.assertFalse(self.client._derives_from_clan("#9QQ"))
+        self.assertFalse(self.client._derives_from_clan("#8YY"))
+
+        await self.client._dispatch_member_updates(
+            ClanModel("#CLAN", Member("#2PP", 10), Member("#9QQ", 1)),
+            ClanModel("#CLAN", Member("#2PP", 20), Member("#9QQ", 5)),
+        )
+        await self.client._dispatcher.join()
+        self.assertEqual(self.calls, [("#2PP", 10, 20)])
+
+        # they left the clan, so they're requested again.
+        await self.client._dispatch_member_updates(ClanModel("#CLAN", Member("#2PP", 20)), ClanModel("#CLAN"))
+        self.assertFalse(self.client._derives_from_clan("#2PP"))
+
+    async def test_fields_not_in_member_list(self):
+        @self.client.event
+        @coc.PlayerEvents.war_stars(tags=["#2PP"])
+        async def war_stars(old, new):
+            pass
+
+        await self.client._dispatch_member_updates(None, ClanModel("#CLAN", Member("#2PP", 10)))
+        self.assertFalse(self.client._derives_from_clan("#2PP"))
+
+        self.client.remove_events(war_stars)
+        self.assertTrue(self.client._derives_from_clan("#2PP"))
+
+        self.client.remove_clan_updates("#CLAN")
+        self.assertFalse(self.client._derives_from_clan("#2PP"))
+
+    async def test_off_by_default(self):
+        client = coc.EventsClient()
+        try:
+            @client.event
+            @coc.PlayerEvents.trophies(tags=["#2PP"])
+            async def trophies(old, new):
+                pass
+
+            data = {"tag": "#CLAN", "memberList": [{"tag": "#2PP", "trophies": 10, "builderBaseTrophies": 0}], "_response_retry": 60}
+            await client._apply_clan_update("#CLAN", coc.Clan(data=data, client=client))
+            # the player is still requested, so their listeners get player_cls objects.
+            self.assertNotIn("#2PP", client._member_clans)
+            self.assertFalse(client._derives_from_clan("#2PP"))
+        finally:
+            for task in client._updater_tasks.values():
+                task.cancel()
+            client._dispatcher.close()
+
+
+class TestPollers(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient()
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_idle_client(self):
+        self.assertEqual(list(self.client._updater_tasks), [])
+
+    async def test_loop_lag(self):
+        self.assertEqual(self.client.loop_lag, {"last": 0.0, "mean": 0.0, "max": 0.0})
+        # it's measured from the first time it's read.
+        self.assertEqual(list(self.client._updater_tasks), ["loop_lag"])
+        self.client.add_clan_updates("#2PP")
+        self.client.remove_clan_updates("#2PP")
+        self.assertEqual(list(self.client._updater_tasks), ["loop_lag"])
+
+        client = coc.EventsClient(loop_lag_interval=0.5)
+        try:
+            self.assertEqual(list(client._updater_tasks), ["loop_lag"])
+            self.assertEqual(client._loop_lag.interval, 0.5)
+        finally:
+            for task in client._updater_tasks.values():
+                task.cancel()
+            client._dispatcher.close()
+
+    async def test_tags_start_pollers(self):
+        self.client.add_clan_updates("#2PP")
+        self.assertEqual(set(self.client._updater_tasks), {"clan", "maintenance"})
+
+        task = self.client._updater_tasks["clan"]
+        self.client.remove_clan_updates("#2PP")
+        self.assertEqual(list(self.client._updater_tasks), [])
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+
+    async def test_client_events_start_pollers(self):
+        @self.client.event
+        @coc.ClientEvents.raid_weekend_start()
+        async def raid_weekend_start():
+            pass
+
+        @self.client.event
+        @coc.ClientEvents.new_season_start()
+        async def new_season_start():
+            pass
+
+        self.assertEqual(set(self.client._updater_tasks), {"raid_weekend", "clock"})
+        self.assertEqual(list(self.client._clock._jobs), ["new_season_start"])
+
+        self.client.remove_events(raid_weekend_start, new_season_start)
+        self.assertEqual(list(self.client._updater_tasks), [])
+        self.assertEqual(len(self.client._clock), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import copy
+import pickle
+import threading
+import time
+import unittest
+
+import coc
+from coc.executor import ListenerExecutors, LoopLagMonitor, ModelSnapshot, snapshot
+from coc.players import Player
+from coc.raid import RaidAttack, RaidLogEntry, RaidMember
+from coc.wars import ClanWar
+from tests.mockdata.mock_current_war import MOCK_CURRENT_WAR_IN_WAR
+from tests.mockdata.mock_players import MOCK_SEARCH_PLAYER
+from tests.test_raid_events import _attack, _district, _raid
+
+
+def _roundtrip(obj):
+    return pickle.loads(pickle.dumps(snapshot(obj))).load()
+
+
+class TestModelSnapshot(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.Client(raw_attribute=True)
+        self.client._create_holders()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_player(self):
+        player = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        self.assertIsInstance(snapshot(player), ModelSnapshot)
+
+        loaded = _roundtrip(player)
+        self.assertIsInstance(loaded, Player)
+        self.assertIsNone(loaded._client)
+        self.assertEqual(loaded.tag, player.tag)
+        self.assertEqual([troop.name for troop in loaded.troops], [troop.name for troop in player.troops])
+        self.assertEqual([hero.level for hero in loaded.heroes], [hero.level for hero in player.heroes])
+
+    def test_war_attack(self):
+        data = copy.deepcopy(MOCK_CURRENT_WAR_IN_WAR)
+        for member in data["clan"]["members"] + data["opponent"]["members"]:
+            for attack in member.get("attacks", []):
+                attack["duration"] = 120
+
+        war = ClanWar(data=data, client=self.client, clan_tag=data["opponent"]["tag"])
+        attack = war.attacks[0]
+
+        loaded = _roundtrip(attack)
+        self.assertEqual(loaded, attack)
+        self.assertIsInstance(loaded.war, ClanWar)
+        self.assertEqual(loaded.war.clan.tag, data["opponent"]["tag"])
+        self.assertEqual(loaded.attacker.tag, attack.attacker.tag)
+
+    def test_raid(self):
+        districts = [_district(1), _district(2, _attack("#B", 20), _attack("#A", 50))]
+        data = _raid(members=[("#A", 100)], districts=districts)
+        entry = RaidLogEntry(data=data, client=self.client, clan_tag="#CLAN")
+        attack = entry.attack_log[0].districts[1].attacks[1]
+
+        self.assertEqual(snapshot(attack).path, (("attack_log", 0), ("districts", 1), ("attacks", 1)))
+        loaded = _roundtrip(attack)
+        self.assertIsInstance(loaded, RaidAttack)
+        self.assertEqual((loaded.attacker_tag, loaded.destruction, loaded.district.id), ("#A", 50, 2))
+        # it's rebuilt along with the objects it links back to.
+        self.assertIs(loaded.raid_clan, loaded.raid_log_entry.attack_log[0])
+        self.assertEqual(loaded.raid_log_entry.clan_tag, "#CLAN")
+        self.assertEqual(loaded.attacker.capital_resources_looted, 100)
+
+        self.assertEqual(_roundtrip(entry.attack_log[0].districts[1]).id, 2)
+        member = _roundtrip(entry.members[0])
+        self.assertIsInstance(member, RaidMember)
+        self.assertEqual(member.tag, "#A")
+
+        # without the entry's raw data, it can't be rebuilt.
+        self.client.raw_attribute = False
+        entry = RaidLogEntry(data=data, client=self.client, clan_tag="#CLAN")
+        self.assertIs(snapshot(entry.members[0]), entry.members[0])
+
+    def test_without_raw_data(self):
+        self.client.raw_attribute = False
+        player = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        self.assertIs(snapshot(player), player)
+        self.assertEqual(snapshot(5), 5)
+
+
+class TestListenerExecutors(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.Client(raw_attribute=True)
+        self.client._create_holders()
+        self.executors = ListenerExecutors(max_workers=1)
+        self.calls = []
+
+    async def asyncTearDown(self):
+        self.executors.shutdown()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def listener(self, player, value):
+        self.calls.append((threading.current_thread(), player, value))
+
+    async def test_thread(self):
+        player = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        wrapped = self.executors.wrap(self.listener, "thread")
+        self.assertEqual(wrapped.__wrapped__, self.listener)
+
+        await wrapped(player, 5)
+        thread, loaded, value = self.calls[0]
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertIsNot(loaded, player)
+        self.assertIsNone(loaded._client)
+        self.assertEqual(loaded.tag, player.tag)
+        self.assertEqual(value, 5)
+
+    async def test_coroutine_listener(self):
+        async def listener(value):
+            self.calls.append(value)
+
+        await self.executors.wrap(listener, "thread")(5)
+        self.assertEqual(self.calls, [5])
+
+    async def test_invalid_executor(self):
+        with self.assertRaises(ValueError):
+            self.executors.get("fibers")
+
+
+class TestLoopLagMonitor(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_blocked_loop(self):
+        monitor = LoopLagMonitor(interval=0.01)
+        self.assertEqual(monitor.stats, {"last": 0.0, "mean": 0.0, "max": 0.0})
+
+        task = asyncio.ensure_future(monitor.run())
+        await asyncio.sleep(0)
+        time.sleep(0.1)  # block the loop
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        self.assertGreaterEqual(monitor.stats["max"], 0.05)
+
+    def test_window(self):
+        monitor = LoopLagMonitor(window=2)
+        for lag in (1.0, 0.2, 0.4, -0.1):
+            monitor.record(lag)
+        self.assertEqual(monitor.stats, {"last": 0.0, "mean": 0.2, "max": 0.4})
+
+
+if __name__ == "__main__":
+    unittest.main()
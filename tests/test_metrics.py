@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+
+import coc
+from coc.metrics import UpdaterMetrics
+
+
+class TestUpdaterMetrics(unittest.TestCase):
+    def test_loops(self):
+        metrics = UpdaterMetrics(window=2)
+        metrics.record_loop(1.0, 10, 4.0)
+        metrics.record_loop(3.0, 20, -1.0)
+        metrics.record_loop(2.0, 30, 0.5)
+
+        stats = metrics.stats
+        self.assertEqual(stats["loops"], 3)
+        self.assertEqual(stats["tags_polled"], 60)
+        self.assertEqual((stats["last_duration"], stats["mean_duration"], stats["max_duration"]), (2.0, 2.5, 3.0))
+        self.assertEqual((stats["lag"], stats["max_lag"]), (0.5, 4.0))
+
+    def test_tags_per_second(self):
+        metrics = UpdaterMetrics(rate_window=10)
+        start = metrics._started
+        metrics.record_loop(1.0, 50, 0, now=start + 5)
+        # only 5 seconds have passed, so they were refreshed over 5 seconds rather than 10.
+        self.assertEqual(metrics.tags_per_second(now=start + 5), 10)
+
+        metrics.record_loop(1.0, 20, 0, now=start + 20)
+        self.assertEqual(metrics.tags_per_second(now=start + 20), 2)
+
+    def test_errors_and_listeners(self):
+        metrics = UpdaterMetrics()
+        metrics.record_error(coc.Maintenance())
+        metrics.record_error(coc.Maintenance())
+        metrics.record_error(ValueError())
+        metrics.record_listener(0.25)
+        metrics.record_listener(0.5)
+
+        stats = metrics.stats
+        self.assertEqual(stats["errors"], {"Maintenance": 2, "ValueError": 1})
+        self.assertEqual((stats["listener_calls"], stats["listener_time"]), (2, 0.75))
+
+
+class TestPollMetrics(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient(metrics_interval=0.01)
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_update_errors(self):
+        async def get_player(tag, **kwargs):
+            raise coc.Maintenance() if tag == "#2PP" else ValueError(tag)
+
+        self.client.get_player = get_player
+        self.client.dispatch = lambda *args: None
+        self.client.add_player_updates("#2PP", "#8YY")
+        await self.client._run_player_update("#2PP")
+        await self.client._run_player_update("#8YY")
+
+        metrics = self.client.poll_metrics["player"]
+        self.assertEqual(metrics["errors"], {"Maintenance": 1, "ValueError": 1})
+        self.assertEqual((metrics["tags"], metrics["snapshots"], metrics["skipped"]), (2, 0, 0))
+
+    async def test_listener_time(self):
+        @self.client.event(batch_size=10)
+        @coc.ClanEvents.points()
+        async def points(events):
+            pass
+
+        async def listener(*args):
+            await asyncio.sleep(0.02)
+
+        await self.client._dispatcher.submit(("clan", "#2PP"), listener)
+        # batches count towards the updater of their listener, too.
+        batcher = self.client._batchers["clan"][points]
+        await batcher.collect("points", None, None)
+        await batcher.flush()
+        await self.client._dispatcher.join()
+        self.assertEqual(self.client.poll_metrics["clan"]["listener_calls"], 2)
+        self.assertGreaterEqual(self.client.poll_metrics["clan"]["listener_time"], 0.02)
+
+    async def test_periodic_event(self):
+        received = asyncio.get_running_loop().create_future()
+
+        @self.client.event
+        @coc.ClientEvents.poll_metrics()
+        async def poll_metrics(metrics):
+            if not received.done():
+                received.set_result(metrics)
+
+        self.assertIn("metrics", self.client._updater_tasks)
+        metrics = await asyncio.wait_for(received, timeout=1)
+        self.assertEqual(set(metrics), {"clan", "player", "war", "raid"})
+
+        self.client.remove_events(poll_metrics)
+        self.assertNotIn("metrics", self.client._updater_tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
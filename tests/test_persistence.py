@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+import coc
+from coc.persistence import SnapshotPersistence, SnapshotRecord, SQLiteSnapshotPersistence
+from coc.players import Player
+from coc.snapshots import CompactSnapshotStore, ModelStore
+from tests.mockdata.mock_players import MOCK_SEARCH_PLAYER
+
+
+class MemoryPersistence(SnapshotPersistence):
+    def __init__(self, records=()):
+        self.records = {(record.type, record.key): record for record in records}
+
+    def load(self, keys=None):
+        if keys is None:
+            return list(self.records.values())
+        return [self.records[key] for key in keys if key in self.records]
+
+    def save(self, updated, removed):
+        for record in updated:
+            self.records[(record.type, record.key)] = record
+        for key in removed:
+            self.records.pop(key, None)
+
+
+class TestSQLiteSnapshotPersistence(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "snapshots.db")
+
+    def test_save_and_load(self):
+        persistence = SQLiteSnapshotPersistence(self.path)
+        persistence.save(
+            [SnapshotRecord("player", "#2PP", {"tag": "#2PP", "trophies": 1}), SnapshotRecord("clan", "#2PP", {})], []
+        )
+        persistence.save([SnapshotRecord("player", "#2PP", {"tag": "#2PP", "trophies": 2})], [("clan", "#2PP")])
+        persistence.close()
+
+        # a new connection, as if the bot was restarted.
+        persistence = SQLiteSnapshotPersistence(self.path)
+        self.assertEqual(persistence.load(), [SnapshotRecord("player", "#2PP", {"tag": "#2PP", "trophies": 2})])
+        self.assertEqual(persistence.load([("clan", "#2PP"), ("player", "#2PP")]), persistence.load())
+        persistence.close()
+
+    def test_incomplete_subclass(self):
+        class LoadOnly(SnapshotPersistence):
+            def load(self, keys=None):
+                return []
+
+        with self.assertRaises(TypeError):
+            LoadOnly()
+        # close is optional.
+        MemoryPersistence().close()
+
+
+class TestStoreRawData(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.Client(raw_attribute=True)
+        self.client._create_holders()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_set_raw(self):
+        for store in (ModelStore(self.client), CompactSnapshotStore(self.client)):
+            store.set_raw("#2PP", Player, {**MOCK_SEARCH_PLAYER, "_fingerprint": "abc"}, load_game_data=False)
+            self.assertEqual(store.fingerprint("#2PP"), "abc")
+            self.assertEqual(store.get_raw("#2PP")["tag"], MOCK_SEARCH_PLAYER["tag"])
+            self.assertEqual(store.get("#2PP").trophies, MOCK_SEARCH_PLAYER["trophies"])
+
+
+class TestEventsClientPersistence(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        now = time.time()
+        self.persistence = MemoryPersistence([
+            SnapshotRecord("player", "#2PP", {**MOCK_SEARCH_PLAYER, "timestamp": now, "_response_retry": 600}),
+            SnapshotRecord("player", "#8YY", {**MOCK_SEARCH_PLAYER, "timestamp": now - 600, "_response_retry": 60}),
+            SnapshotRecord("player", "#9QQ", {**MOCK_SEARCH_PLAYER, "timestamp": now, "_response_retry": 600}),
+        ])
+        self.client = coc.EventsClient(snapshot_persistence=self.persistence)
+        self.client._create_holders()
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+        self.client._persistence_executor.shutdown()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_restore(self):
+        self.assertTrue(self.client.raw_attribute)
+        self.client.add_player_updates("#2PP", "#8YY")
+        await self.client._snapshots_restored.wait()
+
+        scheduler = self.client._schedulers["player"]
+        # the snapshot of #2PP is still fresh, so it isn't requested until it goes stale.
+        self.assertEqual(scheduler.pop_due(), ["#8YY"])
+        self.assertIsNotNone(scheduler.next_due())
+        self.assertEqual(self.client._get_cached_player("#2PP").trophies, MOCK_SEARCH_PLAYER["trophies"])
+
+        # tags added after the restore use their restored snapshot too.
+        self.client.add_player_updates("#9QQ")
+        self.assertEqual(scheduler.pop_due(), [])
+
+    async def test_checkpoint(self):
+        self.client.add_player_updates("#2PP")
+        await self.client._snapshots_restored.wait()
+
+        self.client._update_player(Player(data={**MOCK_SEARCH_PLAYER, "tag": "#2PP", "trophies": 1}, client=self.client))
+        await self.client.checkpoint()
+        # stale snapshots of tags that weren't added are deleted, fresh ones are kept until they're claimed.
+        self.assertEqual(sorted(self.persistence.records), [("player", "#2PP"), ("player", "#9QQ")])
+        self.assertEqual(self.persistence.records[("player", "#2PP")].data["trophies"], 1)
+
+        self.client.add_player_updates("#9QQ")
+        self.assertEqual(self.client._get_cached_player("#9QQ").trophies, MOCK_SEARCH_PLAYER["trophies"])
+        self.client.remove_player_updates("#9QQ")
+        await self.client.checkpoint()
+        self.assertEqual(list(self.persistence.records), [("player", "#2PP")])
+
+        self.client.remove_player_updates("#2PP")
+        await self.client.checkpoint()
+        self.assertEqual(self.persistence.records, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+
+import coc
+from coc.planner import plan_capacity, tune_retry_intervals
+from coc.players import Player
+from tests.mockdata.mock_players import MOCK_SEARCH_PLAYER
+
+TAGS = ["#%s" % n for n in range(100)]
+
+
+class TestPlanCapacity(unittest.TestCase):
+    def test_within_capacity(self):
+        plan = plan_capacity({"clan": [60, 120], "player": []}, {"clan": 0, "player": 0}, capacity=1)
+        self.assertAlmostEqual(plan.required, 1 / 60 + 1 / 120)
+        self.assertFalse(plan.over_capacity)
+
+        clan = plan.classes["clan"]
+        self.assertEqual((clan.tags, clan.interval, clan.staleness), (2, 90, 90))
+        self.assertEqual(plan.classes["player"].staleness, 0)
+
+    def test_over_capacity(self):
+        ttls = {"player": [10] * 40}
+        plan = plan_capacity(ttls, {"player": 20}, capacity=1, costs={"player": 2})
+        # every player is refreshed every 20 seconds, for 2 requests each.
+        self.assertAlmostEqual(plan.required, 4)
+        self.assertAlmostEqual(plan.utilisation, 4)
+        self.assertTrue(plan.over_capacity)
+        self.assertAlmostEqual(plan.classes["player"].staleness, 80)
+
+    def test_min_interval(self):
+        plan = plan_capacity({"war": [0, 0]}, {}, capacity=1, min_interval=10)
+        self.assertAlmostEqual(plan.required, 0.2)
+
+
+class TestTuneRetryIntervals(unittest.TestCase):
+    def test_within_budget(self):
+        intervals = tune_retry_intervals({"clan": [60], "player": [60]}, {"clan": 30}, budget=1)
+        self.assertEqual(intervals, {"clan": 30, "player": 0})
+
+    def test_over_budget(self):
+        ttls = {"clan": [300] * 10, "player": [60] * 100}
+        intervals = tune_retry_intervals(ttls, {"clan": 600}, budget=1)
+        self.assertEqual(intervals["clan"], 600)
+        # the players are slowed down, but the clans are already refreshed less often than that.
+        self.assertAlmostEqual(intervals["player"], 100 / (1 - 10 / 600), places=3)
+        self.assertLessEqual(plan_capacity(ttls, intervals, 1).required, 1)
+
+
+class TestEventsClientPlanner(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient(key_count=1, throttle_limit=1, compact_snapshots=True)
+        self.client._create_holders()
+        self.client.add_player_updates(*TAGS)
+        for tag in TAGS:
+            data = {**MOCK_SEARCH_PLAYER, "tag": tag, "_response_retry": 60}
+            self.client._stores["player"].set_raw(tag, Player, data)
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_plan_capacity(self):
+        plan = self.client.plan_capacity()
+        self.assertEqual(plan.capacity, 1)
+        self.assertAlmostEqual(plan.required, 100 / 60)
+        self.assertTrue(plan.over_capacity)
+        self.assertEqual(plan.classes["player"].tags, 100)
+        self.assertAlmostEqual(plan.classes["player"].staleness, 100)
+
+    def test_tune_intervals(self):
+        plan = self.client.tune_intervals()
+        self.assertEqual(self.client.player_retry_interval, 112)
+        self.assertLessEqual(plan.utilisation, self.client.capacity_target)
+
+        # half the players are gone, so they can be refreshed as often as their cache allows again.
+        self.client.remove_player_updates(*TAGS[50:])
+        self.client.tune_intervals()
+        self.assertEqual(self.client.player_retry_interval, 0)
+
+    def test_listener_retry_interval(self):
+        @coc.PlayerEvents.trophies(retry_interval=300)
+        async def on_trophies(old, new):
+            pass
+
+        self.client.add_events(on_trophies)
+        self.client.tune_intervals()
+        self.assertEqual(self.client.player_retry_interval, 300)
+
+        # a later listener that asks for less doesn't lower it.
+        @coc.PlayerEvents.donations(retry_interval=30)
+        async def on_donations(old, new):
+            pass
+
+        self.client.add_events(on_donations)
+        self.assertEqual(self.client._retry_floors["player"], 300)
+        self.client.tune_intervals()
+        self.assertEqual(self.client.player_retry_interval, 300)
+
+    def test_request_costs(self):
+        self.assertEqual(set(self.client._request_costs()), {"clan", "player", "war", "raid"})
+
+    def test_planner_poller(self):
+        self.assertNotIn("planner", self.client._updater_tasks)
+        self.client.auto_tune_intervals = True
+        self.client._refresh_pollers()
+        self.assertIn("planner", self.client._updater_tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
+import copy
 import unittest
 
 import coc
+from coc.diff import PlayerDiff
 from coc.players import Player, ClanMember
 from coc.clans import Clan
 from coc.player_clan import PlayerClan
@@ -237,5 +239,46 @@ class TestPlayers(unittest.TestCase):
             self.assertEqual(spell.name, SPELL_ORDER[index])
 
 
+class TestPlayerDiff(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.client = coc.Client()
+        self.client._create_holders()
+
+    def get_diff(self, **changes):
+        data = copy.deepcopy(MOCK_SEARCH_PLAYER)
+        data.update(changes)
+        cached = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        return PlayerDiff(cached, Player(data=data, client=self.client))
+
+    def test_no_changes(self):
+        diff = self.get_diff()
+        self.assertIsNone(diff.get_field("trophies"))
+        for attr in ("troops", "spells", "heroes", "pets", "equipment", "achievements", "labels_added", "labels_removed"):
+            self.assertEqual(getattr(diff, attr), [])
+        self.assertFalse(diff.joined_clan)
+        self.assertFalse(diff.left_clan)
+
+    def test_fields(self):
+        diff = self.get_diff(trophies=MOCK_SEARCH_PLAYER["trophies"] + 1)
+        self.assertEqual(diff.get_field("trophies"), (MOCK_SEARCH_PLAYER["trophies"], MOCK_SEARCH_PLAYER["trophies"] + 1))
+
+    def test_units(self):
+        troops = copy.deepcopy(MOCK_SEARCH_PLAYER["troops"])
+        troops[0]["level"] += 1
+        achievements = copy.deepcopy(MOCK_SEARCH_PLAYER["achievements"])
+        achievements[0]["value"] += 1
+        diff = self.get_diff(troops=troops, achievements=achievements)
+        self.assertEqual([troop.name for troop in diff.troops], [troops[0]["name"]])
+        self.assertEqual([a.name for a in diff.achievements], [achievements[0]["name"]])
+
+    def test_labels_and_clan(self):
+        diff = self.get_diff(labels=MOCK_SEARCH_PLAYER["labels"][1:], clan=None)
+        self.assertEqual([label.id for label in diff.labels_removed], [MOCK_SEARCH_PLAYER["labels"][0]["id"]])
+        self.assertEqual(diff.labels_added, [])
+        self.assertTrue(diff.left_clan)
+        self.assertFalse(diff.joined_clan)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,217 @@
+import asyncio
+import copy
+import functools
+import threading
+import unittest
+from unittest import mock
+
+import coc
+from coc.diff import RaidDiff
+from coc.entry_logs import RaidLog
+from coc.raid import RaidLogEntry
+
+START = "20240105T070000.000Z"
+
+
+def _attack(tag, destruction, stars=1):
+    return {"attacker": {"tag": tag, "name": tag}, "destructionPercent": destruction, "stars": stars}
+
+
+def _district(district_id, *attacks):
+    destruction = max((attack["destructionPercent"] for attack in attacks), default=0)
+    return {
+        "id": district_id, "name": "District %s" % district_id, "districtHallLevel": 1, "stars": 0,
+        "destructionPercent": destruction, "attackCount": len(attacks), "totalLooted": 0, "attacks": list(attacks),
+    }
+
+
+def _raid(state="ongoing", start=START, members=(), districts=()):
+    return {
+        "state": state,
+        "startTime": start,
+        "endTime": "20240108T070000.000Z",
+        "capitalTotalLoot": sum(loot for _, loot in members),
+        "members": [
+            {"tag": tag, "name": tag, "attacks": 1, "attackLimit": 5, "bonusAttackLimit": 1,
+             "capitalResourcesLooted": loot}
+            for tag, loot in members
+        ],
+        "attackLog": [
+            {"defender": {"tag": "#ENEMY", "name": "Enemy", "level": 1, "badgeUrls": {}}, "attackCount": 0,
+             "districtCount": 2, "districtsDestroyed": 0, "districts": list(districts)},
+        ],
+        "defenseLog": [],
+    }
+
+
+def _entry(data):
+    return RaidLogEntry(data=data, client=None, clan_tag="#CLAN")
+
+
+class TestRaidDiff(unittest.TestCase):
+    def test_attacks(self):
+        cached = _raid(districts=[_district(1, _attack("#A", 40), _attack("#A", 40)), _district(2)])
+        live = _raid(districts=[
+            _district(1, _attack("#A", 40), _attack("#A", 40), _attack("#A", 40), _attack("#B", 100, 3)),
+            _district(2, _attack("#B", 20)),
+        ])
+        diff = RaidDiff(_entry(cached), _entry(live))
+        # the third identical attack is new, even though it's the same as the other 2.
+        self.assertEqual(
+            [(attack.district.id, attack.attacker_tag, attack.destruction) for attack in diff.attacks],
+            [(1, "#A", 40), (1, "#B", 100), (2, "#B", 20)],
+        )
+        self.assertEqual([district.id for district in diff.destroyed_districts], [1])
+        self.assertFalse(diff.new_raid)
+        self.assertFalse(diff.finished)
+
+    def test_same_clan_twice(self):
+        # the same clan can be raided again once its capital has been destroyed.
+        cached = _raid(districts=[_district(1, _attack("#A", 100))])
+        live = _raid(districts=[_district(1, _attack("#A", 100))])
+        live["attackLog"].append(copy.deepcopy(live["attackLog"][0]))
+        live["attackLog"][1]["districts"] = [_district(1, _attack("#B", 100))]
+        diff = RaidDiff(_entry(cached), _entry(live))
+        self.assertEqual([attack.attacker_tag for attack in diff.attacks], ["#B"])
+        self.assertEqual([district.id for district in diff.destroyed_districts], [1])
+
+    def test_member_loot(self):
+        cached = _raid(members=[("#A", 100), ("#B", 50)])
+        live = _raid(state="ended", members=[("#A", 300), ("#B", 50), ("#C", 20)])
+        diff = RaidDiff(_entry(cached), _entry(live))
+        self.assertEqual(
+            [(old and old.capital_resources_looted, new.tag) for old, new in diff.member_loot],
+            [(100, "#A"), (None, "#C")],
+        )
+        self.assertTrue(diff.finished)
+
+    def test_new_raid(self):
+        cached = _raid(state="ended", districts=[_district(1, _attack("#A", 100))])
+        live = _raid(start="20240112T070000.000Z", districts=[_district(1, _attack("#A", 100))])
+        diff = RaidDiff(_entry(cached), _entry(live))
+        self.assertTrue(diff.new_raid)
+        self.assertFalse(diff.finished)
+        self.assertEqual(len(diff.attacks), 1)
+        self.assertEqual(len(diff.destroyed_districts), 1)
+
+
+class TestRaidEvents(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient()
+        self.responses = []
+        self.requests = 0
+        self.calls = []
+
+        async def get_raid_log(clan_tag, cls=None, limit=0, **kwargs):
+            self.requests += 1
+            body = {"items": [self.responses.pop(0)], "_response_retry": 60}
+            return RaidLog(client=self.client, clan_tag=clan_tag, limit=limit, page=False, json_resp=body, model=cls)
+
+        self.client.get_raid_log = get_raid_log
+
+        @self.client.event
+        @coc.RaidEvents.raid_attack(tags=["#CLAN"])
+        async def raid_attack(attack, raid):
+            self.calls.append(("attack", attack.attacker_tag))
+
+        @self.client.event
+        @coc.RaidEvents.district_destroyed(tags=["#CLAN"])
+        async def district_destroyed(district, raid):
+            self.calls.append(("destroyed", district.id))
+
+        @self.client.event
+        @coc.RaidEvents.member_loot_change(tags=["#CLAN"])
+        async def member_loot_change(old, new):
+            self.calls.append(("loot", new.tag, new.capital_resources_looted))
+
+        @self.client.event
+        @coc.RaidEvents.raid_finished(tags=["#CLAN"])
+        async def raid_finished(raid):
+            self.calls.append(("finished", raid.state))
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def update(self, data):
+        self.responses.append(copy.deepcopy(data))
+        delay = await self.client._run_raid_update("#CLAN")
+        await self.client._dispatcher.join()
+        return delay
+
+    async def test_events(self):
+        self.assertIn("raid", self.client._updater_tasks)
+        self.assertEqual(self.client._raid_updates, {"#CLAN"})
+
+        with mock.patch("coc.events._seconds_until_raid_weekend", return_value=0):
+            await self.update(_raid(members=[("#A", 100)], districts=[_district(1)]))
+            # the first update is only compared to the next one.
+            self.assertEqual(self.calls, [])
+
+            await self.update(_raid(members=[("#A", 400)], districts=[_district(1, _attack("#A", 100, 3))]))
+            self.assertEqual(self.calls, [("attack", "#A"), ("destroyed", 1), ("loot", "#A", 400)])
+
+        self.calls.clear()
+        with mock.patch("coc.events._seconds_until_raid_weekend", return_value=4 * 24 * 60 * 60):
+            # the raid weekend is over, but the last update didn't show it as ended yet.
+            await self.update(
+                _raid(state="ended", members=[("#A", 400)], districts=[_district(1, _attack("#A", 100, 3))])
+            )
+            self.assertEqual(self.calls, [("finished", "ended")])
+            self.assertEqual(self.requests, 3)
+
+            # now there's nothing to request until the next raid weekend.
+            self.assertEqual(await self.client._run_raid_update("#CLAN"), coc.events.RAID_IDLE_SLEEP)
+            self.assertEqual(self.requests, 3)
+
+    async def test_executor(self):
+        calls = []
+
+        def listener(*args):
+            calls.append((threading.current_thread(), args))
+
+        for event in ("raid_attack", "district_destroyed", "member_loot_change"):
+            # every event needs its own function.
+            function = functools.partial(listener)
+            self.client.event(getattr(coc.RaidEvents, event)(tags=["#CLAN"])(function), executor="thread")
+
+        with mock.patch("coc.events._seconds_until_raid_weekend", return_value=0):
+            await self.update(_raid(members=[("#A", 100)], districts=[_district(1)]))
+            await self.update(_raid(members=[("#A", 400)], districts=[_district(1, _attack("#A", 100, 3))]))
+
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all(thread is not threading.current_thread() for thread, _ in calls))
+        (_, (attack, raid)), (_, (district, _)), (_, (old, new)) = calls
+        self.assertEqual((attack.attacker_tag, attack.district.id), ("#A", 1))
+        self.assertEqual(attack.attacker.capital_resources_looted, 400)
+        self.assertEqual(raid.clan_tag, "#CLAN")
+        self.assertEqual((district.id, district.destruction), (1, 100))
+        self.assertEqual((old.capital_resources_looted, new.capital_resources_looted), (100, 400))
+
+    async def test_identical_response(self):
+        data = _raid(members=[("#A", 100)])
+        with mock.patch("coc.events._seconds_until_raid_weekend", return_value=0):
+            await self.update(data)
+            self.responses.append(data)
+            # the raid log is cached, so the client hands back the same response.
+            self.client._raid_fingerprints["#CLAN"] = "abc"
+            raid_log = await self.client.get_raid_log("#CLAN", cls=RaidLogEntry, limit=1)
+            raid_log._init_data["_fingerprint"] = "abc"
+            self.client.get_raid_log = mock.AsyncMock(return_value=raid_log)
+            await self.client._run_raid_update("#CLAN")
+        self.assertEqual(self.client.skipped_updates["raid"], 1)
+
+    async def test_remove(self):
+        self.client.remove_raid_updates("#CLAN")
+        self.assertNotIn("raid", self.client._updater_tasks)
+        self.assertNotIn("#CLAN", self.client._schedulers["raid"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import asyncio
+import copy
+import io
+import os
+import tempfile
+import unittest
+
+import orjson
+
+import coc
+from coc.replay import _make_record
+
+MOCKDATA = os.path.join(os.path.dirname(__file__), "mockdata")
+CLAN = os.path.join(MOCKDATA, "clans", "clans", "CLAN.json")
+WAR = os.path.join(MOCKDATA, "clans", "currentwar", "PREPARATION.json")
+PLAYER = os.path.join(MOCKDATA, "players", "player", "FOUND.json")
+
+
+def _clan_records(*names):
+    clan = coc.read_mockdata("clan", CLAN)[0]
+    return [clan._replace(data={**copy.deepcopy(clan.data), "name": name}, time=i / 10) for i, name in enumerate(names)]
+
+
+class TestReadRecords(unittest.TestCase):
+    def test_read_records(self):
+        lines = [
+            orjson.dumps({"type": "player", "tag": "#2PP", "data": {"name": "a"}, "time": 1.5}),
+            b"",
+            orjson.dumps({"type": "clan", "data": {"tag": "#8YY", "name": "b"}}),
+        ]
+        records = list(coc.read_records(io.BytesIO(b"\n".join(lines))))
+        self.assertEqual(records, [
+            coc.ReplayRecord("player", "#2PP", {"name": "a"}, 1.5),
+            coc.ReplayRecord("clan", "#8YY", {"tag": "#8YY", "name": "b"}),
+        ])
+
+    def test_read_mockdata(self):
+        war = coc.read_mockdata("war", WAR)[0]
+        # the response is unwrapped, and the war is for its clan.
+        self.assertEqual(war.tag, war.data["clan"]["tag"])
+        self.assertIn("state", war.data)
+
+        with self.assertRaises(ValueError):
+            _make_record("raid", {"state": "ongoing"})
+
+    def test_recorder(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "updates.ndjson")
+            recorder = coc.ReplayRecorder(path)
+            recorder.record("clan", "#8YY", {"tag": "#8YY"}, 10.0)
+            recorder.record("war", "#8YY", {"state": "inWar"}, 20.0)
+            recorder.close()
+
+            records = list(coc.read_records(path))
+        self.assertEqual(recorder.records, 2)
+        self.assertEqual([(record.type, record.time) for record in records], [("clan", 10.0), ("war", 20.0)])
+
+
+class TestReplayDriver(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.EventsClient()
+        self.calls = []
+
+        async def get_clan(*args, **kwargs):
+            raise AssertionError("nothing should be requested while replaying")
+
+        self.client.get_clan = get_clan
+
+    async def asyncTearDown(self):
+        for task in self.client._updater_tasks.values():
+            task.cancel()
+        self.client._dispatcher.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def add_name_listener(self, tags=None):
+        @self.client.event
+        @coc.ClanEvents.name(tags=tags)
+        async def on_name(old, new):
+            self.calls.append((old.name, new.name, "clan" in self.client._updater_tasks))
+
+    async def test_clan_events(self):
+        tag = _clan_records("a")[0].tag
+        self.add_name_listener(tags=[tag])
+        self.assertIn("clan", self.client._updater_tasks)
+
+        report = await coc.ReplayDriver(self.client, _clan_records("a", "b", "c")).run()
+        # the clan isn't requested while the replay runs, but it is again afterwards.
+        self.assertEqual(self.calls, [("a", "b", False), ("b", "c", False)])
+        self.assertIn("clan", self.client._updater_tasks)
+
+        self.assertEqual((report.records, report.skipped, report.events), (3, 0, 2))
+        self.assertGreater(report.events_per_second, 0)
+        self.assertLessEqual(report.mean_latency, report.max_latency)
+        self.assertLessEqual(report.p95_latency, report.max_latency)
+
+    async def test_identical_records(self):
+        self.add_name_listener()
+        records = [record._replace(data={**record.data, "_fingerprint": "abc"}) for record in _clan_records("a", "a")]
+        report = await coc.ReplayDriver(self.client, records).run()
+        self.assertEqual((report.records, report.skipped, report.events), (2, 1, 0))
+
+    async def test_war_events(self):
+        @self.client.event
+        @coc.WarEvents.state()
+        async def on_state(old, new):
+            self.calls.append((old.state, new.state))
+
+        war = coc.read_mockdata("war", WAR)[0]
+        records = [war, war._replace(data={**war.data, "state": "inWar"})]
+        await coc.ReplayDriver(self.client, records).run()
+        self.assertEqual(self.calls, [("preparation", "inWar")])
+
+    async def test_player_events(self):
+        @self.client.event
+        @coc.PlayerEvents.trophies()
+        async def on_trophies(old, new):
+            self.calls.append((new.trophies - old.trophies, [troop.name for troop in new.troops][:1]))
+
+        player = coc.read_mockdata("player", PLAYER)[0]
+        records = [player, player._replace(data={**player.data, "trophies": player.data["trophies"] + 10})]
+        # the client was never logged in.
+        await coc.ReplayDriver(self.client, records).run()
+        self.assertEqual(self.calls, [(10, [player.data["troops"][0]["name"]])])
+
+    async def test_speed(self):
+        self.add_name_listener()
+        report = await coc.ReplayDriver(self.client, _clan_records("a", "b", "c"), speed=4).run()
+        # the last record was received 0.2 seconds after the first.
+        self.assertGreaterEqual(report.seconds, 0.05)
+        self.assertEqual(len(self.calls), 2)
+
+        with self.assertRaises(ValueError):
+            coc.ReplayDriver(self.client, [], speed=0)
+
+    async def test_recorder(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "updates.ndjson")
+            client = coc.EventsClient(recorder=coc.ReplayRecorder(path))
+            self.assertTrue(client.raw_attribute)
+            try:
+                await coc.ReplayDriver(client, _clan_records("a", "b")).run()
+            finally:
+                client.recorder.close()
+                client._dispatcher.close()
+
+            records = list(coc.read_records(path))
+        self.assertEqual([record.data["name"] for record in records], ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import unittest
+
+from datetime import datetime, timedelta, timezone
+
+from coc.scheduler import AdaptivePollPolicy, ClockScheduler, PollScheduler
+
+
+class TestPollScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.refreshed = []
+        self.scheduler = PollScheduler(self.worker, workers=2)
+
+    async def worker(self, key):
+        self.refreshed.append(key)
+        if key == "#ERROR":
+            raise ValueError(key)
+        return 60
+
+    async def test_only_due_keys(self):
+        self.scheduler.add("#2PP")
+        self.scheduler.schedule("#8YY", 60)
+        await self.scheduler.wait()
+        self.assertEqual(await self.scheduler.run_due(), 1)
+        self.assertEqual(self.refreshed, ["#2PP"])
+        self.assertEqual(self.scheduler.pop_due(), [])
+
+    async def test_add_is_idempotent(self):
+        self.scheduler.schedule("#2PP", 60)
+        self.scheduler.add("#2PP")
+        self.assertEqual(self.scheduler.pop_due(), [])
+
+    async def test_remove(self):
+        self.scheduler.add("#2PP")
+        self.scheduler.remove("#2PP")
+        self.assertIsNone(self.scheduler.next_due())
+        self.assertEqual(await self.scheduler.run_due(), 0)
+
+    async def test_error(self):
+        errors = []
+        self.scheduler.on_error = errors.append
+        self.scheduler.add("#ERROR")
+        await self.scheduler.run_due()
+        self.assertEqual(len(errors), 1)
+        self.assertIn("#ERROR", self.scheduler)
+        self.assertIsNotNone(self.scheduler.next_due())
+
+    async def test_min_delay(self):
+        self.scheduler.min_delay = 120
+        self.scheduler.add("#2PP")
+        await self.scheduler.run_due()
+        self.assertGreater(self.scheduler.next_due() - time.monotonic(), 60)
+
+    async def test_lag(self):
+        self.scheduler.add("#2PP")
+        self.scheduler.schedule("#8YY", -30)
+        self.scheduler.pop_due(time.monotonic() + 5)
+        self.assertGreaterEqual(self.scheduler.lag, 35)
+
+    async def test_wakeup(self):
+        waiter = asyncio.ensure_future(self.scheduler.wait())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        self.scheduler.add("#2PP")
+        await asyncio.wait_for(waiter, timeout=1)
+
+
+class Model:
+    def __init__(self, trophies):
+        self.trophies = trophies
+        self.name = "name"
+
+
+class TestAdaptivePollPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = AdaptivePollPolicy(max_interval=600, backoff=2)
+
+    def test_backoff(self):
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, None, Model(1)), 60)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, Model(1), Model(1)), 120)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, Model(1), Model(1)), 240)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, Model(1), Model(1)), 480)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, Model(1), Model(1)), 600)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, Model(1), Model(2)), 60)
+
+    def test_known_change(self):
+        # a known change skips comparing the objects entirely.
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, changed=False), 120)
+        self.assertEqual(self.policy.get_interval("player", "#2PP", 60, changed=True), 60)
+
+    def test_budget(self):
+        self.policy.request_budget = 1 / 60
+        for tag in ("#2PP", "#8YY", "#9QQ"):
+            self.policy.get_interval("player", tag, 60, None, Model(1))
+        for tag in ("#2PP", "#8YY", "#9QQ"):
+            self.assertAlmostEqual(self.policy.get_interval("player", tag, 60, None, Model(1)), 180)
+
+    def test_remove(self):
+        self.policy.get_interval("player", "#2PP", 60, None, Model(1))
+        self.policy.remove("player", "#2PP")
+        self.assertEqual(self.policy.rate, 0)
+
+
+def every(seconds):
+    return lambda after: after + timedelta(seconds=seconds)
+
+
+class TestClockScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.called = []
+        self.clock = ClockScheduler(max_sleep=0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_run_due(self):
+        self.clock.add("hourly", every(3600), lambda: self.called.append("hourly"))
+        self.clock.add("daily", every(86400), lambda: self.called.append("daily"))
+        due = self.clock.next_due()
+
+        self.assertEqual(self.clock.run_due(due), 1)
+        self.assertEqual(self.called, ["hourly"])
+        # it's rescheduled from when it was due, not when it was called.
+        self.assertEqual(self.clock.next_due(), due + timedelta(seconds=3600))
+
+        self.clock.remove("hourly")
+        self.assertEqual(self.clock.run_due(due + timedelta(days=2)), 1)
+        self.assertEqual(self.called, ["hourly", "daily"])
+
+    async def test_run(self):
+        task = asyncio.ensure_future(self.clock.run())
+        await asyncio.sleep(0.02)
+        # jobs added while it's idle wake it up.
+        self.clock.add("soon", every(0.05), lambda: self.called.append(datetime.now(tz=timezone.utc)))
+        await asyncio.sleep(0.125)
+        task.cancel()
+        self.assertEqual(len(self.called), 2)
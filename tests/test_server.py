@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+
+import orjson
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import coc
+from coc.__main__ import build_parser
+from coc.server import create_app
+
+
+def _clan(tag, name="clan"):
+    return coc.Clan(data={"tag": tag, "name": name}, client=None)
+
+
+class TestEventHub(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.hub = coc.EventHub(history=3, queue_size=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_filters(self):
+        by_tag = self.hub.subscribe(tags=["#8YY"])
+        by_event = self.hub.subscribe(types=["clan"], events=["name"])
+
+        self.hub.publish("clan", "name", _clan("#8YY"), _clan("#8YY"))
+        self.hub.publish("clan", "level", _clan("#2PP"), _clan("#2PP"))
+        self.hub.publish("war", "war_attack", None, _clan("#8YY"))
+        self.hub.close()
+
+        self.assertEqual([(event.id, event.event) async for event in by_tag], [(1, "name"), (3, "war_attack")])
+        self.assertEqual([event.id async for event in by_event], [1])
+        self.assertEqual(self.hub.subscribers, 0)
+
+    async def test_cursor(self):
+        for name in ("a", "b", "c", "d"):
+            self.hub.publish("clan", "name", _clan("#8YY", name))
+        self.assertEqual(self.hub.cursor, 4)
+
+        # only the last 3 are kept, and they don't count towards the queue size.
+        subscription = self.hub.subscribe(cursor=0)
+        self.hub.publish("clan", "name", _clan("#8YY", "e"))
+        self.hub.close()
+        events = [orjson.loads(event.line) async for event in subscription]
+        self.assertEqual([(event["id"], event["args"][0]["name"]) for event in events], [(2, "b"), (3, "c"), (4, "d"), (5, "e")])
+        self.assertEqual(events[0]["tags"], ["#8YY"])
+
+        # a cursor from before a restart is ignored.
+        self.assertEqual(self.hub.subscribe(cursor=100)._queue.qsize(), 0)
+
+    async def test_cursor_backlog_got(self):
+        for name in ("a", "b", "c"):
+            self.hub.publish("clan", "name", _clan("#8YY", name))
+        subscription = self.hub.subscribe(cursor=0)
+        self.assertEqual([(await subscription.get()).id for _ in range(3)], [1, 2, 3])
+
+        # once the replayed events have been got, only the queue size is left.
+        for _ in range(2):
+            self.hub.publish("clan", "name", _clan("#8YY"))
+        self.assertFalse(subscription.overflowed)
+        self.hub.publish("clan", "name", _clan("#8YY"))
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual([event.id async for event in subscription], [4, 5])
+
+    async def test_overflow(self):
+        subscription = self.hub.subscribe()
+        for _ in range(3):
+            self.hub.publish("clan", "name", _clan("#8YY"))
+        self.assertTrue(subscription.overflowed)
+        # the events it was behind on are still there, but nothing after them.
+        self.assertEqual([event.id async for event in subscription], [1, 2])
+        self.assertEqual(self.hub.subscribers, 0)
+
+    async def test_register(self):
+        client = coc.EventsClient()
+        try:
+            self.hub.register(client, "clan:name", "war:war_attack")
+            self.assertEqual(len(client._listeners["clan"]), 1)
+            self.assertEqual(len(client._listeners["war"]), 1)
+
+            subscription = self.hub.subscribe()
+            listener = client._listeners["clan"][0]
+            await listener.callback(_clan("#8YY"))
+            self.assertEqual((await subscription.get()).event, "name")
+
+            with self.assertRaises(ValueError):
+                self.hub.register(client, "donations")
+        finally:
+            client._dispatcher.close()
+
+
+class TestEventServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.hub = coc.EventHub()
+        self.client = TestClient(TestServer(create_app(self.hub)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        self.hub.close()
+        await self.client.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def wait_for_subscribers(self, count):
+        while self.hub.subscribers < count:
+            await asyncio.sleep(0.01)
+
+    async def test_sse(self):
+        self.hub.publish("clan", "name", _clan("#8YY", "a"))
+        response = await self.client.get("/events", params={"tags": "8yy", "cursor": "0"})
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+        self.hub.publish("clan", "name", _clan("#2PP", "b"))
+        self.hub.publish("clan", "name", _clan("#8YY", "c"))
+
+        chunks = []
+        while len(chunks) < 2:
+            chunks.extend(chunk for chunk in (await response.content.readuntil(b"\n\n")).split(b"\n\n") if chunk)
+        self.assertEqual(chunks[0].split(b"\n")[0], b"id: 1")
+        self.assertEqual(chunks[1].split(b"\n")[0], b"id: 3")
+        self.assertEqual(orjson.loads(chunks[1].split(b"data: ")[1])["args"][0]["name"], "c")
+        response.close()
+
+    async def test_sse_last_event_id(self):
+        for name in ("a", "b"):
+            self.hub.publish("clan", "name", _clan("#8YY", name))
+        response = await self.client.get("/events", headers={"Last-Event-ID": "1"})
+        self.assertTrue((await response.content.readuntil(b"\n\n")).startswith(b"id: 2\n"))
+        response.close()
+
+        response = await self.client.get("/events", params={"cursor": "abc"})
+        self.assertEqual(response.status, 400)
+
+    async def test_websocket(self):
+        websocket = await self.client.ws_connect("/ws", params={"types": "war"})
+        await self.wait_for_subscribers(1)
+        self.hub.publish("clan", "name", _clan("#8YY"))
+        self.hub.publish("war", "war_attack", _clan("#8YY"))
+
+        message = orjson.loads(await websocket.receive_str())
+        self.assertEqual((message["id"], message["type"], message["event"]), (2, "war", "war_attack"))
+
+        await websocket.close()
+        # the subscription is closed when the subscriber disconnects.
+        await asyncio.wait_for(self.wait_for_subscribers_to_leave(), 1)
+
+    async def wait_for_subscribers_to_leave(self):
+        while self.hub.subscribers:
+            await asyncio.sleep(0.01)
+
+
+class TestEventsServeCommand(unittest.TestCase):
+    def test_parser(self):
+        args = build_parser().parse_args([
+            "events-serve", "--token", "abc", "--clan", "#8YY", "--clan", "#2PP", "--event", "clan:name",
+            "--port", "9000",
+        ])
+        self.assertEqual(args.command, "events-serve")
+        self.assertEqual(args.clan, ["#8YY", "#2PP"])
+        self.assertEqual((args.event, args.port, args.host), (["clan:name"], 9000, "127.0.0.1"))
+
+    def test_parser_needs_event(self):
+        with self.assertRaises(SystemExit):
+            build_parser().parse_args(["events-serve", "--token", "abc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import time
+import unittest
+
+import coc
+from coc.persistence import SnapshotRecord
+from coc.sharding import ShardRouter
+from tests.mockdata.mock_players import MOCK_SEARCH_PLAYER
+from tests.test_persistence import MemoryPersistence
+
+TAGS = ["#%s" % n for n in range(1000)]
+
+
+def _owners(shards):
+    # this runs in a new process, which has a different hash seed.
+    return [ShardRouter(shards).owner(tag) for tag in TAGS]
+
+
+class TestShardRouter(unittest.TestCase):
+    def test_spread(self):
+        groups = ShardRouter(4).split(TAGS)
+        self.assertEqual(sorted(groups), [0, 1, 2, 3])
+        self.assertEqual(sum(len(tags) for tags in groups.values()), len(TAGS))
+        for tags in groups.values():
+            self.assertGreater(len(tags), len(TAGS) / 8)
+
+    def test_only_affected_tags_move(self):
+        router = ShardRouter(["a", "b", "c"])
+
+        added = router.moved(TAGS, ShardRouter(["a", "b", "c", "d"]))
+        self.assertTrue(added)
+        self.assertEqual({new for _, new in added.values()}, {"d"})
+
+        removed = router.moved(TAGS, ShardRouter(["a", "c"]))
+        self.assertEqual({old for old, _ in removed.values()}, {"b"})
+        self.assertEqual(len(removed), len(router.split(TAGS)["b"]))
+
+    def test_same_in_every_process(self):
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            self.assertEqual(pool.apply(_owners, (["a", "b", "c"],)), _owners(["a", "b", "c"]))
+
+    def test_no_shards(self):
+        with self.assertRaises(ValueError):
+            ShardRouter([])
+
+
+class TestShardedEventsClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.persistence = MemoryPersistence()
+        self.clients = [
+            coc.EventsClient(shard_id=shard_id, shards=2, snapshot_persistence=self.persistence)
+            for shard_id in range(2)
+        ]
+        for client in self.clients:
+            client._create_holders()
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            for task in client._updater_tasks.values():
+                task.cancel()
+            client._dispatcher.close()
+            client._persistence_executor.shutdown()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    async def test_tags_are_split(self):
+        tags = TAGS[:50]
+        for client in self.clients:
+            client.add_player_updates(*tags)
+
+        first, second = (client._player_updates for client in self.clients)
+        self.assertFalse(first & second)
+        self.assertEqual(first | second, set(tags))
+        self.assertEqual(first, {tag for tag in tags if self.clients[0].owns_tag(tag)})
+
+        with self.assertRaises(ValueError):
+            await self.clients[0].reshard([1, 2])
+
+    async def test_reshard(self):
+        client = self.clients[0]
+        await client._snapshots_restored.wait()
+        tags = TAGS[:50]
+        client.add_player_updates(*tags)
+        owned, other = set(client._player_updates), set(tags) - client._player_updates
+
+        # shard 1 saved a snapshot of one of its tags before it was shut down.
+        moved = sorted(other)[0]
+        data = {**MOCK_SEARCH_PLAYER, "tag": moved, "timestamp": time.time(), "_response_retry": 600}
+        self.persistence.records[("player", moved)] = SnapshotRecord("player", moved, data)
+
+        await client.reshard([0])
+        self.assertEqual(client._player_updates, set(tags))
+        self.assertEqual(client._get_cached_player(moved).tag, moved)
+        # the snapshot is still fresh, so it isn't requested straight away.
+        self.assertNotIn(moved, client._schedulers["player"].pop_due())
+
+        # shard 1 is back, so its tags are handed back along with their snapshots.
+        await client.reshard(2)
+        self.assertEqual(client._player_updates, owned)
+        self.assertNotIn(moved, client._schedulers["player"])
+        self.assertIsNone(client._get_cached_player(moved))
+        self.assertIn(("player", moved), self.persistence.records)
+
+
+if __name__ == "__main__":
+    unittest.main()
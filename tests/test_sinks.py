@@ -0,0 +1,236 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import orjson
+
+import coc
+from coc.dispatcher import BatchedEvent
+
+
+class MemorySink(coc.EventSink):
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.closed = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, lines):
+        self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("the sink is down")
+        self.batches.append([orjson.loads(line)["args"][0] for line in lines])
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+class TestSerialiseEvent(unittest.TestCase):
+    def test_serialise(self):
+        clan = coc.Clan(data={"tag": "#8YY", "name": "clan"}, client=None)
+        line = coc.serialise_event("name", clan, BatchedEvent("name", 1, 2, ()), None, time_=1.0)
+        self.assertEqual(orjson.loads(line), {
+            "event": "name",
+            "time": 1.0,
+            "args": [
+                {"tag": "#8YY", "name": "clan"},
+                {"event": "name", "cached": 1, "current": 2, "args": []},
+                None,
+            ],
+        })
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.lines = [coc.serialise_event("name", i, time_=0.0) for i in range(3)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ndjson(self):
+        path = os.path.join(self.directory.name, "events.ndjson")
+        sink = coc.NDJSONSink(path)
+        sink.write(self.lines[:2])
+        sink.write(self.lines[2:])
+        sink.close()
+        with open(path, "rb") as file:
+            self.assertEqual(file.read().splitlines(), self.lines)
+
+    def test_sqlite(self):
+        path = os.path.join(self.directory.name, "events.db")
+        sink = coc.SQLiteSink(path)
+        sink.write(self.lines)
+        sink.close()
+        with sqlite3.connect(path) as connection:
+            rows = connection.execute("SELECT data FROM events ORDER BY id").fetchall()
+        self.assertEqual([row[0].encode() for row in rows], self.lines)
+
+    def test_webhook(self):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(self.rfile.read(int(self.headers["Content-Length"])))
+                self.send_response(500 if len(received) == 1 else 204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            sink = coc.WebhookSink("http://127.0.0.1:%s/events" % server.server_port)
+            with self.assertRaises(Exception):
+                sink.write(self.lines)
+            sink.write(self.lines)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(received[1].splitlines(), self.lines)
+
+    def test_incomplete_sink(self):
+        class CloseOnly(coc.EventSink):
+            def close(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            CloseOnly()
+
+
+class TestEventPipeline(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.directory.name, "events.spill")
+        self.errors = []
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def pipeline(self, *sinks, **kwargs):
+        kwargs = {"batch_size": 2, "flush_interval": 0.01, "retry_delay": 0.01, "on_error": self.errors.append, **kwargs}
+        return coc.EventPipeline(*sinks, **kwargs)
+
+    async def test_batches(self):
+        first, second = MemorySink(), MemorySink()
+        pipeline = self.pipeline(first, second)
+        for i in range(5):
+            await pipeline.put("name", i)
+        await pipeline.flush()
+
+        self.assertEqual(first.batches, [[0, 1], [2, 3], [4]])
+        self.assertEqual(second.batches, first.batches)
+        self.assertEqual(pipeline.stats["delivered"], 5)
+        self.assertEqual(pipeline.stats["pending"], 0)
+
+        await pipeline.close()
+        self.assertTrue(first.closed and second.closed)
+
+    async def test_retries(self):
+        sink = MemorySink(failures=2)
+        pipeline = self.pipeline(sink)
+        await pipeline.put("name", 0)
+        await pipeline.flush()
+        # nothing is lost while the sink is down.
+        self.assertEqual(sink.events, [0])
+        self.assertEqual(pipeline.retries, 2)
+        self.assertEqual(len(self.errors), 2)
+        await pipeline.close()
+
+    async def test_listener(self):
+        sink = MemorySink()
+        pipeline = self.pipeline(sink)
+        listener = pipeline.listener("trophies")
+        await listener(1, 2)
+        await pipeline.flush()
+        self.assertEqual(sink.events, [1])
+        self.assertEqual(listener.__name__, "forward_trophies")
+        await pipeline.close()
+
+    async def test_spill(self):
+        sink = MemorySink()
+        sink.release.clear()
+        pipeline = self.pipeline(sink, queue_size=2, spill_path=self.spill_path)
+        for i in range(10):
+            # none of these wait for the sink, even though it's stuck.
+            await pipeline.put("name", i)
+        self.assertGreater(pipeline.spilled, 0)
+        self.assertTrue(os.path.exists(self.spill_path))
+
+        sink.release.set()
+        await pipeline.flush()
+        # the spilled events are delivered after the queued ones, in order.
+        self.assertEqual(sink.events, list(range(10)))
+        self.assertFalse(os.path.exists(self.spill_path))
+        await pipeline.close()
+
+    async def test_close_spills_undelivered(self):
+        sink = MemorySink()
+        sink.release.clear()
+        pipeline = self.pipeline(sink, queue_size=2, spill_path=self.spill_path)
+        for i in range(6):
+            await pipeline.put("name", i)
+        closing = asyncio.ensure_future(pipeline.close(timeout=0.05))
+        await asyncio.sleep(0.1)
+        # the sink is closed once its stuck batch returns.
+        sink.release.set()
+        await closing
+
+        # nothing was delivered, so it's all delivered next time.
+        sink = MemorySink()
+        pipeline = self.pipeline(sink, spill_path=self.spill_path)
+        await pipeline.put("name", 6)
+        await pipeline.flush()
+        self.assertEqual(sink.events, list(range(7)))
+        await pipeline.close()
+
+    async def test_events_client(self):
+        sink = MemorySink()
+        pipeline = self.pipeline(sink, flush_interval=60)
+        client = coc.EventsClient(event_pipeline=pipeline)
+        # it was never logged in.
+        client.http = mock.AsyncMock()
+        await pipeline.put("name", 0)
+        # the batch isn't full yet, but closing the client delivers it.
+        await client.close()
+        self.assertEqual(sink.events, [0])
+        self.assertTrue(sink.closed)
+
+    async def test_events_client_sink_down(self):
+        sink = MemorySink(failures=1000)
+        pipeline = self.pipeline(sink, spill_path=self.spill_path)
+        client = coc.EventsClient(event_pipeline=pipeline, event_pipeline_close_timeout=0.05)
+        client.http = mock.AsyncMock()
+        await pipeline.put("name", 0)
+        # the sink never comes back, but closing the client doesn't wait for it forever.
+        await asyncio.wait_for(client.close(), 1)
+        self.assertTrue(sink.closed)
+
+        sink = MemorySink()
+        pipeline = self.pipeline(sink, spill_path=self.spill_path)
+        await pipeline.put("name", 1)
+        await pipeline.flush()
+        self.assertEqual(sink.events, [0, 1])
+        await pipeline.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+import coc
+from coc.players import Player
+from coc.snapshots import CompactSnapshotStore, ModelStore
+from tests.mockdata.mock_players import MOCK_SEARCH_PLAYER
+
+
+class TestModelStore(unittest.TestCase):
+    def test_store(self):
+        store = ModelStore()
+        self.assertIsNone(store.get("#2PP"))
+        self.assertIsNone(store.fingerprint("#2PP"))
+        self.assertEqual(store.response_retry("#2PP"), 0)
+
+        player = object()
+        store.set("#2PP", player)
+        self.assertIs(store.get("#2PP"), player)
+        self.assertIn("#2PP", store)
+
+        store.remove("#2PP")
+        self.assertEqual(len(store), 0)
+
+
+class TestCompactSnapshotStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = coc.Client(raw_attribute=True)
+        self.client._create_holders()
+        self.store = CompactSnapshotStore(self.client)
+
+    @classmethod
+    def tearDownClass(cls):
+        # the tests after this one create clients outside of a running loop.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_roundtrip(self):
+        player = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        player._fingerprint, player._response_retry = "abc", 60
+        self.store.set(player.tag, player, load_game_data=False)
+
+        self.assertEqual(self.store.fingerprint(player.tag), "abc")
+        self.assertEqual(self.store.response_retry(player.tag), 60)
+        self.assertIsNone(self.store._models[player.tag].model)
+
+        loaded = self.store.get(player.tag)
+        self.assertIsNot(loaded, player)
+        self.assertIsInstance(loaded, Player)
+        self.assertEqual(loaded.tag, player.tag)
+        self.assertEqual(loaded.trophies, player.trophies)
+        self.assertFalse(loaded._load_game_data)
+        self.assertEqual([troop.name for troop in loaded.troops], [troop.name for troop in player.troops])
+
+        self.store.remove(player.tag)
+        self.assertIsNone(self.store.get(player.tag))
+
+    def test_without_raw_data(self):
+        self.client.raw_attribute = False
+        player = Player(data=MOCK_SEARCH_PLAYER, client=self.client)
+        self.store.set(player.tag, player)
+        self.assertIs(self.store.get(player.tag), player)
+
+
+if __name__ == "__main__":
+    unittest.main()
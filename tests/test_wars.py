@@ -2,6 +2,7 @@ import unittest
 
 from coc.wars import ClanWar
 from coc.miscmodels import Timestamp
+from coc.utils import LeagueWarIndex
 
 from tests.mockdata.mock_current_war import MOCK_CURRENT_WAR_IN_WAR
 
@@ -96,3 +97,23 @@ class TestWarClan(unittest.TestCase):
         data = {"clan": {"clanLevel": 10}}
         war = ClanWar(data=data, client=None, clan_tag=None)
         self.assertIsInstance(war.clan.level, int)
+
+
+class TestLeagueWarIndex(unittest.TestCase):
+    def test_filter_tags(self):
+        index = LeagueWarIndex()
+        index.add("2020-05", "#WAR1", ("#CLAN1", "#CLAN2"))
+        index.add("2020-05", "#WAR2", ("#CLAN3", "#CLAN4"))
+
+        self.assertEqual(index.get_clans("#WAR1"), ("#CLAN1", "#CLAN2"))
+        self.assertIsNone(index.get_clans("#WAR3"))
+        # known wars of other clans are dropped, unknown wars are kept.
+        self.assertEqual(list(index.filter_tags(["#WAR1", "#WAR2", "#WAR3"], "#CLAN2")), ["#WAR1", "#WAR3"])
+
+    def test_max_seasons(self):
+        index = LeagueWarIndex(max_seasons=2)
+        for season in ("2020-03", "2020-04", "2020-05"):
+            index.add(season, "#WAR" + season, ("#CLAN1", "#CLAN2"))
+
+        self.assertEqual(sorted(index), ["2020-04", "2020-05"])
+        self.assertIsNone(index.get_clans("#WAR2020-03"))